@@ -1,108 +1,136 @@
-import random
 import numpy as np
 import pandas as pd
 
-from utils import get_pnl_stats
+from normalize import zscore
+from panel import Panel
+
+PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def _calendar_days(index):
+    """Index as tz-naive midnight dates, so intraday or UTC stamps line up with a daily calendar."""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return index.normalize()
+
 
 class Alpha1():
+    """Calendar-day long/short backtest of the volume-weighted mean reversal alpha.
+
+    Every day the eligible insts are ranked on the alpha; the top quarter is bought
+    and the bottom quarter sold short, each with an equal share of capital. PnL is
+    the previous day's units times the change in close, so capital compounds as
+    capital * (1 + portfolio return) and the whole simulation is array arithmetic
+    over dates x insts panels.
+    """
 
-    def __init__(self, insts, dfs, start, end):
+    def __init__(self, insts, dfs, start, end, capital=10000, window=12, sample_window=5):
         self.insts = insts
         self.dfs = dfs
         self.start = start
         self.end = end
+        self.capital = capital
+        self.window = window
+        # An inst is eligible while its close moved on one of the last sample_window days
+        self.sample_window = sample_window
+        self.panel = None
 
     def init_portfolio_settings(self, trade_range):
-        portfolio_df = pd.DataFrame(index=trade_range) \
-                        .reset_index() \
-                        .rename(columns={"index":"datetime"})
-        portfolio_df.loc[0,"capital"] = 10000
-        return portfolio_df
-    
+        shape = (len(trade_range), len(self.insts))
+        return {
+            "capital": np.full(len(trade_range), float(self.capital)),
+            "day_pnl": np.zeros(len(trade_range)),
+            "capital_ret": np.zeros(len(trade_range)),
+            "nominal": np.zeros(len(trade_range)),
+            "leverage": np.zeros(len(trade_range)),
+            "units": np.zeros(shape),
+            "w": np.zeros(shape),
+        }
+
     def compute_meta_info(self, trade_range):
-        # Normalize trade_range to date-only UTC
-
-        op4s = []
-        for inst in self.insts:
-
-            trade_range = pd.DatetimeIndex([d.date() for d in trade_range]).tz_localize("UTC")
-            df = pd.DataFrame(index=trade_range)
-
-            inst_df = self.dfs[inst].copy()
-            inst_df.index = pd.DatetimeIndex([d.date() for d in inst_df.index]).tz_localize("UTC")
-
-            op1 = inst_df.volume
-            op2 = (inst_df.close - inst_df.low) - (inst_df.high - inst_df.close)
-            op3 = inst_df.high - inst_df.close
-            op4 = op1 * op2 / op3.replace(0, np.nan)        # replace 0 with NaN to avoid inf
-
-            self.dfs[inst] = df.join(self.dfs[inst]).fillna(method="ffill").fillna(method="bfill")
-            self.dfs[inst]["ret"] = -1 * self.dfs[inst]["close"]/self.dfs[inst]["close"].shift(1)
-            self.dfs[inst]["op4"] = op4
-            op4s.append(self.dfs[inst]["op4"])
-
-            sampled = self.dfs[inst]["close"] != self.dfs[inst]["close"].shift(1).fillna(method="bfill")
-            eligible = sampled.rolling(5).apply(lambda x: int(np.any(x))).fillna(0)
-            self.dfs[inst]["eligible"] = eligible.astype(int) & (self.dfs[inst]["close"] > 0).astype(int)
-        
-        temp_df = pd.concat(op4s, axis=1)
-        temp_df.columns = self.insts
-        temp_df = temp_df.replace(np.inf, 0).replace(-np.inf, 0)
-        zscore = lambda x: (x - np.mean(x))/np.std(x)
-        cszcre_df = temp_df.fillna(method="ffill").apply(zscore, axis=1)
-        for inst in self.insts:
-            self.dfs[inst]["alpha"] = cszcre_df[inst].rolling(12).mean() * -1
-            self.dfs[inst]["eligible"] = self.dfs[inst]["eligible"] & (~pd.isna(self.dfs[inst]["alpha"]))
-        return
+        """Panel of close (filled over non-trading days), ret, op4, alpha and eligible on trade_range."""
+        trade_range = _calendar_days(trade_range)
+        panel = Panel(trade_range, self.insts)
+        raw = {field: np.full(panel.shape, np.nan) for field in PRICE_FIELDS}
+        for j, inst in enumerate(self.insts):
+            df = self.dfs[inst]
+            rows = _calendar_days(df.index).get_indexer(trade_range)
+            found = rows >= 0
+            for field in PRICE_FIELDS:
+                raw[field][found, j] = df[field].to_numpy(dtype=float)[rows[found]]
+        panel.available = ~np.isnan(raw["close"])
+
+        close = pd.DataFrame(raw["close"]).ffill().bfill().to_numpy()
+        panel["close"] = close
+        previous = np.vstack((close[:1], close[:-1]))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            panel["ret"] = close / previous - 1
+            op2 = (raw["close"] - raw["low"]) - (raw["high"] - raw["close"])
+            op3 = raw["high"] - raw["close"]
+            op4 = raw["volume"] * op2 / np.where(op3 == 0, np.nan, op3)
+        panel["op4"] = op4
+
+        op4 = pd.DataFrame(np.where(np.isinf(op4), 0, op4)).ffill().to_numpy()
+        panel["alpha"] = pd.DataFrame(zscore(op4)).rolling(self.window).mean().to_numpy() * -1
+
+        # Rolling max over the "close moved" mask replaces a Python callback per window
+        sampled = (close != previous).astype(float)
+        recently_sampled = pd.DataFrame(sampled).rolling(self.sample_window).max().fillna(0).to_numpy() > 0
+        with np.errstate(invalid="ignore"):
+            eligible = recently_sampled & (close > 0) & ~np.isnan(panel["alpha"])
+        panel["eligible"] = eligible
+        self.panel = panel
+        return panel
 
     def run_simulation(self):
         print("running backtest")
         date_range = pd.date_range(start=self.start, end=self.end, freq="D")
-        self.compute_meta_info(trade_range=date_range)
-        portfolio_df = self.init_portfolio_settings(trade_range=date_range)
-        for i in portfolio_df.index:
-            date = portfolio_df.loc[i, "datetime"]
-
-            eligibles = [inst for inst in self.insts if self.dfs[inst].loc[date, "eligible"]]
-            non_eligibles = [inst for inst in self.insts if inst not in eligibles]
-
-            if i != 0:
-                date_prev = portfolio_df.loc[i-1,"datetime"]
-                day_pnl, capital_ret = get_pnl_stats(
-                    date=date,
-                    prev=date_prev,
-                    portfolio_df=portfolio_df,
-                    insts=self.insts,
-                    idx=i,
-                    dfs=self.dfs
-                )
-
-            alpha_scores = {}
-            for inst in eligibles:
-                alpha_scores[inst] = self.dfs[inst].loc[date, "alpha"]
-            alpha_scores = {k:v for k,v in sorted(alpha_scores.items(), key = lambda pair: pair[1])}
-            alpha_long = list(alpha_scores.keys())[-int(len(eligibles)/4):]
-            alpha_short = list(alpha_scores.keys())[:int(len(eligibles)/4)]
-
-            for inst in non_eligibles:
-                portfolio_df.loc[i, "{} w".format(inst)] = 0
-                portfolio_df.loc[i, "{} units".format(inst)] = 0
-
-            nominal_tot = 0
-            for inst in eligibles:
-                forecast = 1 if inst in alpha_long else (-1 if inst in alpha_short else 0)
-                dollar_allocation = portfolio_df.loc[i, "capital"] / (len(alpha_long) + len(alpha_short))
-                position = forecast * dollar_allocation / self.dfs[inst].loc[date, "close"]
-                portfolio_df.loc[i, inst + " units"] = position
-                nominal_tot += abs(position * self.dfs[inst].loc[date, "close"])
-
-            for inst in eligibles:
-                units = portfolio_df.loc[i, inst + " units"]
-                nominal_inst = units * self.dfs[inst].loc[date, "close"]
-                inst_w = nominal_inst / nominal_tot
-                portfolio_df.loc[i, inst + " w"] = inst_w
-
-            portfolio_df.loc[i, "nominal"] = nominal_tot
-            portfolio_df.loc[i, "leverage"] = nominal_tot / portfolio_df.loc[i, "capital"]
-            if i%100 == 0: print(portfolio_df.loc[i])
-        return portfolio_df
\ No newline at end of file
+        panel = self.compute_meta_info(trade_range=date_range)
+        portfolio = self.init_portfolio_settings(trade_range=panel.dates)
+        eligible = panel["eligible"].astype(bool)
+        close = panel["close"]
+
+        # Rank the eligible insts on each date; ineligible ones sort last and are never picked
+        alpha = np.where(eligible, panel["alpha"], np.inf)
+        order = np.argsort(alpha, axis=1, kind="stable")
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.broadcast_to(np.arange(alpha.shape[1]), alpha.shape), axis=1)
+        n = eligible.sum(axis=1, keepdims=True)
+        count = n // 4
+        forecast = (eligible & (ranks >= n - count)).astype(float) - (eligible & (ranks < count))
+        positions = 2 * count
+
+        # Equal dollar allocation: the day's return is the mean forecast-signed return of the
+        # positions held into it, and capital compounds on it
+        with np.errstate(divide="ignore", invalid="ignore"):
+            allocation = np.where(positions > 0, forecast / positions, 0)
+        held_ret = np.where(allocation[:-1] != 0, allocation[:-1] * panel["ret"][1:], 0).sum(axis=1)
+        capital = self.capital * np.concatenate(([1.0], np.cumprod(1 + held_ret)))
+        portfolio["capital"] = capital
+        portfolio["day_pnl"][1:] = np.diff(capital)
+        portfolio["capital_ret"][1:] = held_ret
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            units = np.where(allocation != 0, allocation * capital[:, None] / close, 0)
+        nominal = np.abs(units * close).sum(axis=1, where=units != 0)
+        portfolio["units"] = units
+        with np.errstate(divide="ignore", invalid="ignore"):
+            portfolio["w"] = np.where(nominal[:, None] > 0, units * close / nominal[:, None], 0)
+        portfolio["nominal"] = nominal
+        portfolio["leverage"] = nominal / capital
+
+        portfolio_df = self._portfolio_frame(panel.dates, portfolio)
+        print(f"Final capital: {capital[-1]:,.2f} over {len(capital)} days")
+        return portfolio_df
+
+    def _portfolio_frame(self, dates, portfolio):
+        """One row per day: datetime, capital, pnl, nominal, leverage, then units and w per inst."""
+        columns = {"datetime": dates}
+        for key in ("capital", "day_pnl", "capital_ret", "nominal", "leverage"):
+            columns[key] = portfolio[key]
+        for j, inst in enumerate(self.insts):
+            columns[f"{inst} units"] = portfolio["units"][:, j]
+        for j, inst in enumerate(self.insts):
+            columns[f"{inst} w"] = portfolio["w"][:, j]
+        return pd.DataFrame(columns)
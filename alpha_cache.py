@@ -0,0 +1,75 @@
+import threading
+
+from panel import Panel
+from universe import Universe
+
+
+class AlphaCache:
+    """Per-run store of computed alpha panels shared by every strategy.
+
+    Entries are keyed by alpha class, parameters, universe and date range, so two
+    alpha objects that only differ by output column name share one computation.
+    The universe (master calendar and availability) and the price panel the alphas
+    read are built once per ticker list and frame dict.
+    Safe to share between threads: concurrent requests for one entry compute it once.
+    """
+
+    def __init__(self):
+        self._results = {}
+        self._panels = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def key(alpha, trade_range):
+        span = (trade_range[0], trade_range[-1], len(trade_range)) if len(trade_range) else ()
+        return (
+            f"{type(alpha).__module__}.{type(alpha).__qualname__}",
+            tuple(sorted(alpha.params().items())),
+            tuple(alpha.insts),
+            alpha.start,
+            alpha.end,
+            span,
+        )
+
+    def get_or_compute(self, alpha, trade_range):
+        key = self.key(alpha, trade_range)
+        with self._key_lock(key):
+            if key in self._results:
+                self.hits += 1
+                return self._results[key]
+            self.misses += 1
+            result = alpha.compute_uncached(trade_range)
+            self._results[key] = result
+            return result
+
+    def universe(self, insts, dfs):
+        key = ("universe", tuple(insts), id(dfs))
+        with self._key_lock(key):
+            if key not in self._panels:
+                # dfs is kept alongside so its id cannot be reused while the entry lives
+                self._panels[key] = (dfs, Universe(insts, dfs))
+            return self._panels[key][1]
+
+    def panel(self, insts, dfs):
+        key = (tuple(insts), id(dfs))
+        with self._key_lock(key):
+            if key not in self._panels:
+                self._panels[key] = (dfs, Panel.from_frames(dfs, insts, universe=self.universe(insts, dfs)))
+            return self._panels[key][1]
+
+    def clear(self):
+        self._results.clear()
+        self._panels.clear()
+        self._locks.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._results)
@@ -1,95 +1,258 @@
 import pandas as pd
 import numpy as np
 
+from streaming import RollingMean, bar_arrays
+from normalize import zscore
+from panel import Panel
+from regime import RegimeFeatures
+
 class Alpha:
-    def __init__(self, insts, dfs, start, end, name):
+    # Bar fields the streaming update needs
+    stream_fields = ()
+
+    def __init__(self, insts, dfs, start, end, name, cache=None):
         self.insts = insts
         self.dfs = dfs
         self.start = start
         self.end = end
         self.name = name
+        self.cache = cache
+        self._stream = None
 
-    def pre_compute(self, trade_range):
-        pass
+    def params(self):
+        """Parameters that change the alpha values (used as part of the cache key)."""
+        return {}
+
+    def init_kwargs(self):
+        """Constructor keyword arguments (besides insts/dfs/start/end/name) to rebuild this alpha."""
+        return self.params()
+
+    def spec(self):
+        return type(self), self.name, self.init_kwargs()
 
-    def post_compute(self, trade_range):
+    def panel(self):
+        """Price fields of self.insts over their full history, shared through the cache when set."""
+        if self.cache is not None:
+            return self.cache.panel(self.insts, self.dfs)
+        return Panel.from_frames(self.dfs, self.insts)
+
+    def pre_compute(self, panel, trade_range):
+        """Add intermediate fields to panel (a private view of the price panel)."""
         pass
 
+    def post_compute(self, panel, trade_range):
+        """Return the alpha as a len(trade_range) x len(insts) array."""
+        raise NotImplementedError
+
+    def compute(self, trade_range):
+        """Return the alpha panel on trade_range (0 where NaN or not trading), via the cache when set."""
+        if self.cache is not None:
+            return self.cache.get_or_compute(self, trade_range)
+        return self.compute_uncached(trade_range)
+
+    def compute_uncached(self, trade_range):
+        panel = self.panel().view()
+        self.pre_compute(panel, trade_range)
+        return self.post_compute(panel, trade_range)
+
+    @staticmethod
+    def on_dates(panel, values, trade_range):
+        """Rows of a full-history array for trade_range; NaN, missing dates and non-trading cells become 0."""
+        rows = panel.rows(trade_range)
+        found = rows >= 0
+        result = np.zeros((len(rows), values.shape[1]))
+        taken = values[rows[found]]
+        result[found] = np.where(panel.available[rows[found]] & ~np.isnan(taken), taken, 0)
+        return result
+
+    def init_stream(self):
+        """Fresh rolling state for update(); returned object is kept in self._stream."""
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming updates")
+
+    def step(self, date, mask, bar):
+        """Advance the rolling state by one date; returns values aligned with self.insts."""
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming updates")
+
+    def reset_stream(self):
+        self._stream = None
+
+    def update(self, date, bar):
+        """Consume one date of bars and return {inst: alpha value} for the insts in bar.
+
+        bar maps inst -> {field: value} for the instruments trading on date. Dates must
+        arrive in order and cover the whole calendar (each with whatever insts traded);
+        values then match post_compute for the same history, at O(1) cost per inst.
+        """
+        mask, arrays = bar_arrays(self.insts, bar, self.stream_fields)
+        values = self.advance(date, mask, arrays)
+        return {inst: values[j] for j, inst in enumerate(self.insts) if mask[j]}
+
+    def advance(self, date, mask, bar):
+        """step() on array bars (mask and {field: array} aligned with insts), creating the state on first use."""
+        if self._stream is None:
+            self._stream = self.init_stream()
+        return self.step(date, mask, bar)
+
 class MeanReversalAlpha(Alpha):
-    def __init__(self, insts, dfs, start, end, name="alpha1"):
-        super().__init__(insts, dfs, start, end, name)
-
-    def pre_compute(self, trade_range):
-        for inst in self.insts:
-            df = self.dfs[inst]
-            op1 = df['volume']
-            op2 = (df['close'] - df['low']) - (df['high'] - df['close'])
-            op3 = df['high'] - df['low']
-            op4 = op1 * op2 / op3.replace(0, np.nan)
-            df['op4'] = op4
-
-    def post_compute(self, trade_range):
-        temp_df = pd.DataFrame(index=trade_range)
-        for inst in self.insts:
-            temp_df[inst] = self.dfs[inst]['op4']
-        temp_df = temp_df.replace(np.inf, 0).replace(-np.inf, 0)
-        zscore = lambda x: (x - np.mean(x)) / np.std(x) if np.std(x) > 0 else x * 0
-        cszcre_df = temp_df.fillna(method="ffill").apply(zscore, axis=1)
-        for inst in self.insts:
-            self.dfs[inst][self.name] = cszcre_df[inst].rolling(12).mean() * -1
-            self.dfs[inst][self.name] = self.dfs[inst][self.name].fillna(0)  # Ensure no NaN
+    stream_fields = ("high", "low", "close", "volume")
+
+    def __init__(self, insts, dfs, start, end, name="alpha1", cache=None, window=12):
+        super().__init__(insts, dfs, start, end, name, cache)
+        self.window = window
+
+    def params(self):
+        return {"window": self.window}
+
+    def pre_compute(self, panel, trade_range):
+        op1 = panel['volume']
+        op2 = (panel['close'] - panel['low']) - (panel['high'] - panel['close'])
+        op3 = panel['high'] - panel['low']
+        with np.errstate(divide="ignore", invalid="ignore"):
+            panel['op4'] = op1 * op2 / np.where(op3 == 0, np.nan, op3)
+
+    def post_compute(self, panel, trade_range):
+        # Cross-sectional z-scores live on the trade calendar, forward filled across
+        # the dates an inst does not trade
+        rows = panel.rows(trade_range)
+        op4 = np.full((len(rows), len(self.insts)), np.nan)
+        op4[rows >= 0] = panel['op4'][rows[rows >= 0]]
+        op4 = pd.DataFrame(np.where(np.isinf(op4), 0, op4)).ffill().to_numpy()
+        alpha = pd.DataFrame(zscore(op4)).rolling(self.window).mean().to_numpy() * -1
+        traded = np.zeros(alpha.shape, dtype=bool)
+        traded[rows >= 0] = panel.available[rows[rows >= 0]]
+        return np.where(traded & ~np.isnan(alpha), alpha, 0)  # Ensure no NaN
+
+    def init_stream(self):
+        n = len(self.insts)
+        return {"op4": np.full(n, np.nan), "zscore_mean": RollingMean(self.window, n)}
+
+    def step(self, date, mask, bar):
+        if date < pd.Timestamp(self.start):
+            # The z-scores live on the trade calendar: earlier history does not enter the state
+            return np.zeros(len(self.insts))
+        op2 = (bar["close"] - bar["low"]) - (bar["high"] - bar["close"])
+        op3 = bar["high"] - bar["low"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            op4 = bar["volume"] * op2 / np.where(op3 == 0, np.nan, op3)
+        op4 = np.where(np.isinf(op4), 0, op4)
+        # Forward fill: insts without a usable value keep their last op4
+        last_op4 = np.where(np.isnan(op4), self._stream["op4"], op4)
+        self._stream["op4"] = last_op4
+        means = self._stream["zscore_mean"].push(zscore(last_op4))
+        alpha = means * -1
+        return np.where(np.isnan(alpha), 0, alpha)
 
 class PriceRatioMeanReversalAlpha(Alpha):
-    def __init__(self, insts, dfs, start, end, name="alpha2"):
-        super().__init__(insts, dfs, start, end, name)
+    stream_fields = ("open", "close")
+
+    def __init__(self, insts, dfs, start, end, name="alpha2", cache=None, window=12):
+        super().__init__(insts, dfs, start, end, name, cache)
+        self.window = window
+
+    def params(self):
+        return {"window": self.window}
 
-    def post_compute(self, trade_range):
-        for inst in self.insts:
-            df = self.dfs[inst]
-            alpha = -1 * (1 - (df['open'] / df['close'])).rolling(12).mean()
-            self.dfs[inst][self.name] = alpha.fillna(0)  # Ensure no NaN
+    def post_compute(self, panel, trade_range):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = 1 - (panel['open'] / panel['close'])
+        alpha = -1 * panel.rolling_mean(ratio, self.window)
+        return self.on_dates(panel, alpha, trade_range)
+
+    def init_stream(self):
+        return RollingMean(self.window, len(self.insts))
+
+    def step(self, date, mask, bar):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = 1 - (bar["open"] / bar["close"])
+        alpha = -1 * self._stream.push(ratio, mask)
+        return np.where(np.isnan(alpha), 0, alpha)
 
 class MomentumAlpha(Alpha):
-    def __init__(self, insts, dfs, start, end, name="alpha3"):
-        super().__init__(insts, dfs, start, end, name)
+    stream_fields = ("close",)
+
+    def __init__(self, insts, dfs, start, end, name="alpha3", cache=None,
+                 pairs=((10, 50), (20, 100), (50, 200))):
+        super().__init__(insts, dfs, start, end, name, cache)
+        # (fast, slow) moving average windows; the score counts the pairs with fast > slow
+        self.pairs = tuple(tuple(pair) for pair in pairs)
+
+    def params(self):
+        return {"pairs": self.pairs}
 
-    def post_compute(self, trade_range):
-        for inst in self.insts:
-            df = self.dfs[inst]
-            fast = (df['close'].rolling(10).mean() > df['close'].rolling(50).mean()).astype(int)
-            medium = (df['close'].rolling(20).mean() > df['close'].rolling(100).mean()).astype(int)
-            slow = (df['close'].rolling(50).mean() > df['close'].rolling(200).mean()).astype(int)
-            self.dfs[inst][self.name] = (fast + medium + slow).fillna(0)  # Ensure no NaN
+    def post_compute(self, panel, trade_range):
+        windows = sorted({window for pair in self.pairs for window in pair})
+        means = {window: panel.rolling_mean(panel['close'], window) for window in windows}
+        score = np.zeros(panel.shape)
+        for fast, slow in self.pairs:
+            score += means[fast] > means[slow]
+        return self.on_dates(panel, score, trade_range)
+
+    def init_stream(self):
+        windows = sorted({window for pair in self.pairs for window in pair})
+        return {window: RollingMean(window, len(self.insts)) for window in windows}
+
+    def step(self, date, mask, bar):
+        means = {window: rolling.push(bar["close"], mask) for window, rolling in self._stream.items()}
+        score = np.zeros(len(self.insts))
+        for fast, slow in self.pairs:
+            score += means[fast] > means[slow]
+        return score
 
 class AdaptiveRegimeAlpha(Alpha):
-    def __init__(self, insts, dfs, start, end, sp500_df, name="regime_switching"):
-        super().__init__(insts, dfs, start, end, name)
+    stream_fields = ("open", "high", "low", "close", "volume")
+
+    def __init__(self, insts, dfs, start, end, sp500_df, name="regime_switching", cache=None,
+                 mean_reversal_window=12, price_ratio_window=12, momentum_pairs=((10, 50), (20, 100), (50, 200))):
+        super().__init__(insts, dfs, start, end, name, cache)
         self.sp500_df = sp500_df.reindex(dfs[list(dfs.keys())[0]].index, method="ffill")  # Align with ticker data
-        self.alpha1 = MeanReversalAlpha(insts, dfs, start, end)
-        self.alpha2 = PriceRatioMeanReversalAlpha(insts, dfs, start, end)
-        self.alpha3 = MomentumAlpha(insts, dfs, start, end)
-
-    def pre_compute(self, trade_range):
-        self.alpha1.pre_compute(trade_range)
-        self.alpha2.pre_compute(trade_range)
-        self.alpha3.pre_compute(trade_range)
-
-    def post_compute(self, trade_range):
-        self.alpha1.post_compute(trade_range)
-        self.alpha2.post_compute(trade_range)
-        self.alpha3.post_compute(trade_range)
-        for date in trade_range:
-            for inst in self.insts:
-                if date not in self.dfs[inst].index:
-                    continue  # Skip if no data for this ticker on this date
-                if date in self.sp500_df.index and not pd.isna(self.sp500_df.loc[date, "ma200"]):
-                    if self.sp500_df.loc[date, "close"] > self.sp500_df.loc[date, "ma200"]:
-                        val = self.dfs[inst].loc[date, self.alpha3.name]
-                        self.dfs[inst].loc[date, self.name] = val if not pd.isna(val) else 0
-                    else:
-                        a1 = self.dfs[inst].loc[date, self.alpha1.name]
-                        a2 = self.dfs[inst].loc[date, self.alpha2.name]
-                        avg = (a1 + a2) / 2 if not (pd.isna(a1) or pd.isna(a2)) else 0
-                        self.dfs[inst].loc[date, self.name] = avg
-                else:
-                    self.dfs[inst].loc[date, self.name] = 0  # No S&P 500 data or early period
\ No newline at end of file
+        # Regime flags as arrays on the aligned calendar: a date's regime is one indexed read
+        self.regime = RegimeFeatures(self.sp500_df)
+        self.alpha1 = MeanReversalAlpha(insts, dfs, start, end, cache=cache, window=mean_reversal_window)
+        self.alpha2 = PriceRatioMeanReversalAlpha(insts, dfs, start, end, cache=cache, window=price_ratio_window)
+        self.alpha3 = MomentumAlpha(insts, dfs, start, end, cache=cache, pairs=momentum_pairs)
+
+    def params(self):
+        windows = {
+            "mean_reversal_window": self.alpha1.window,
+            "price_ratio_window": self.alpha2.window,
+            "momentum_pairs": self.alpha3.pairs,
+        }
+        sp500 = self.sp500_df
+        if sp500.empty:
+            return {"sp500": (), **windows}
+        return {"sp500": (sp500.index[0], sp500.index[-1], len(sp500), float(sp500["close"].sum())), **windows}
+
+    def init_kwargs(self):
+        params = self.params()
+        del params["sp500"]
+        return {"sp500_df": self.sp500_df, **params}
+
+    def reset_stream(self):
+        super().reset_stream()
+        for alpha in (self.alpha1, self.alpha2, self.alpha3):
+            alpha.reset_stream()
+
+    def init_stream(self):
+        # The rolling state lives in the sub-alphas
+        return True
+
+    def step(self, date, mask, bar):
+        a1 = self.alpha1.advance(date, mask, bar)
+        a2 = self.alpha2.advance(date, mask, bar)
+        momentum = self.alpha3.advance(date, mask, bar)
+        row = self.regime.row(date)
+        if row < 0 or not self.regime.has_regime[row]:
+            return np.zeros(len(self.insts))
+        if self.regime.trending[row]:
+            return momentum
+        return (a1 + a2) / 2
+
+    def post_compute(self, panel, trade_range):
+        # Sub-alpha panels come from the cache when they were already computed
+        a1 = self.alpha1.compute(trade_range)
+        a2 = self.alpha2.compute(trade_range)
+        momentum = self.alpha3.compute(trade_range)
+        # Regime mask over the S&P 500 calendar: trending when close is above ma200,
+        # mean reverting when below, and no regime (zero signal) while ma200 is NaN
+        has_regime, trending = self.regime.on(trade_range)
+        return np.where(has_regime[:, None], np.where(trending[:, None], momentum, (a1 + a2) / 2), 0)
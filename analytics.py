@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+def window_sums(values, window):
+    """Trailing sums of `window` values along the last axis from one prefix-sum pass (NaN until full)."""
+    prefix = np.cumsum(values, axis=-1)
+    sums = np.full(values.shape, np.nan)
+    if window > values.shape[-1]:
+        return sums
+    sums[..., window - 1] = prefix[..., window - 1]
+    sums[..., window:] = prefix[..., window:] - prefix[..., :-window]
+    return sums
+
+
+def rolling_mean_std(values, window):
+    """Trailing mean and sample std (ddof=1, as pandas) over `window` values.
+
+    Values are centred on their overall mean before the prefix sums, which keeps
+    the sum-of-squares difference well conditioned.
+    """
+    offset = np.nanmean(values, axis=-1, keepdims=True)
+    centred = values - offset
+    sums = window_sums(centred, window)
+    squares = window_sums(centred ** 2, window)
+    mean = sums / window
+    variance = np.maximum(squares - sums * mean, 0) / (window - 1) if window > 1 else np.zeros(values.shape)
+    return mean + offset, np.sqrt(variance)
+
+
+def rolling_max(values, window):
+    """Trailing max over `window` values along the last axis (van Herk/Gil-Werman).
+
+    The axis is cut into blocks of `window`; a prefix max within each block and a
+    suffix max within each block give every window's max as the larger of two reads.
+    """
+    n = values.shape[-1]
+    result = np.full(values.shape, np.nan)
+    if window > n:
+        return result
+    blocks = -(-n // window)
+    padded = np.full(values.shape[:-1] + (blocks * window,), -np.inf)
+    padded[..., :n] = values
+    shaped = padded.reshape(values.shape[:-1] + (blocks, window))
+    prefix = np.maximum.accumulate(shaped, axis=-1).reshape(padded.shape)[..., :n]
+    suffix = np.flip(np.maximum.accumulate(np.flip(shaped, axis=-1), axis=-1), axis=-1).reshape(padded.shape)
+    result[..., window - 1:] = np.maximum(suffix[..., :n - window + 1], prefix[..., window - 1:])
+    return result
+
+
+def drawdowns(equity):
+    """Drawdown from the running peak and days spent below it, per date."""
+    peak = np.maximum.accumulate(equity, axis=-1)
+    drawdown = equity / peak - 1
+    index = np.broadcast_to(np.arange(equity.shape[-1]), equity.shape)
+    last_peak = np.maximum.accumulate(np.where(equity >= peak, index, 0), axis=-1)
+    return drawdown, index - last_peak
+
+
+def sortino_ratio(returns):
+    """Annualized mean return over annualized downside deviation (0 without losses)."""
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2, axis=-1)) * np.sqrt(TRADING_DAYS)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(downside > 0, returns.mean(axis=-1) * TRADING_DAYS / downside, 0)
+
+
+def calmar_ratio(returns, max_drawdown):
+    """Annualized mean return over the magnitude of the max drawdown (a fraction)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(max_drawdown < 0, returns.mean(axis=-1) * TRADING_DAYS / -max_drawdown, 0)
+
+
+def _plain(values):
+    """JSON-ready list: floats with NaN as None."""
+    return [None if value != value else value for value in np.asarray(values, dtype=float).tolist()]
+
+
+class PnlReport:
+    """Scalars and per-date arrays of one equity curve, plus optional attribution.
+
+    scalars maps a name to a float; series maps a name to a float64 array aligned
+    with dates; attribution maps "ticker" / "alpha" to {name: total return or PnL}
+    and per-date arrays. Reports travel between processes and into the results store
+    as arrays; to_dict() gives plain lists and floats once one reaches the front end.
+    """
+
+    def __init__(self, dates, scalars, series, attribution=None):
+        self.dates = pd.DatetimeIndex(dates)
+        self.scalars = scalars
+        self.series = series
+        self.attribution = attribution or {}
+
+    def frame(self):
+        return pd.DataFrame(self.series, index=self.dates)
+
+    def to_dict(self):
+        attribution = {}
+        for kind, parts in self.attribution.items():
+            attribution[kind] = {
+                "names": list(parts["names"]),
+                "totals": _plain(parts["totals"]),
+                **({"daily": [_plain(row) for row in parts["daily"]]} if "daily" in parts else {}),
+            }
+        return {
+            "dates": [date.strftime("%Y-%m-%d") for date in self.dates],
+            "scalars": {name: float(value) for name, value in self.scalars.items()},
+            "series": {name: _plain(values) for name, values in self.series.items()},
+            "attribution": attribution,
+        }
+
+
+def json_default(value):
+    """json.dumps default= hook for front-end output: reports become plain dicts, anything else a string."""
+    if isinstance(value, PnlReport):
+        return value.to_dict()
+    return str(value)
+
+
+def analyze(equity, dates, window=63):
+    """Whole-period and trailing-window metrics of an equity curve in O(n) passes.
+
+    Daily returns, rolling Sharpe/volatility over `window` dates, drawdown from the
+    running peak and from the trailing-window peak, and days underwater, plus the
+    get_pnl_stats scalars with Sortino, Calmar and the longest drawdown.
+    """
+    equity = np.asarray(equity, dtype=float)
+    returns = np.concatenate(([np.nan], equity[1:] / equity[:-1] - 1))
+    mean, std = rolling_mean_std(returns[1:], window)
+    rolling_volatility = np.concatenate(([np.nan], std * np.sqrt(TRADING_DAYS)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rolling_sharpe = np.concatenate(([np.nan], np.where(std > 0, mean / std, 0) * np.sqrt(TRADING_DAYS)))
+    drawdown, underwater = drawdowns(equity)
+    window_drawdown = equity / rolling_max(equity, window) - 1
+
+    daily = returns[1:]
+    annualized_return = daily.mean() * TRADING_DAYS
+    annualized_volatility = daily.std(ddof=1) * np.sqrt(TRADING_DAYS)
+    max_drawdown = drawdown.min()
+    scalars = {
+        "Total Return (%)": (equity[-1] / equity[0] - 1) * 100,
+        "Annualized Return (%)": annualized_return * 100,
+        "Annualized Volatility (%)": annualized_volatility * 100,
+        "Sharpe Ratio": annualized_return / annualized_volatility if annualized_volatility > 0 else 0,
+        "Sortino Ratio": float(sortino_ratio(daily)),
+        "Calmar Ratio": float(calmar_ratio(daily, max_drawdown)),
+        "Max Drawdown (%)": max_drawdown * 100,
+        "Max Drawdown Duration (days)": float(underwater.max()),
+    }
+    series = {
+        "equity": equity,
+        "returns": returns,
+        "rolling_sharpe": rolling_sharpe,
+        "rolling_volatility": rolling_volatility,
+        "drawdown": drawdown,
+        "rolling_drawdown": window_drawdown,
+        "underwater_days": underwater.astype(float),
+    }
+    return PnlReport(dates, scalars, series)
+
+
+def ticker_attribution(positions, close, tickers):
+    """PnL of each ticker: shares held into a date times its change in close (last close carried)."""
+    close = pd.DataFrame(close).ffill().to_numpy()
+    moves = np.diff(close, axis=0)
+    pnl = np.zeros(close.shape)
+    pnl[1:] = np.where(positions[:-1] != 0, positions[:-1] * moves, 0)
+    return {"names": list(tickers), "totals": pnl.sum(axis=0)}
+
+
+def alpha_attribution(returns, names):
+    """Standalone daily returns of each alpha's own book, as a (alphas, dates) array."""
+    returns = np.asarray(returns, dtype=float)
+    totals = np.prod(1 + np.nan_to_num(returns), axis=-1) - 1
+    return {"names": list(names), "totals": totals, "daily": returns}
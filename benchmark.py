@@ -0,0 +1,270 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+import contextlib
+import numpy as np
+import pandas as pd
+
+from alphas import Alpha, MeanReversalAlpha, PriceRatioMeanReversalAlpha, MomentumAlpha, AdaptiveRegimeAlpha
+from store import MarketDataStore
+from panel import Panel
+from trader import Trader, ENGINES
+from universe import Universe
+from utils import get_ticker_dfs
+
+BASELINE_PATH = "benchmark_baseline.json"
+ALPHAS = (MeanReversalAlpha, PriceRatioMeanReversalAlpha, MomentumAlpha, AdaptiveRegimeAlpha)
+# Entry points timed by --startup, and the packages only a network fetch should import
+STARTUP_MODULES = ("cli", "main", "runner", "service", "utils")
+NETWORK_MODULES = ("yfinance", "requests", "bs4", "lxml")
+
+
+def synthetic_universe(n_tickers, years, seed=0, start="2015-01-01"):
+    """Random-walk OHLCV frames for n_tickers over `years` of business days, no network.
+
+    About one ticker in ten lists part-way through, so the calendars are ragged like
+    real data. The same arguments always give the same universe.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=int(years * 252), name="datetime")
+    n = len(dates)
+    tickers = [f"T{j:04d}" for j in range(n_tickers)]
+    dfs = {}
+    for ticker in tickers:
+        first = int(rng.integers(0, n // 2)) if rng.random() < 0.1 else 0
+        length = n - first
+        close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, length)))
+        open_ = close * np.exp(rng.normal(0, 0.01, length))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, length)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, length)))
+        volume = np.round(rng.lognormal(14, 0.5, length))
+        dfs[ticker] = pd.DataFrame(
+            {"open": open_, "high": high, "low": low, "close": close, "volume": volume, "eligible": True},
+            index=dates[first:]
+        )
+    return tickers, dfs
+
+
+def synthetic_sp500(dfs):
+    """Equal-weight index of the universe with its 200-day moving average, shaped like get_sp500_data."""
+    close = pd.concat([df["close"] for df in dfs.values()], axis=1).mean(axis=1)
+    sp500 = pd.DataFrame({"close": close})
+    sp500["ma200"] = sp500["close"].rolling(200).mean()
+    return sp500
+
+
+def measure(fn, setup=None, repeat=3, memory=True):
+    """Best and mean wall time of fn(*setup()) over repeat runs, plus peak traced memory of one more run.
+
+    setup runs outside the timed region, so every run starts from the same state.
+    """
+    setup = setup or (lambda: ())
+    times = []
+    for _ in range(repeat):
+        args = setup()
+        began = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - began)
+    result = {"seconds": min(times), "mean_seconds": float(np.mean(times))}
+    if memory:
+        args = setup()
+        tracemalloc.start()
+        try:
+            fn(*args)
+            result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def _alpha(cls, tickers, dfs, start, end, sp500_df):
+    if cls is AdaptiveRegimeAlpha:
+        return cls(tickers, dfs, start, end, sp500_df)
+    return cls(tickers, dfs, start, end)
+
+
+def _private(alpha, run_pre=False, trade_range=None):
+    """An alpha with a private view of its price panel (as compute_uncached uses), optionally after pre_compute."""
+    panel = alpha.panel().view()
+    if run_pre:
+        alpha.pre_compute(panel, trade_range)
+    return alpha, panel
+
+
+def benchmarks(tickers, dfs, start, end, engines=ENGINES, signal_dates=50):
+    """(name, setup, fn) for every hot path, in the order they run in a backtest."""
+    sp500_df = synthetic_sp500(dfs)
+    trade_range = Universe(tickers, dfs).span(start, end)
+    combined = lambda: [cls(tickers, dfs, start, end) for cls in ALPHAS[:3]]
+
+    cases = []
+    for cls in ALPHAS:
+        make = lambda cls=cls: _alpha(cls, tickers, dfs, start, end, sp500_df)
+        if cls.pre_compute is not Alpha.pre_compute:
+            cases.append((f"{cls.__name__}.pre_compute",
+                          lambda make=make: _private(make()),
+                          lambda alpha, panel: alpha.pre_compute(panel, trade_range)))
+        cases.append((f"{cls.__name__}.post_compute",
+                      lambda make=make: _private(make(), True, trade_range),
+                      lambda alpha, panel: alpha.post_compute(panel, trade_range)))
+
+    cases.append(("Universe", None, lambda: Universe(tickers, dfs)))
+    cases.append(("Panel.from_frames", None, lambda: Panel.from_frames(dfs, tickers)))
+    cases.append(("Trader.__init__", lambda: (combined(),),
+                  lambda alphas: Trader(tickers, dfs, start, end, alphas)))
+    for engine in engines:
+        cases.append((f"Trader.run_backtest[{engine}]",
+                      lambda engine=engine: (Trader(tickers, dfs, start, end, combined(), engine=engine),),
+                      lambda trader: trader.run_backtest()))
+
+    def trader_with_dates():
+        trader = Trader(tickers, dfs, start, end, combined())
+        trader.trade_dates = trader._get_trade_dates()
+        return trader, trader.trade_dates[:signal_dates]
+
+    def trader_with_signals():
+        trader, dates = trader_with_dates()
+        return trader, [(date, trader.generate_signals(date)) for date in dates]
+
+    def trader_after_backtest():
+        trader = Trader(tickers, dfs, start, end, combined(), engine="vectorized")
+        with contextlib.redirect_stdout(io.StringIO()):
+            trader.run_backtest()
+        return (trader,)
+
+    cases.append((f"Trader.generate_signals[x{signal_dates}]", trader_with_dates,
+                  lambda trader, dates: [trader.generate_signals(date) for date in dates]))
+    cases.append((f"Trader.manage_portfolio[x{signal_dates}]", trader_with_signals,
+                  lambda trader, signals: [trader.manage_portfolio(s, date, trader.cash) for date, s in signals]))
+    cases.append(("Trader.get_pnl_stats", trader_after_backtest, lambda trader: trader.get_pnl_stats()))
+    return cases
+
+
+def run(n_tickers=30, years=10, engines=ENGINES, repeat=3, memory=True, seed=0, signal_dates=50):
+    """Run every benchmark on a synthetic universe; returns {benchmark name: measurements}."""
+    tickers, dfs = synthetic_universe(n_tickers, years, seed)
+    dates = dfs[tickers[0]].index
+    # The first year is warm-up history for the rolling windows, as in main.py
+    start, end = dates[0] + pd.DateOffset(years=1), dates[-1]
+    results = {}
+    with tempfile.TemporaryDirectory() as path:
+        with contextlib.redirect_stdout(io.StringIO()):
+            MarketDataStore(path).write(tickers, dfs)
+        cases = [("get_ticker_dfs", None,
+                  lambda: get_ticker_dfs(start, end, store_path=path))]
+        cases += benchmarks(tickers, dfs, start, end, engines, signal_dates)
+        for name, setup, fn in cases:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[name] = measure(fn, setup, repeat, memory)
+            print(f"  {name:<45} {results[name]['seconds']:9.4f}s", file=sys.stderr)
+    return results
+
+
+def startup_times(modules=STARTUP_MODULES, repeat=5):
+    """Import time of each module in a fresh interpreter (best of repeat runs).
+
+    Each result also lists the NETWORK_MODULES the import pulled in, which should be
+    none: they belong to fetches only.
+    """
+    code = ("import sys, time\n"
+            "began = time.perf_counter()\n"
+            "import {module}\n"
+            "print(time.perf_counter() - began)\n"
+            f"print(' '.join(name for name in {NETWORK_MODULES!r} if name in sys.modules))\n")
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for module in modules:
+        times = []
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, "-c", code.format(module=module)], cwd=here,
+                                    capture_output=True, text=True, check=True).stdout.splitlines()
+            times.append(float(output[0]))
+        loaded = output[1].split() if len(output) > 1 else []
+        results[f"import {module}"] = {"seconds": min(times), "mean_seconds": float(np.mean(times)),
+                                       "network_modules": loaded}
+        print(f"  import {module:<39} {min(times):9.4f}s", file=sys.stderr)
+    return results
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def compare(results, baseline, tolerance=1.5):
+    """Table of results against baseline; a benchmark regresses when it is tolerance times slower."""
+    rows = []
+    for name, result in results.items():
+        base = baseline.get(name, {})
+        ratio = result["seconds"] / base["seconds"] if base.get("seconds") else np.nan
+        rows.append({
+            "benchmark": name,
+            "seconds": result["seconds"],
+            "baseline_seconds": base.get("seconds", np.nan),
+            "ratio": ratio,
+            "peak_mb": result.get("peak_mb", np.nan),
+            "baseline_peak_mb": base.get("peak_mb", np.nan),
+            "regression": bool(ratio > tolerance),
+        })
+    return pd.DataFrame(rows).set_index("benchmark")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark alpha and backtest hot paths on a synthetic universe.")
+    parser.add_argument("--tickers", type=int, default=30)
+    parser.add_argument("--years", type=float, default=10)
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=ENGINES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--signal-dates", type=int, default=50,
+                        help="dates timed for generate_signals/manage_portfolio")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak memory run")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="slowdown ratio reported as a regression")
+    parser.add_argument("--startup", action="store_true",
+                        help="time importing the entry points in fresh interpreters instead")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        key = "startup"
+        print(f"Benchmarking startup of {', '.join(STARTUP_MODULES)} ({args.repeat} runs each)", file=sys.stderr)
+        results = startup_times(repeat=args.repeat)
+    else:
+        key = f"{args.tickers}x{args.years:g}"
+        print(f"Benchmarking {args.tickers} tickers x {args.years:g} years ({args.repeat} runs each)", file=sys.stderr)
+        results = run(args.tickers, args.years, args.engines, args.repeat, not args.no_memory,
+                      args.seed, args.signal_dates)
+
+    baselines = load_baseline(args.baseline)
+    table = compare(results, baselines.get(key, {}), args.tolerance)
+    with pd.option_context("display.width", 160, "display.max_columns", None):
+        print(table.round(4))
+
+    if args.save_baseline:
+        baselines[key] = results
+        with open(args.baseline, "w") as fp:
+            json.dump(baselines, fp, indent=2, sort_keys=True)
+        print(f"Saved baseline {key} to {args.baseline}")
+        return 0
+    failed = False
+    for name, result in results.items():
+        if result.get("network_modules"):
+            print(f"{name} imports network packages: {', '.join(result['network_modules'])}")
+            failed = True
+    if table["regression"].any():
+        print(f"Regressions: {', '.join(table.index[table['regression']])}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Command line entry point: fetch, backtest, sweep and bench subcommands.
+
+    python cli.py fetch --tickers AAPL MSFT
+    python cli.py backtest --frictionless
+    python cli.py backtest --tickers AAPL MSFT NVDA --start 2018-01-01 --end 2022-12-31
+    python cli.py backtest --engine chunked --float32 --instrument
+    python cli.py sweep --mean-reversal-window 5 10 20 --quantile 3 4 5
+    python cli.py bench --startup
+
+Only argparse is imported up front; each subcommand imports what it needs when it
+runs, and pandas/NumPy come in with it. Network packages (yfinance, requests, bs4)
+load only inside a fetch, so backtests on the local market data store never pay for
+them.
+"""
+import sys
+import argparse
+
+DEFAULT_START = "2015-01-01"
+DEFAULT_END = "2023-12-31"
+
+
+def _momentum_pairs(text):
+    """"10:50,20:100" -> ((10, 50), (20, 100))"""
+    try:
+        return tuple(tuple(int(n) for n in pair.split(":")) for pair in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected fast:slow pairs like 10:50,20:100, got {text!r}")
+
+
+def fetch(args):
+    from utils import fetch_date_range, get_ticker_dfs
+    from store import STORE_PATH
+
+    start, end = fetch_date_range(args.start, args.end)
+    tickers, _ = get_ticker_dfs(start, end, user_tickers=args.tickers, sync=True,
+                                store_path=args.store or STORE_PATH)
+    return 0 if tickers else 1
+
+
+def backtest(args):
+    from main import main
+    from results import RESULTS_PATH
+    from store import STORE_PATH
+
+    results = main(args.instrument, args.profile, args.report, args.frictionless, args.no_trade_band,
+                   None if args.no_store else args.results or RESULTS_PATH, args.engine,
+                   "float32" if args.float32 else "float64", args.chunk_size, args.tickers, args.start, args.end,
+                   args.store or STORE_PATH)
+    return 0 if results else 1
+
+
+def sweep(args):
+    import pandas as pd
+    from utils import fetch_date_range, get_ticker_dfs, get_sp500_data
+    from store import STORE_PATH
+    from sweep import STRATEGIES, SweepFeatures, param_grid, sweep as run_sweep
+
+    start, end = fetch_date_range(args.start, args.end)
+    tickers, dfs = get_ticker_dfs(start, end, user_tickers=args.tickers, store_path=args.store or STORE_PATH)
+    if not tickers:
+        print("No data available to sweep.")
+        return 1
+    strategies = args.strategies or list(STRATEGIES)
+    # The S&P 500 series is a network fetch, needed only by the regime strategy
+    sp500_df = get_sp500_data(start, end) if "Regime Switching Alpha" in strategies else None
+    axes = {
+        name: values for name, values in (
+            ("mean_reversal_window", args.mean_reversal_window),
+            ("price_ratio_window", args.price_ratio_window),
+            ("momentum_pairs", args.momentum_pairs),
+            ("ma_window", args.ma_window),
+            ("quantile", args.quantile),
+        ) if values
+    }
+    param_sets = param_grid(strategies, **axes)
+    features = SweepFeatures(tickers, dfs, start, end, sp500_df)
+
+    if args.walk_forward:
+        from walkforward import walk_forward, summarize_windows
+
+        train, test = args.walk_forward
+        results = walk_forward(features, param_sets, train, test, metric=args.metric)
+        table = summarize_windows(results)
+    else:
+        results = run_sweep(features, param_sets)
+        table = results.sort_values(args.metric, ascending=False).head(args.top)
+    with pd.option_context("display.width", 160, "display.max_columns", None):
+        print(table)
+    if args.out:
+        results.to_csv(args.out, index=False)
+        print(f"Wrote {len(results)} rows to {args.out}")
+    return 0
+
+
+def bench(args):
+    from benchmark import main
+
+    return main(args.extra)
+
+
+def build_parser():
+    # Path defaults are filled in by the subcommands, so parsing and --help import nothing heavy
+    parser = argparse.ArgumentParser(description="Fetch market data, backtest and sweep the alpha strategies.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_data_arguments(command):
+        command.add_argument("--tickers", nargs="+", default=None, help="tickers to use (default: all in the store)")
+        command.add_argument("--start", default=DEFAULT_START)
+        command.add_argument("--end", default=DEFAULT_END)
+        command.add_argument("--store", default=None, help="market data store directory (default: market_data)")
+
+    command = commands.add_parser("fetch", help="bring the market data store up to date from yfinance")
+    add_data_arguments(command)
+    command.set_defaults(run=fetch)
+
+    command = commands.add_parser("backtest", help="backtest every strategy (as main.py)")
+    add_data_arguments(command)
+    command.add_argument("--instrument", action="store_true", help="time each stage and count dates/rebalances")
+    command.add_argument("--profile", action="store_true", help="also run the sampling profiler (implies --instrument)")
+    command.add_argument("--report", default="run_report.json", help="where to write the instrumentation report")
+    command.add_argument("--frictionless", action="store_true",
+                         help="backtest without commissions, slippage or borrow costs")
+    command.add_argument("--no-trade-band", type=float, default=0.0,
+                         help="skip rebalancing a ticker whose weight is off target by less than this")
+    command.add_argument("--results", default=None, help="results store directory (default: results)")
+    command.add_argument("--no-store", action="store_true", help="always recompute and do not save results")
+    command.add_argument("--engine", default="vectorized", choices=("loop", "vectorized", "event", "chunked"),
+                         help="backtest engine; chunked holds only --chunk-size dates of arrays at a time")
+    command.add_argument("--chunk-size", type=int, default=256, help="dates per chunk of the chunked engine")
+    command.add_argument("--float32", action="store_true",
+                         help="store price and alpha arrays in float32 (half the memory, ~1e-3 relative equity)")
+    command.set_defaults(run=backtest)
+
+    command = commands.add_parser("sweep", help="backtest a grid of strategy parameters")
+    add_data_arguments(command)
+    command.add_argument("--strategies", nargs="+", default=None, help="strategy names (default: all)")
+    command.add_argument("--mean-reversal-window", nargs="+", type=int)
+    command.add_argument("--price-ratio-window", nargs="+", type=int)
+    command.add_argument("--momentum-pairs", nargs="+", type=_momentum_pairs, help="e.g. 10:50,20:100")
+    command.add_argument("--ma-window", nargs="+", type=int)
+    command.add_argument("--quantile", nargs="+", type=int)
+    command.add_argument("--metric", default="Sharpe Ratio", help="statistic to rank (or select) parameter sets by")
+    command.add_argument("--top", type=int, default=20, help="rows of the ranked sweep to print")
+    command.add_argument("--walk-forward", nargs=2, type=int, metavar=("TRAIN", "TEST"),
+                         help="walk forward with train/test windows of this many dates")
+    command.add_argument("--out", default=None, help="write every result row to this CSV file")
+    command.set_defaults(run=sweep)
+
+    # Every other argument goes to benchmark.py
+    command = commands.add_parser("bench", help="run benchmark.py (--startup times the imports)", add_help=False)
+    command.set_defaults(run=bench)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, args.extra = parser.parse_known_args(argv)
+    if args.extra and args.run is not bench:
+        parser.error(f"unrecognized arguments: {' '.join(args.extra)}")
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import numpy as np
+
+TRADING_DAYS = 252
+
+
+class CostModel:
+    """Cash charged for trading and for holding positions.
+
+    Models work on whole arrays of any matching shape, one date's trade vector or a
+    dates x tickers trade matrix alike:
+        trade_cost(shares, price, volume)  cost of each trade; shares are signed
+        holding_cost(shares, price)        daily carry of the positions held
+    Costs are positive amounts of cash. Models combine with +.
+    """
+
+    def trade_cost(self, shares, price, volume):
+        return np.zeros(np.shape(shares))
+
+    def holding_cost(self, shares, price):
+        return np.zeros(np.shape(shares))
+
+    def __add__(self, other):
+        return CompositeCost([self, other])
+
+
+class CompositeCost(CostModel):
+    def __init__(self, models):
+        self.models = []
+        for model in models:
+            self.models.extend(model.models if isinstance(model, CompositeCost) else [model])
+
+    def trade_cost(self, shares, price, volume):
+        return sum((model.trade_cost(shares, price, volume) for model in self.models),
+                   np.zeros(np.shape(shares)))
+
+    def holding_cost(self, shares, price):
+        return sum((model.holding_cost(shares, price) for model in self.models), np.zeros(np.shape(shares)))
+
+
+class PerShareCommission(CostModel):
+    """rate per share traded, at least minimum per trade."""
+
+    def __init__(self, rate=0.005, minimum=0.0):
+        self.rate = rate
+        self.minimum = minimum
+
+    def trade_cost(self, shares, price, volume):
+        traded = np.abs(shares)
+        return np.where(traded > 0, np.maximum(traded * self.rate, self.minimum), 0)
+
+
+class BpsCommission(CostModel):
+    """bps basis points of the traded notional."""
+
+    def __init__(self, bps=1.0):
+        self.bps = bps
+
+    def trade_cost(self, shares, price, volume):
+        return np.where(shares != 0, np.abs(shares * price) * self.bps / 1e4, 0)
+
+
+class VolumeSlippage(CostModel):
+    """Half the quoted spread plus square-root market impact on the traded notional.
+
+    Impact is impact * sqrt(|shares| / volume) of the notional, so trading a larger
+    share of the day's volume costs more; without a usable volume the trade is
+    charged as if it were the whole day's volume.
+    """
+
+    def __init__(self, spread_bps=5.0, impact=0.02):
+        self.spread_bps = spread_bps
+        self.impact = impact
+
+    def trade_cost(self, shares, price, volume):
+        traded = np.abs(shares)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            participation = np.where(volume > 0, traded / volume, 1.0)
+        rate = self.spread_bps / 2 / 1e4 + self.impact * np.sqrt(np.minimum(participation, 1.0))
+        return np.where(traded > 0, traded * price * rate, 0)
+
+
+class BorrowCost(CostModel):
+    """annual_bps basis points a year on the short notional, charged per trading day."""
+
+    def __init__(self, annual_bps=50.0):
+        self.annual_bps = annual_bps
+
+    def holding_cost(self, shares, price):
+        return np.where(shares < 0, -shares * price * self.annual_bps / 1e4 / TRADING_DAYS, 0)
+
+
+def default_cost_model():
+    """A plain retail-broker setup: 1bp commission, 5bp spread with impact, 50bp a year to borrow."""
+    return BpsCommission(1.0) + VolumeSlippage(5.0, 0.02) + BorrowCost(50.0)
+
+
+def as_cost_model(costs):
+    """None, a CostModel or a list of them -> a CostModel (or None for no costs)."""
+    if costs is None or isinstance(costs, CostModel):
+        return costs
+    return CompositeCost(list(costs))
@@ -0,0 +1,144 @@
+import threading
+import pandas as pd
+from datetime import datetime
+from typing import List, Dict
+
+from fetch import FetchPool
+
+HISTORY_COLUMNS = {
+    "Date": "datetime",
+    "Datetime": "datetime",
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Volume": "volume"
+}
+
+
+def normalize_history(df: pd.DataFrame) -> pd.DataFrame:
+    """yfinance history frame -> datetime-indexed open/high/low/close/volume/eligible."""
+    df = df.reset_index().rename(columns=HISTORY_COLUMNS)
+    df = df.drop(columns=["Dividends", "Stock Splits", "Capital Gains"], errors="ignore")
+    # Normalize to date-only and remove timezone
+    datetimes = pd.to_datetime(df["datetime"])
+    if datetimes.dt.tz is not None:
+        datetimes = datetimes.dt.tz_localize(None)
+    df["datetime"] = datetimes.dt.normalize()
+    df = df.set_index("datetime", drop=True)
+    df = df[["open", "high", "low", "close", "volume"]]
+    df["eligible"] = True
+    return df
+
+
+class DataSource:
+    """Where daily bars come from.
+
+    fetch returns a DataFrame indexed by naive, date-only timestamps with
+    open/high/low/close/volume/eligible columns for [start, end) (end exclusive,
+    as in yfinance), an empty DataFrame when there is no data, and raises on
+    transient errors so the fetch pool can retry. Sources that can serve several
+    tickers in one request also implement fetch_batch.
+    """
+
+    pool_options = {}
+
+    def fetch(self, ticker: str, start: datetime, end: datetime, granularity: str = "1d") -> pd.DataFrame:
+        raise NotImplementedError
+
+    def fetch_many(self, tickers: List[str], starts: List[datetime], ends: List[datetime],
+                   granularity: str = "1d") -> Dict[str, pd.DataFrame]:
+        pool = FetchPool(self, **self.pool_options)
+        frames = pool.fetch(tickers, starts, ends, granularity)
+        self.last_fetch_stats = pool.stats
+        summary = pool.summary()
+        print(f"Fetched {summary['fetched']}/{summary['tickers']} tickers in {summary['attempts']} attempts "
+              f"(mean {summary['mean_seconds']:.2f}s, max {summary['max_seconds']:.2f}s per ticker)")
+        if summary["failed"]:
+            print(f"Failed to fetch: {', '.join(summary['failed'])}")
+        return frames
+
+
+# Pool settings for live yfinance fetches: 8 workers, at most 4 requests a second, 20 tickers a batch
+YFINANCE_POOL = {"max_workers": 8, "rate": 4.0, "batch_size": 20}
+
+
+class YFinanceSource(DataSource):
+    def __init__(self, **pool_options):
+        # e.g. max_workers, max_attempts, backoff, rate (requests/second), batch_size
+        self.pool_options = pool_options
+
+    def fetch(self, ticker, start, end, granularity="1d"):
+        import yfinance
+
+        df = yfinance.Ticker(ticker).history(start=start, end=end, interval=granularity,
+                                             auto_adjust=True, raise_errors=True)
+        if df.empty:
+            return pd.DataFrame()
+        return normalize_history(df)
+
+    def fetch_batch(self, tickers, start, end, granularity="1d"):
+        import yfinance
+
+        data = yfinance.download(tickers, start=start, end=end, interval=granularity, auto_adjust=True,
+                                 group_by="ticker", threads=False, progress=False)
+        frames = {}
+        if data is None or data.empty:
+            return frames
+        for ticker in tickers:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                df = data[ticker]
+            else:
+                df = data
+            df = df.dropna(how="all")
+            if not df.empty:
+                frames[ticker] = normalize_history(df)
+        return frames
+
+
+def default_source() -> YFinanceSource:
+    """The yfinance source every live fetch path uses, throttled by YFINANCE_POOL."""
+    return YFinanceSource(**YFINANCE_POOL)
+
+
+class FrameSource(DataSource):
+    """Serves bars from in-memory DataFrames; stands in for yfinance offline and in tests.
+
+    Every request is recorded in self.requests as (tickers, start, end). failures maps
+    a ticker to how many requests for it should raise before it is served.
+    """
+
+    def __init__(self, ticker_dfs: Dict[str, pd.DataFrame], failures: Dict[str, int] = None, **pool_options):
+        self.ticker_dfs = ticker_dfs
+        self.failures = dict(failures or {})
+        self.requests = []
+        self.pool_options = {"sleep": lambda seconds: None, **pool_options}
+        self._lock = threading.Lock()
+
+    def _slice(self, ticker, start, end):
+        with self._lock:
+            failing = self.failures.get(ticker, 0) > 0
+            if failing:
+                self.failures[ticker] -= 1
+        if failing:
+            raise ConnectionError(f"simulated failure for {ticker}")
+        df = self.ticker_dfs.get(ticker)
+        if df is None:
+            return pd.DataFrame()
+        df = df[(df.index >= pd.Timestamp(start)) & (df.index < pd.Timestamp(end))].copy()
+        if "eligible" not in df.columns:
+            df["eligible"] = True
+        return df
+
+    def fetch(self, ticker, start, end, granularity="1d"):
+        with self._lock:
+            self.requests.append(((ticker,), pd.Timestamp(start), pd.Timestamp(end)))
+        return self._slice(ticker, start, end)
+
+    def fetch_batch(self, tickers, start, end, granularity="1d"):
+        with self._lock:
+            self.requests.append((tuple(tickers), pd.Timestamp(start), pd.Timestamp(end)))
+        frames = {ticker: self._slice(ticker, start, end) for ticker in tickers}
+        return {ticker: df for ticker, df in frames.items() if not df.empty}
@@ -0,0 +1,144 @@
+import time
+import random
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
+
+
+class RateLimiter:
+    """Spaces requests at least 1 / rate seconds apart across all worker threads."""
+
+    def __init__(self, rate: Optional[float] = None, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.clock = clock
+        self.sleep = sleep
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = self.clock()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            self.sleep(wait)
+
+
+class FetchPool:
+    """Bounded, rate-limited fetching of many tickers from a DataSource.
+
+    Tickers sharing a date span are grouped into batches of batch_size when the
+    source implements fetch_batch; otherwise each ticker is one request. Failed
+    requests are retried up to max_attempts times with exponential backoff. Tickers
+    a successful batch omitted fall back to per-ticker requests; when the batch
+    itself keeps failing, its tickers keep the batch error instead (asking for each
+    one would only multiply the requests against a failing or throttling source).
+    Per-ticker attempts, time, rows and last error are kept in self.stats.
+    """
+
+    def __init__(self, source, max_workers: int = 8, max_attempts: int = 3, backoff: float = 0.5,
+                 max_backoff: float = 8.0, jitter: float = 0.1, rate: Optional[float] = None,
+                 batch_size: int = 20, sleep=time.sleep):
+        self.source = source
+        self.max_workers = max(1, max_workers)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.batch_size = max(1, batch_size)
+        self.sleep = sleep
+        self.limiter = RateLimiter(rate, sleep=sleep)
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def _record(self, ticker, seconds, attempts, rows=None, error=None):
+        with self._lock:
+            stat = self.stats.setdefault(ticker, {"attempts": 0, "seconds": 0.0, "rows": 0, "error": None})
+            stat["attempts"] += attempts
+            stat["seconds"] += seconds
+            if rows is not None:
+                stat["rows"] = rows
+                stat["error"] = None
+            if error is not None:
+                stat["error"] = error
+
+    def _with_retries(self, request):
+        """Run request() with backoff; returns (result, attempts, last error)."""
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            self.limiter.acquire()
+            try:
+                return request(), attempt, None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempt < self.max_attempts:
+                    delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+                    self.sleep(delay * (1 + self.jitter * random.random()))
+        return None, self.max_attempts, error
+
+    def _fetch_one(self, ticker, start, end, granularity):
+        began = time.perf_counter()
+        df, attempts, error = self._with_retries(lambda: self.source.fetch(ticker, start, end, granularity))
+        seconds = time.perf_counter() - began
+        if df is None:
+            self._record(ticker, seconds, attempts, error=error)
+            return {}
+        self._record(ticker, seconds, attempts, rows=len(df))
+        return {ticker: df}
+
+    def _fetch_batch(self, tickers, start, end, granularity):
+        began = time.perf_counter()
+        frames, attempts, error = self._with_retries(
+            lambda: self.source.fetch_batch(tickers, start, end, granularity)
+        )
+        seconds = (time.perf_counter() - began) / len(tickers)
+        results = {}
+        missing = []
+        for ticker in tickers:
+            df = None if frames is None else frames.get(ticker)
+            if df is None or df.empty:
+                self._record(ticker, seconds, attempts, error=error)
+                missing.append(ticker)
+            else:
+                self._record(ticker, seconds, attempts, rows=len(df))
+                results[ticker] = df
+        if frames is None:
+            return results
+        # Batch endpoints drop tickers silently, so anything missing is asked for on its own
+        for ticker in missing:
+            results.update(self._fetch_one(ticker, start, end, granularity))
+        return results
+
+    def fetch(self, tickers: List[str], starts, ends, granularity: str = "1d") -> Dict[str, pd.DataFrame]:
+        """Fetch every ticker's [start, end) bars; tickers that fail or return nothing are left out."""
+        units = []
+        if hasattr(self.source, "fetch_batch") and self.batch_size > 1:
+            spans = {}
+            for ticker, start, end in zip(tickers, starts, ends):
+                spans.setdefault((start, end), []).append(ticker)
+            for (start, end), names in spans.items():
+                for i in range(0, len(names), self.batch_size):
+                    units.append((self._fetch_batch, names[i:i + self.batch_size], start, end))
+        else:
+            units = [(self._fetch_one, ticker, start, end) for ticker, start, end in zip(tickers, starts, ends)]
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, len(units)))) as pool:
+            for frames in pool.map(lambda unit: unit[0](*unit[1:], granularity), units):
+                results.update({ticker: df for ticker, df in frames.items() if not df.empty})
+        return results
+
+    def summary(self) -> dict:
+        failed = sorted(ticker for ticker, stat in self.stats.items() if stat["error"] and not stat["rows"])
+        seconds = [stat["seconds"] for stat in self.stats.values()]
+        return {
+            "tickers": len(self.stats),
+            "fetched": sum(1 for stat in self.stats.values() if stat["rows"]),
+            "failed": failed,
+            "attempts": sum(stat["attempts"] for stat in self.stats.values()),
+            "max_seconds": max(seconds, default=0.0),
+            "mean_seconds": sum(seconds) / len(seconds) if seconds else 0.0,
+        }
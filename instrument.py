@@ -0,0 +1,197 @@
+import sys
+import time
+import threading
+from collections import Counter
+
+MAX_EVENTS = 100
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "began")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.began = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_time(self.name, time.perf_counter() - self.began)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Instrumentation:
+    """Stage timers, counters and notable events for one run.
+
+        with metrics.stage("signals"):
+            ...
+        metrics.count("rebalances")
+
+    report() returns everything as plain JSON-serializable dicts. Pass a profiler
+    (e.g. SamplingProfiler) to have it run between start() and stop() (or report(),
+    which stops it too).
+    """
+
+    enabled = True
+
+    def __init__(self, profiler=None):
+        self.timings = {}
+        self.counters = Counter()
+        self.events = []
+        self.profiler = profiler
+        self.profile = None
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def add_time(self, name, seconds, calls=1):
+        timing = self.timings.get(name)
+        if timing is None:
+            self.timings[name] = [seconds, calls]
+        else:
+            timing[0] += seconds
+            timing[1] += calls
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def event(self, kind, message, **fields):
+        """Record a notable occurrence (kept up to MAX_EVENTS; the rest are only counted)."""
+        self.counters[f"events.{kind}"] += 1
+        if len(self.events) < MAX_EVENTS:
+            self.events.append({"kind": kind, "message": message, **fields})
+
+    def start(self):
+        if self.profiler is not None:
+            self.profiler.start()
+        return self
+
+    def stop(self):
+        """Stop the profiler and keep its samples; safe to call more than once."""
+        if self.profiler is not None and self.profile is None:
+            self.profile = self.profiler.stop()
+        return self
+
+    def report(self):
+        self.stop()
+        report = {
+            "stages": {
+                name: {"seconds": seconds, "calls": calls}
+                for name, (seconds, calls) in self.timings.items()
+            },
+            "counters": dict(self.counters),
+            "events": list(self.events),
+        }
+        if self.profile is not None:
+            report["profile"] = self.profile
+        return report
+
+
+class NullInstrumentation:
+    """Stand-in used when instrumentation is off: every call is a no-op."""
+
+    enabled = False
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+    def add_time(self, name, seconds, calls=1):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+    def event(self, kind, message, **fields):
+        pass
+
+    def start(self):
+        return self
+
+    def stop(self):
+        return self
+
+    def report(self):
+        return {}
+
+
+NULL_METRICS = NullInstrumentation()
+
+
+class SamplingProfiler:
+    """Statistical profiler: a daemon thread samples one thread's stack every interval seconds.
+
+    Only the standard library is used, and the sampled thread runs untouched between
+    samples, so the overhead is set by interval. stop() returns the functions seen
+    most often, both on top of the stack (self) and anywhere in it (cumulative).
+    """
+
+    def __init__(self, interval=0.005, top=25):
+        self.interval = interval
+        self.top = top
+        self.samples = 0
+        self.self_counts = Counter()
+        self.cumulative_counts = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _sample(self, target):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.self_counts[self._label(frame)] += 1
+            seen = set()
+            while frame is not None:
+                label = self._label(frame)
+                if label not in seen:
+                    seen.add(label)
+                    self.cumulative_counts[label] += 1
+                frame = frame.f_back
+
+    @staticmethod
+    def _label(frame):
+        code = frame.f_code
+        return f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, args=(threading.get_ident(),), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        share = lambda count: count / self.samples if self.samples else 0.0
+        return {
+            "interval": self.interval,
+            "samples": self.samples,
+            "self": [[label, count, share(count)] for label, count in self.self_counts.most_common(self.top)],
+            "cumulative": [
+                [label, count, share(count)] for label, count in self.cumulative_counts.most_common(self.top)
+            ],
+        }
+
+
+def make_metrics(instrument=False, profile=False):
+    """Instrumentation for one run: NULL_METRICS unless instrument or profile is set."""
+    if not (instrument or profile):
+        return NULL_METRICS
+    return Instrumentation(SamplingProfiler() if profile else None).start()
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+
+class TradeLedger:
+    """Append-only columnar record of executed trades.
+
+    One preallocated NumPy array per column (date, ticker index, shares traded,
+    price, cost = shares * price, position after the trade, fee charged by the cost
+    model), doubled when full, so recording a whole rebalance is a handful of slice
+    assignments and a trade takes 52 bytes. Tickers are stored as indices into the trader's ticker list.
+
+    With max_rows the ledger keeps (at least) the max_rows most recent trades and
+    drops older ones in batches, so its memory stays bounded on an endless stream;
+    the positions left by the dropped trades are carried into positions().
+    """
+
+    COLUMNS = (
+        ("date", "datetime64[ns]"),
+        ("ticker", np.int32),
+        ("shares", np.float64),
+        ("price", np.float64),
+        ("cost", np.float64),
+        ("position", np.float64),
+        ("fee", np.float64),
+    )
+
+    def __init__(self, capacity=1024, max_rows=None):
+        self.size = 0
+        self.max_rows = max_rows
+        self.columns = {name: np.empty(max(1, capacity), dtype=dtype) for name, dtype in self.COLUMNS}
+        # Date of the last dropped trade and {ticker index: position} after the dropped trades
+        self.carried_date = None
+        self.carried = {}
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, n):
+        if self.max_rows is not None and self.size + n > 2 * self.max_rows:
+            self._drop(min(self.size, self.size + n - self.max_rows))
+        capacity = len(self.columns["ticker"])
+        if self.size + n <= capacity:
+            return
+        while capacity < self.size + n:
+            capacity *= 2
+        for name, values in self.columns.items():
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[:self.size] = values[:self.size]
+            self.columns[name] = grown
+
+    def _drop(self, k):
+        """Forget the k oldest trades, keeping the positions they leave behind."""
+        if not k:
+            return
+        tickers = self.columns["ticker"][:k]
+        positions = self.columns["position"][:k]
+        last = pd.Series(positions, index=tickers)
+        last = last[~last.index.duplicated(keep="last")]
+        self.carried.update(zip(last.index.tolist(), last.tolist()))
+        self.carried_date = self.columns["date"][k - 1]
+        for values in self.columns.values():
+            values[:self.size - k] = values[k:self.size]
+        self.size -= k
+
+    def record(self, dates, tickers, shares, price, position, fee=0.0):
+        """Append trades; tickers, shares, price and position are aligned arrays and dates is
+        one date (a single rebalance) or an aligned array of dates."""
+        n = len(tickers)
+        if not n:
+            return
+        self._reserve(n)
+        rows = slice(self.size, self.size + n)
+        columns = self.columns
+        columns["date"][rows] = pd.Timestamp(dates).to_datetime64() if np.ndim(dates) == 0 \
+            else pd.DatetimeIndex(dates).values
+        columns["ticker"][rows] = tickers
+        columns["shares"][rows] = shares
+        columns["price"][rows] = price
+        columns["cost"][rows] = shares * price
+        columns["position"][rows] = position
+        columns["fee"][rows] = fee
+        self.size += n
+
+    def column(self, name):
+        return self.columns[name][:self.size]
+
+    def clear(self):
+        self.size = 0
+        self.carried_date = None
+        self.carried = {}
+
+    def to_frame(self, tickers):
+        """All trades as a DataFrame with ticker names, in the order they were executed."""
+        frame = pd.DataFrame({name: self.column(name) for name, _ in self.COLUMNS})
+        frame["ticker"] = np.asarray(tickers, dtype=object)[frame["ticker"].to_numpy()] if len(frame) \
+            else pd.Series(dtype=object)
+        return frame
+
+    def positions(self, tickers, dates=None):
+        """Shares held per ticker after each trade date (dates x tickers, 0 when flat).
+
+        With dates, the positions are carried forward onto that calendar instead.
+        """
+        frame = pd.DataFrame({
+            "date": self.column("date"),
+            "ticker": self.column("ticker"),
+            "position": self.column("position"),
+        })
+        if self.carried:
+            # Positions left by trades dropped under max_rows open the history
+            carried = pd.DataFrame({"date": self.carried_date, "ticker": list(self.carried),
+                                    "position": list(self.carried.values())})
+            frame = pd.concat([carried, frame], ignore_index=True)
+        held = frame.drop_duplicates(["date", "ticker"], keep="last") \
+            .pivot(index="date", columns="ticker", values="position")
+        held = held.reindex(columns=range(len(tickers)))
+        held.columns = list(tickers)
+        if dates is not None:
+            held = held.reindex(held.index.union(pd.DatetimeIndex(dates))).ffill().reindex(dates)
+        else:
+            held = held.ffill()
+        held.index.name = "datetime"
+        return held.fillna(0.0)
@@ -1,72 +1,84 @@
+import sys
+import json
 import pandas as pd
 from datetime import datetime
 from utils import get_ticker_dfs, get_sp500_data, fetch_date_range
-from alphas import MeanReversalAlpha, PriceRatioMeanReversalAlpha, MomentumAlpha, AdaptiveRegimeAlpha
-from trader import Trader
+from alpha_cache import AlphaCache
+from instrument import make_metrics
+from costs import default_cost_model
+from runner import STRATEGY_NAMES, run_strategies, build_strategies, pool_workers
+from results import ResultStore, RESULTS_PATH
+from store import STORE_PATH
 
-start, end = fetch_date_range(
-    '2015-01-01', '2023-12-31'
-)
 
-sp500_df = get_sp500_data(start, end)
-tickers, dfs = get_ticker_dfs(start, end)           # Include user_tickers here in arguemnt as fetched from front-end
+def main(instrument=False, profile=False, report_path=None, frictionless=False, no_trade_band=0.0,
+         results_path=RESULTS_PATH, engine="vectorized", dtype="float64", chunk_size=256, tickers=None,
+         start_date="2015-01-01", end_date="2023-12-31", store_path=STORE_PATH):
+    date_range = fetch_date_range(start_date, end_date)
+    if isinstance(date_range, str):
+        print(date_range)
+        return []
+    start, end = date_range
 
-if not tickers or not dfs:
-    print("No data available to proceed with backtest.")
-else:
-    alpha1 = MeanReversalAlpha(tickers, dfs, start, end, name="MeanReversalAlpha")
-    alpha2 = PriceRatioMeanReversalAlpha(tickers, dfs, start, end, name="PriceRatioMeanAlpha")
-    alpha3 = MomentumAlpha(tickers, dfs, start, end, name="MomentumAlpha")
-    regime_alpha = AdaptiveRegimeAlpha(tickers, dfs, start, end, sp500_df, name="regime_switching")
+    metrics = make_metrics(instrument, profile)
+    try:
+        with metrics.stage("data_loading"):
+            sp500_df = get_sp500_data(start, end)
+            tickers, dfs = get_ticker_dfs(start, end, user_tickers=tickers, store_path=store_path)
 
-    strategies = {
-        "MeanReversalAlpha": [alpha1],
-        "PriceRatioMeanAlpha": [alpha2],
-        "MomentumAlpha": [alpha3],
-        "Combined Alpha": [alpha1, alpha2, alpha3],
-        "Regime Switching Alpha": [regime_alpha]
-    }
+        if not tickers or not dfs:
+            print("No data available to proceed with backtest.")
+            return []
 
-    all_strategy_results = []
-    results = {}
+        # Run in this process, the strategies share one cache and every alpha signal is computed
+        # once. Pool workers rebuild their alphas against a cache of their own, so a parent cache
+        # would never be read there
+        cache = AlphaCache() if pool_workers(None, len(STRATEGY_NAMES)) == 1 else None
+        strategies = build_strategies(tickers, dfs, start, end, sp500_df, cache=cache)
 
-    for strategy_name, alphas in strategies.items():
-        print(f"\n=== Running {strategy_name} Backtest ===")
-        trader = Trader(tickers, dfs, start, end, alphas)
-        trader.run_backtest()
-        if trader.equity:
-            results[strategy_name] = trader.get_pnl_stats()
-        else:
-            results[strategy_name] = {"error": "No equity data generated"}
+        # With several CPUs the strategies run in a process pool; price data reaches the workers
+        # through shared memory
+        costs = None if frictionless else default_cost_model()
+        # Repeated runs come back from the results store; instrumented runs always recompute
+        store = ResultStore(results_path) if results_path and not metrics.enabled else None
+        all_strategy_results = run_strategies(strategies, tickers, dfs, start, end,
+                                              engine=engine, instrument=instrument, profile=profile,
+                                              costs=costs, no_trade_band=no_trade_band, store=store,
+                                              dtype=dtype, chunk_size=chunk_size)
 
-    for strategy, stats in results.items():
-
-        strategy_dict = {"strategy_name": strategy}
-
-        print(f"\n=== {strategy} Results ===")
-        if "error" in stats:
-            print(stats["error"])
-            strategy_dict["error"] = stats["error"]
-        else:
-            final_equity = stats['Equity Curve'].iloc[-1]
-            print(f"Final Portfolio Equity: ${final_equity:,.2f}")
+        for strategy_dict in all_strategy_results:
+            print(f"\n=== {strategy_dict['strategy_name']} Results ===")
+            if "error" in strategy_dict:
+                print(strategy_dict["error"])
+                continue
+            print(f"Final Portfolio Equity: ${strategy_dict['final_equity']:,.2f}")
+            print("PnL Statistics:")
+            for key, value in strategy_dict["statistics"].items():
+                print(f"{key}: {value:.2f}")
 
-            strategy_dict["final_equity"] = float(final_equity)
+        if metrics.enabled and report_path:
+            report = {
+                "run": metrics.report(),
+                "strategies": {
+                    strategy_dict["strategy_name"]: strategy_dict.get("instrumentation", {})
+                    for strategy_dict in all_strategy_results
+                },
+            }
+            with open(report_path, "w") as fp:
+                json.dump(report, fp, indent=2, default=str)
+            print(f"\nWrote instrumentation report to {report_path}")
 
-            print("PnL Statistics:")
+        return all_strategy_results
+    finally:
+        # The profiler samples on a thread of its own: stop it whether or not a report is written
+        metrics.stop()
 
-            stats_dict = {}
-            for key, value in stats.items():
-                if isinstance(value, (int, float)):
-                    print(f"{key}: {value:.2f}")
-                    stats_dict[key] = float(value)
-                elif key not in ["Daily Returns", "Cumulative Returns", "Equity Curve"]:
-                    print(f"{key}: {value}")
-                    stats_dict[key] = float(value)
 
-            strategy_dict["statistics"] = stats_dict
+if __name__ == "__main__":
+    # Same flags as `python cli.py backtest`
+    from cli import main as cli_main
 
-        all_strategy_results.append(strategy_dict)
+    sys.exit(cli_main(["backtest", *sys.argv[1:]]))
 
 # print(all_strategy_results)
 # all_strategy_results --> required for front-end output integration
@@ -0,0 +1,105 @@
+import numpy as np
+
+
+def _valid(values, mask):
+    valid = ~np.isnan(values)
+    if mask is not None:
+        valid &= mask
+    return valid
+
+
+def zscore(panel, mask=None):
+    """Cross-sectional z-score along the last axis (population std), skipping NaN.
+
+    panel is a (..., tickers) array, e.g. one date's values or a dates x tickers
+    panel. Entries that are NaN or outside mask take no part in the mean and std and
+    come back NaN. Rows without dispersion map to 0, like the original
+    MeanReversalAlpha lambda.
+    """
+    values = np.asarray(panel, dtype=float)
+    valid = _valid(values, mask)
+    counts = np.maximum(valid.sum(axis=-1, keepdims=True), 1)
+    mean = np.where(valid, values, 0).sum(axis=-1, keepdims=True) / counts
+    deviation = np.where(valid, values - mean, 0)
+    std = np.sqrt((deviation ** 2).sum(axis=-1, keepdims=True) / counts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(std > 0, deviation / std, 0)
+    return np.where(valid, scores, np.nan)
+
+
+def _sorted_rows(values, valid):
+    """(order, sorted values, counts): each row sorted ascending with invalid entries last."""
+    keyed = np.where(valid, values, np.inf)
+    order = np.argsort(keyed, axis=-1, kind="stable")
+    return order, np.take_along_axis(keyed, order, axis=-1), valid.sum(axis=-1, keepdims=True)
+
+
+def rank(panel, mask=None, pct=True):
+    """Cross-sectional rank along the last axis, ties sharing their average rank.
+
+    Ranks run from 1 to the number of valid entries in the row, or over (0, 1] with
+    pct (pandas rank(pct=True) semantics). NaN and masked entries come back NaN.
+    """
+    values = np.asarray(panel, dtype=float)
+    valid = _valid(values, mask)
+    order, ordered, counts = _sorted_rows(values, valid)
+    positions = np.broadcast_to(np.arange(values.shape[-1]), values.shape)
+    # A tie group runs from the first to the last position holding its value
+    starts = np.ones(values.shape, dtype=bool)
+    starts[..., 1:] = ordered[..., 1:] != ordered[..., :-1]
+    ends = np.ones(values.shape, dtype=bool)
+    ends[..., :-1] = starts[..., 1:]
+    first = np.maximum.accumulate(np.where(starts, positions, 0), axis=-1)
+    last = np.flip(np.minimum.accumulate(np.flip(np.where(ends, positions, values.shape[-1]), axis=-1), axis=-1),
+                   axis=-1)
+    ranks = np.empty(values.shape)
+    np.put_along_axis(ranks, order, (first + last) / 2 + 1, axis=-1)
+    if pct:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ranks = ranks / counts
+    return np.where(valid, ranks, np.nan)
+
+
+def winsorize(panel, mask=None, limit=0.01):
+    """Clip each row to its [limit, 1 - limit] quantiles (linear interpolation), skipping NaN.
+
+    NaN and masked entries come back NaN.
+    """
+    values = np.asarray(panel, dtype=float)
+    valid = _valid(values, mask)
+    _, ordered, counts = _sorted_rows(values, valid)
+    last = np.maximum(counts - 1, 0)
+
+    def quantile(q):
+        position = q * last
+        below = np.floor(position).astype(int)
+        above = np.minimum(below + 1, last)
+        low = np.take_along_axis(ordered, below, axis=-1)
+        high = np.take_along_axis(ordered, above, axis=-1)
+        return low + (high - low) * (position - below)
+
+    # Rows without valid entries get NaN bounds, which only touch entries masked out below
+    with np.errstate(invalid="ignore"):
+        clipped = np.clip(values, quantile(limit), quantile(1 - limit))
+    return np.where(valid, clipped, np.nan)
+
+
+def winsorized_zscore(panel, mask=None, limit=0.01):
+    """zscore of the panel after winsorizing each row at the limit quantiles."""
+    return zscore(winsorize(panel, mask, limit), mask)
+
+
+METHODS = {
+    "zscore": zscore,
+    "rank": rank,
+    "winsorized_zscore": winsorized_zscore,
+}
+
+
+def normalize(panel, method="zscore", mask=None, **kwargs):
+    """Cross-sectionally normalize panel with one of METHODS."""
+    try:
+        fn = METHODS[method]
+    except KeyError:
+        raise ValueError(f"Unknown normalization {method!r}; choose from {', '.join(METHODS)}")
+    return fn(panel, mask, **kwargs)
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from universe import Universe
+
+PRICE_FIELDS = ("open", "high", "low", "close", "volume", "eligible")
+
+
+class Panel:
+    """Named dates x tickers arrays sharing one date index and ticker list.
+
+    Each field (a price column or an alpha) is one contiguous array, so a date's
+    cross-section is a single row read and memory is len(dates) * len(tickers) *
+    itemsize per field. available marks the (date, ticker) cells where the ticker
+    has a row; other cells hold NaN in fields built from frames.
+    """
+
+    def __init__(self, dates, tickers, fields=None, available=None, dtype=np.float64):
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = list(tickers)
+        self.dtype = np.dtype(dtype)
+        self.shape = (len(self.dates), len(self.tickers))
+        self.available = np.ones(self.shape, dtype=bool) if available is None else available
+        self.fields = {}
+        for name, values in (fields or {}).items():
+            self[name] = values
+
+    @classmethod
+    def from_frames(cls, dfs, tickers, dates=None, fields=PRICE_FIELDS, dtype=np.float64, universe=None):
+        """Gather fields of per-ticker frames onto dates (their master calendar by default).
+
+        A universe.Universe covering tickers supplies the calendar and each ticker's
+        rows, so nothing is looked up date by date.
+        """
+        if universe is None and dates is None:
+            universe = Universe(tickers, dfs)
+        on_calendar = dates is None
+        dates = universe.dates if on_calendar else pd.DatetimeIndex(dates)
+        rows = None if on_calendar or universe is None else universe.rows(dates)
+        shape = (len(dates), len(tickers))
+        available = np.zeros(shape, dtype=bool)
+        arrays = {field: np.full(shape, np.nan, dtype=dtype) for field in fields}
+        for j, ticker in enumerate(tickers):
+            df = dfs[ticker]
+            if on_calendar:
+                # Every bar has its own master row
+                found, taken = universe.positions[universe.index[ticker]], slice(None)
+            else:
+                frame_rows = df.index.get_indexer(dates) if universe is None \
+                    else universe.frame_rows(rows, universe.index[ticker])
+                found = frame_rows >= 0
+                taken = frame_rows[found]
+            available[found, j] = True
+            for field in fields:
+                arrays[field][found, j] = df[field].to_numpy(dtype=float)[taken]
+        panel = cls(dates, tickers, available=available, dtype=dtype)
+        panel.fields = arrays
+        return panel
+
+    def __getitem__(self, name):
+        return self.fields[name]
+
+    def __setitem__(self, name, values):
+        values = np.asarray(values, dtype=self.dtype)
+        if values.shape != self.shape:
+            raise ValueError(f"Field {name!r} has shape {values.shape}, panel is {self.shape}")
+        self.fields[name] = values
+
+    def __contains__(self, name):
+        return name in self.fields
+
+    def keys(self):
+        return self.fields.keys()
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.fields.values()) + self.available.nbytes
+
+    def view(self):
+        """A panel sharing these arrays, whose own new fields do not reach this one."""
+        panel = type(self)(self.dates, self.tickers, available=self.available, dtype=self.dtype)
+        panel.fields = dict(self.fields)
+        return panel
+
+    def rows(self, dates):
+        """Row of each date in dates (-1 where the panel has no such date)."""
+        return self.dates.get_indexer(pd.DatetimeIndex(dates))
+
+    def frame(self, name):
+        return pd.DataFrame(self.fields[name], index=self.dates, columns=self.tickers)
+
+    def rolling_mean(self, values, window):
+        """pandas rolling(window).mean() of values over each ticker's own rows.
+
+        Every column's available cells are packed to the top, so one DataFrame
+        rolling call handles all tickers and a ticker's gaps do not count as dates.
+        Unavailable cells come back NaN.
+        """
+        order = np.argsort(~self.available, axis=0, kind="stable")
+        packed = np.take_along_axis(np.where(self.available, values, np.nan), order, axis=0)
+        means = pd.DataFrame(packed).rolling(window).mean().to_numpy()
+        result = np.full(self.shape, np.nan)
+        np.put_along_axis(result, order, means, axis=0)
+        return np.where(self.available, result, np.nan)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+SP500 = "^GSPC"
+LOOKBACK = pd.DateOffset(months=3)
+
+
+def _take(values, rows, fill):
+    """values[rows], with fill where rows is -1."""
+    if not len(values):
+        return np.full(len(rows), fill, dtype=np.result_type(values, type(fill)))
+    return np.where(rows >= 0, values[rows], fill)
+
+
+class RegimeFeatures:
+    """Market regime series of an index, precomputed as arrays on its dates.
+
+    close, ma (the regime moving average: the frame's "ma200" column, or a rolling
+    mean over ma_window), has_regime (ma known), trending (close above ma) and ret_3m
+    (percent return since the same date three months earlier, NaN when that date has
+    no bar). A date's row is one hash lookup, so per-date queries are O(1) reads.
+    """
+
+    def __init__(self, index_df, ma_window=None):
+        self.dates = pd.DatetimeIndex(index_df.index)
+        self.close = index_df["close"].to_numpy(dtype=float)
+        if ma_window is not None or "ma200" not in index_df.columns:
+            self.ma = index_df["close"].rolling(ma_window or 200).mean().to_numpy()
+        else:
+            self.ma = index_df["ma200"].to_numpy(dtype=float)
+        self.has_regime = ~np.isnan(self.ma)
+        self.trending = self.has_regime & (self.close > self.ma)
+        lookback = self.dates.get_indexer(self.dates - LOOKBACK)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.ret_3m = (self.close / _take(self.close, lookback, np.nan) - 1) * 100
+
+    def __len__(self):
+        return len(self.dates)
+
+    def row(self, date):
+        """Row of date, or -1 when the index has no bar on it."""
+        try:
+            return self.dates.get_loc(date)
+        except KeyError:
+            return -1
+
+    def aligned(self, calendar):
+        """Features carried forward onto calendar: each date takes the index's last bar on or before it."""
+        calendar = pd.DatetimeIndex(calendar)
+        rows = self.dates.get_indexer(calendar, method="ffill") if len(self.dates) else np.full(len(calendar), -1)
+        features = object.__new__(type(self))
+        features.dates = calendar
+        for name in ("close", "ma", "ret_3m"):
+            setattr(features, name, _take(getattr(self, name), rows, np.nan))
+        features.has_regime = ~np.isnan(features.ma)
+        features.trending = features.has_regime & (features.close > features.ma)
+        return features
+
+    def on(self, dates):
+        """(has_regime, trending) on dates, both False where the index has no row."""
+        rows = self.dates.get_indexer(pd.DatetimeIndex(dates))
+        return _take(self.has_regime, rows, False), _take(self.trending, rows, False)
+
+    def state(self, date):
+        """One-line description of the market on date (the last bar when date has none)."""
+        row = self.row(date)
+        if row < 0:
+            row = len(self.dates) - 1
+        if row < 0 or not self.has_regime[row]:
+            return "Unknown"
+        above_ma = "above" if self.trending[row] else "below"
+        ret_3m = "unknown" if np.isnan(self.ret_3m[row]) else f"{self.ret_3m[row]:.2f}%"
+        return f"The S&P 500 is {above_ma} its 200-day moving average, with a 3-month return of {ret_3m}."
@@ -0,0 +1,173 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+
+from analytics import PnlReport
+from panel import PRICE_FIELDS
+
+RESULTS_PATH = "results"
+
+
+def _describe(value):
+    """JSON-ready description of a config value: cost models and other objects by class and attributes."""
+    if isinstance(value, dict):
+        return {str(key): _describe(item) for key, item in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_describe(item) for item in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, np.datetime64)) or hasattr(value, "isoformat"):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    if hasattr(value, "__dict__"):
+        return {"class": _describe(type(value)), **_describe(vars(value))}
+    return repr(value)
+
+
+def data_fingerprint(tickers, dfs, fields=PRICE_FIELDS):
+    """Hash of the price data a backtest reads: each ticker's dates and fields, in order.
+
+    Every price field is hashed, since the alphas read open/high/low as well as the
+    close, volume and eligibility the trader uses.
+    """
+    digest = hashlib.sha256()
+    for ticker in tickers:
+        df = dfs[ticker]
+        digest.update(ticker.encode())
+        digest.update(df.index.asi8.tobytes())
+        for field in fields:
+            if field in df.columns:
+                digest.update(df[field].to_numpy(dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+def run_config(strategy_name, alphas, start, end, engine="vectorized", costs=None, no_trade_band=0.0,
+               fingerprint=None, **extra):
+    """Everything that determines a strategy's result, as a JSON-ready dict."""
+    return _describe({
+        "strategy": strategy_name,
+        "alphas": [
+            {"class": type(alpha), "name": alpha.name, "params": alpha.params(), "insts": list(alpha.insts)}
+            for alpha in alphas
+        ],
+        "start": start,
+        "end": end,
+        "engine": engine,
+        "costs": costs,
+        "no_trade_band": no_trade_band,
+        "data": fingerprint,
+        **extra,
+    })
+
+
+class ResultStore:
+    """Backtest results on disk, one directory per run keyed by a hash of its config.
+
+    Layout of a run directory:
+        meta.json          config, strategy_dict scalars/statistics and array names
+        dates.npy          datetime64[ns] equity dates
+        series.npy         float64 (series, dates): equity, returns, drawdown, ...
+        alpha_daily.npy    float64 (alphas, dates) standalone alpha returns, when present
+
+    Arrays are memory mapped on read, so an equity curve can be streamed in chunks
+    of raw float64 bytes without building a JSON list.
+    """
+
+    def __init__(self, path=RESULTS_PATH):
+        self.path = path
+
+    @staticmethod
+    def key(config):
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:32]
+
+    def _dir(self, key):
+        return os.path.join(self.path, key)
+
+    def __contains__(self, key):
+        return os.path.exists(os.path.join(self._dir(key), "meta.json"))
+
+    def keys(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(key for key in os.listdir(self.path) if key in self)
+
+    def save(self, key, config, strategy_dict):
+        """Write one strategy result (as run_strategy returns it) under key, replacing any old entry."""
+        result = dict(strategy_dict)
+        analytics = result.pop("analytics", None)
+        meta = {"config": config, "result": result, "series": [], "attribution": {}}
+        arrays = {}
+        if analytics is not None:
+            meta["series"] = list(analytics.series)
+            meta["scalars"] = {name: float(value) for name, value in analytics.scalars.items()}
+            arrays["dates"] = analytics.dates.values.astype("datetime64[ns]")
+            arrays["series"] = np.array([analytics.series[name] for name in meta["series"]], dtype=float)
+            for kind, parts in analytics.attribution.items():
+                meta["attribution"][kind] = {"names": list(parts["names"]),
+                                             "totals": np.asarray(parts["totals"], dtype=float).tolist()}
+                if "daily" in parts:
+                    arrays[f"{kind}_daily"] = np.asarray(parts["daily"], dtype=float)
+
+        # Written beside the final directory and swapped in, so readers never see half a run
+        final = self._dir(key)
+        staging = f"{final}.tmp{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name, values in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), values)
+        with open(os.path.join(staging, "meta.json"), "w") as fp:
+            json.dump(meta, fp, default=str)
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(staging, final)
+
+    def meta(self, key):
+        with open(os.path.join(self._dir(key), "meta.json")) as fp:
+            return json.load(fp)
+
+    def array(self, key, name):
+        """Memory-mapped array of a run: "dates", "series" or "<kind>_daily"."""
+        return np.load(os.path.join(self._dir(key), f"{name}.npy"), mmap_mode="r")
+
+    def series(self, key, name):
+        """One per-date series of a run (e.g. "equity") as a Series on its dates."""
+        names = self.meta(key)["series"]
+        values = self.array(key, "series")[names.index(name)]
+        return pd.Series(np.asarray(values), index=pd.DatetimeIndex(np.asarray(self.array(key, "dates"))), name=name)
+
+    def stream(self, key, name="equity", chunk_size=4096):
+        """Yield a series as raw little-endian float64 bytes, chunk_size values at a time."""
+        names = self.meta(key)["series"]
+        values = self.array(key, "series")[names.index(name)]
+        for lo in range(0, len(values), chunk_size):
+            yield np.ascontiguousarray(values[lo:lo + chunk_size], dtype="<f8").tobytes()
+
+    def load(self, key):
+        """The strategy_dict that was saved under key, rebuilt in the shape run_strategy returns.
+
+        Its analytics.PnlReport reads the run's memory-mapped arrays; nothing is turned
+        into lists until the report is serialized for the front end.
+        """
+        meta = self.meta(key)
+        strategy_dict = dict(meta["result"])
+        if meta["series"]:
+            series = self.array(key, "series")
+            attribution = {}
+            for kind, parts in meta["attribution"].items():
+                attribution[kind] = {"names": parts["names"], "totals": np.array(parts["totals"], dtype=float)}
+                if os.path.exists(os.path.join(self._dir(key), f"{kind}_daily.npy")):
+                    attribution[kind]["daily"] = self.array(key, f"{kind}_daily")
+            strategy_dict["analytics"] = PnlReport(
+                np.asarray(self.array(key, "dates")), meta["scalars"],
+                {name: series[i] for i, name in enumerate(meta["series"])}, attribution
+            )
+        strategy_dict["run_key"] = key
+        return strategy_dict
+
+    def delete(self, key):
+        shutil.rmtree(self._dir(key), ignore_errors=True)
@@ -0,0 +1,228 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from alphas import MeanReversalAlpha, PriceRatioMeanReversalAlpha, MomentumAlpha, AdaptiveRegimeAlpha
+from alpha_cache import AlphaCache
+from instrument import make_metrics
+from trader import Trader
+from panel import PRICE_FIELDS
+from universe import master_calendar
+from results import data_fingerprint, run_config
+
+SERIES_KEYS = ("Daily Returns", "Cumulative Returns", "Equity Curve")
+STRATEGY_NAMES = ("MeanReversalAlpha", "PriceRatioMeanAlpha", "MomentumAlpha", "Combined Alpha",
+                  "Regime Switching Alpha")
+
+# Per-worker state, populated once by _init_worker
+_worker_dfs = None
+_worker_tickers = None
+_worker_cache = None
+_worker_shm = None
+
+
+class SharedPricePanel:
+    """Price fields of every ticker packed into one shared-memory block.
+
+    Layout is (field, ticker, date) float64 plus a trailing availability plane, so
+    workers attach by name and rebuild their frames without the parent pickling
+    any DataFrame to them.
+    """
+
+    def __init__(self, shm, shape, dates, tickers, fields):
+        self.shm = shm
+        self.shape = shape
+        self.dates = dates
+        self.tickers = tickers
+        self.fields = fields
+
+    @classmethod
+    def create(cls, tickers, dfs, fields=PRICE_FIELDS):
+        dates = master_calendar(dfs[ticker].index for ticker in tickers)
+        shape = (len(fields) + 1, len(tickers), len(dates))
+        shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
+        panel = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        panel[:] = np.nan
+        for j, ticker in enumerate(tickers):
+            df = dfs[ticker]
+            rows = dates.get_indexer(df.index)
+            for f, field in enumerate(fields):
+                panel[f, j, rows] = df[field].to_numpy(dtype=float)
+            panel[-1, j] = 0
+            panel[-1, j, rows] = 1
+        return cls(shm, shape, dates.asi8.copy(), list(tickers), tuple(fields))
+
+    def spec(self):
+        return self.shm.name, self.shape, self.dates, self.tickers, self.fields
+
+    @staticmethod
+    def attach(spec):
+        name, shape, dates, tickers, fields = spec
+        shm = shared_memory.SharedMemory(name=name)
+        panel = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        index = pd.DatetimeIndex(dates)
+        dfs = {}
+        for j, ticker in enumerate(tickers):
+            rows = panel[-1, j] == 1
+            df = pd.DataFrame({field: panel[f, j, rows] for f, field in enumerate(fields)}, index=index[rows])
+            df.index.name = "datetime"
+            if "eligible" in df.columns:
+                df["eligible"] = df["eligible"].astype(bool)
+            dfs[ticker] = df
+        return shm, dfs
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def build_strategies(tickers, dfs, start, end, sp500_df=None, names=STRATEGY_NAMES, cache=None):
+    """{strategy name: alphas} for the named strategies, sharing alpha objects between them.
+
+    sp500_df is only needed for "Regime Switching Alpha".
+    """
+    unknown = set(names) - set(STRATEGY_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown strategies {sorted(unknown)}; choose from {STRATEGY_NAMES}")
+    alpha1 = MeanReversalAlpha(tickers, dfs, start, end, name="MeanReversalAlpha", cache=cache)
+    alpha2 = PriceRatioMeanReversalAlpha(tickers, dfs, start, end, name="PriceRatioMeanAlpha", cache=cache)
+    alpha3 = MomentumAlpha(tickers, dfs, start, end, name="MomentumAlpha", cache=cache)
+    builders = {
+        "MeanReversalAlpha": lambda: [alpha1],
+        "PriceRatioMeanAlpha": lambda: [alpha2],
+        "MomentumAlpha": lambda: [alpha3],
+        "Combined Alpha": lambda: [alpha1, alpha2, alpha3],
+        "Regime Switching Alpha": lambda: [
+            AdaptiveRegimeAlpha(tickers, dfs, start, end, sp500_df, name="regime_switching", cache=cache)
+        ],
+    }
+    return {name: builders[name]() for name in names}
+
+
+def summarize_strategy(strategy_name, stats):
+    """Front-end entry for one strategy: final equity plus scalar statistics."""
+    strategy_dict = {"strategy_name": strategy_name}
+    if "error" in stats:
+        strategy_dict["error"] = stats["error"]
+        return strategy_dict
+    strategy_dict["final_equity"] = float(stats["Equity Curve"].iloc[-1])
+    strategy_dict["statistics"] = {
+        key: float(value) for key, value in stats.items() if key not in SERIES_KEYS
+    }
+    return strategy_dict
+
+
+def run_strategy(strategy_name, alphas, tickers, dfs, start, end, engine="vectorized",
+                 instrument=False, profile=False, costs=None, no_trade_band=0.0, dtype=np.float64,
+                 chunk_size=256):
+    print(f"\n=== Running {strategy_name} Backtest ===")
+    metrics = make_metrics(instrument, profile)
+    try:
+        with metrics.stage("trader_init"):
+            trader = Trader(tickers, dfs, start, end, alphas, engine=engine, metrics=metrics,
+                            costs=costs, no_trade_band=no_trade_band, dtype=dtype, chunk_size=chunk_size)
+        trader.run_backtest()
+        if trader.equity:
+            stats = trader.get_pnl_stats()
+        else:
+            stats = {"error": "No equity data generated"}
+        strategy_dict = summarize_strategy(strategy_name, stats)
+        if "error" not in strategy_dict:
+            strategy_dict["analytics"] = trader.get_analytics()
+        if metrics.enabled:
+            strategy_dict["instrumentation"] = metrics.report()
+            strategy_dict["instrumentation"]["memory"] = trader.memory_stats()
+        return strategy_dict
+    finally:
+        metrics.stop()
+
+
+def _init_worker(spec):
+    global _worker_dfs, _worker_tickers, _worker_cache, _worker_shm
+    _worker_shm, _worker_dfs = SharedPricePanel.attach(spec)
+    _worker_tickers = spec[3]
+    # Alphas repeated across the strategies a worker receives are computed once
+    _worker_cache = AlphaCache()
+
+
+def _run_task(task):
+    strategy_name, alpha_specs, start, end, engine, instrument, profile, costs, no_trade_band, dtype, \
+        chunk_size = task
+    alphas = [
+        cls(_worker_tickers, _worker_dfs, start, end, name=name, cache=_worker_cache, **kwargs)
+        for cls, name, kwargs in alpha_specs
+    ]
+    return run_strategy(strategy_name, alphas, _worker_tickers, _worker_dfs, start, end, engine,
+                        instrument, profile, costs, no_trade_band, dtype, chunk_size)
+
+
+def pool_workers(max_workers, n_strategies):
+    """Worker processes run_strategies uses for n_strategies; 1 means it runs them in this process."""
+    max_workers = max_workers or os.cpu_count() or 1
+    return min(max_workers, max(1, n_strategies))
+
+
+def run_strategies(strategies, tickers, dfs, start, end, max_workers=None, engine="vectorized",
+                   instrument=False, profile=False, costs=None, no_trade_band=0.0, store=None,
+                   dtype=np.float64, chunk_size=256):
+    """Backtest every strategy in a process pool and return all_strategy_results.
+
+    strategies maps a strategy name to its list of alphas. Alphas travel to the
+    workers as (class, name, constructor kwargs) specs and are rebuilt against the
+    shared price panel; results keep the order of the strategies dict. With
+    instrument (or profile) each result carries an "instrumentation" report. costs
+    (a costs.CostModel), no_trade_band, dtype and chunk_size are passed to every Trader.
+
+    With a store (results.ResultStore), strategies whose config and data were run
+    before are loaded from it and only the rest are backtested and saved; every
+    result then carries its "run_key".
+    """
+    if store is not None:
+        return _run_stored(store, strategies, tickers, dfs, start, end, max_workers, engine,
+                           instrument, profile, costs, no_trade_band, dtype, chunk_size)
+    max_workers = pool_workers(max_workers, len(strategies))
+    if max_workers == 1:
+        return [
+            run_strategy(name, alphas, tickers, dfs, start, end, engine, instrument, profile, costs,
+                         no_trade_band, dtype, chunk_size)
+            for name, alphas in strategies.items()
+        ]
+
+    tasks = [
+        (name, [alpha.spec() for alpha in alphas], start, end, engine, instrument, profile, costs, no_trade_band,
+         dtype, chunk_size)
+        for name, alphas in strategies.items()
+    ]
+    panel = SharedPricePanel.create(tickers, dfs)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(panel.spec(),)) as pool:
+            return list(pool.map(_run_task, tasks))
+    finally:
+        panel.close()
+
+
+def _run_stored(store, strategies, tickers, dfs, start, end, max_workers, engine, instrument, profile,
+                costs, no_trade_band, dtype, chunk_size):
+    fingerprint = data_fingerprint(tickers, dfs)
+    # float32 storage changes results (slightly); the chunk size does not
+    extra = {} if np.dtype(dtype) == np.float64 else {"dtype": np.dtype(dtype).name}
+    configs = {
+        name: run_config(name, alphas, start, end, engine, costs, no_trade_band, fingerprint, **extra)
+        for name, alphas in strategies.items()
+    }
+    keys = {name: store.key(config) for name, config in configs.items()}
+    pending = {name: alphas for name, alphas in strategies.items() if keys[name] not in store}
+    print(f"Loaded {len(strategies) - len(pending)} of {len(strategies)} strategies from {store.path}.")
+    computed = {}
+    if pending:
+        results = run_strategies(pending, tickers, dfs, start, end, max_workers, engine,
+                                 instrument, profile, costs, no_trade_band, dtype=dtype, chunk_size=chunk_size)
+        for name, strategy_dict in zip(pending, results):
+            if "error" not in strategy_dict:
+                store.save(keys[name], configs[name], strategy_dict)
+                strategy_dict["run_key"] = keys[name]
+            computed[name] = strategy_dict
+    return [computed[name] if name in computed else store.load(keys[name]) for name in strategies]
@@ -0,0 +1,287 @@
+import sys
+import json
+import asyncio
+import argparse
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+from alpha_cache import AlphaCache
+from analytics import json_default
+from costs import default_cost_model
+from results import ResultStore, data_fingerprint, run_config
+from runner import STRATEGY_NAMES, build_strategies, run_strategy
+from store import MarketDataStore, STORE_PATH
+from trader import ENGINES, STREAMING_ENGINES
+
+FINAL_EVENTS = ("result", "error")
+
+
+class _Job:
+    """One backtest in flight: the events published so far and the queues listening for more."""
+
+    def __init__(self, key):
+        self.key = key
+        self.events = []
+        self.subscribers = []
+        self.task = None
+
+    def publish(self, event):
+        event = {"job": self.key, **event}
+        self.events.append(event)
+        for queue in self.subscribers:
+            queue.put_nowait(event)
+
+    def subscribe(self):
+        # A late subscriber (a duplicate request) first replays what it missed
+        queue = asyncio.Queue()
+        for event in self.events:
+            queue.put_nowait(event)
+        self.subscribers.append(queue)
+        return queue
+
+
+class BacktestService:
+    """Long-lived backtest service for the front end.
+
+    Market data is loaded once and the AlphaCache stays warm across requests, so a
+    request costs only what was not computed before. Strategies run on a thread
+    pool: they share the frames and alpha panels without copies, and NumPy releases
+    the GIL in the heavy array work. Identical requests in flight share one job.
+
+        async with BacktestService() as service:
+            async for event in service.submit({"strategies": ["MomentumAlpha"], ...}):
+                ...
+
+    A request has "tickers" (default: all loaded), "start", "end", "strategies"
+    (default: all), "engine", "frictionless" and "no_trade_band". Events are
+    dicts with a "type": queued, started, strategy (one finished), then result
+    (with all_strategy_results) or error.
+    """
+
+    def __init__(self, tickers=None, dfs=None, sp500_df=None, store_path=STORE_PATH, results=None,
+                 max_workers=None):
+        self.tickers = tickers
+        self.dfs = dfs
+        self.sp500_df = sp500_df
+        self.store_path = store_path
+        # Optional results.ResultStore: finished strategies persist across restarts
+        self.results = results
+        self.cache = AlphaCache()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._jobs = {}
+        self._universes = {}
+        self._sp500s = {}
+        self._lock = threading.Lock()
+
+    async def start(self):
+        if self.dfs is None:
+            loop = asyncio.get_running_loop()
+            self.tickers, self.dfs = await loop.run_in_executor(self.executor, MarketDataStore(self.store_path).read)
+            print(f"Service loaded {len(self.tickers)} tickers from {self.store_path}")
+        return self
+
+    async def close(self):
+        for job in list(self._jobs.values()):
+            await asyncio.gather(job.task, return_exceptions=True)
+        self.executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def normalize(self, request):
+        """Request with defaults filled in, in a canonical form (identical requests compare equal)."""
+        tickers = list(request.get("tickers") or self.tickers)
+        unknown = [ticker for ticker in tickers if ticker not in self.dfs]
+        if unknown:
+            raise ValueError(f"Unknown tickers: {', '.join(unknown)}")
+        strategies = list(request.get("strategies") or STRATEGY_NAMES)
+        unknown = [name for name in strategies if name not in STRATEGY_NAMES]
+        if unknown:
+            raise ValueError(f"Unknown strategies: {', '.join(unknown)}")
+        engine = request.get("engine", "vectorized")
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+        return {
+            "tickers": tickers,
+            "start": pd.Timestamp(request.get("start", "2015-01-01")).isoformat(),
+            "end": pd.Timestamp(request.get("end", "2023-12-31")).isoformat(),
+            "strategies": strategies,
+            "engine": engine,
+            "frictionless": bool(request.get("frictionless", False)),
+            "no_trade_band": float(request.get("no_trade_band", 0.0)),
+        }
+
+    async def submit(self, request):
+        """Async generator of progress events for request, ending with a result or error event."""
+        try:
+            request = self.normalize(request)
+        except ValueError as exc:
+            yield {"type": "error", "error": str(exc)}
+            return
+        key = ResultStore.key(request)
+        job = self._jobs.get(key)
+        if job is None:
+            job = self._jobs[key] = _Job(key)
+            job.task = asyncio.create_task(self._run(job, request))
+        queue = job.subscribe()
+        try:
+            while True:
+                event = await queue.get()
+                yield event
+                if event["type"] in FINAL_EVENTS:
+                    return
+        finally:
+            job.subscribers.remove(queue)
+
+    async def run(self, request):
+        """all_strategy_results for request (raises RuntimeError if the backtest failed)."""
+        async for event in self.submit(request):
+            if event["type"] == "error":
+                raise RuntimeError(event["error"])
+            if event["type"] == "result":
+                return event["results"]
+
+    def _universe(self, tickers):
+        # One frame dict per universe, so the AlphaCache price panel (keyed by its id) is reused
+        key = tuple(tickers)
+        with self._lock:
+            if key not in self._universes:
+                dfs = {ticker: self.dfs[ticker] for ticker in tickers}
+                self._universes[key] = (dfs, data_fingerprint(tickers, dfs))
+            return self._universes[key]
+
+    def _sp500(self, start, end):
+        # Same window main.py fetches, so the ma200 warm-up (and so the regime) matches a CLI
+        # run; fetched outside the lock, which only guards the per-window cache
+        if self.sp500_df is not None:
+            return self.sp500_df
+        key = (start, end)
+        with self._lock:
+            if key in self._sp500s:
+                return self._sp500s[key]
+        from utils import get_sp500_data
+
+        sp500_df = get_sp500_data(start, end)
+        with self._lock:
+            return self._sp500s.setdefault(key, sp500_df)
+
+    def _run_strategy(self, name, alphas, request, tickers, dfs, fingerprint, costs):
+        start, end = pd.Timestamp(request["start"]), pd.Timestamp(request["end"])
+        if self.results is None:
+            return run_strategy(name, alphas, tickers, dfs, start, end, request["engine"],
+                                costs=costs, no_trade_band=request["no_trade_band"])
+        config = run_config(name, alphas, start, end, request["engine"], costs, request["no_trade_band"], fingerprint)
+        key = self.results.key(config)
+        if key in self.results:
+            return self.results.load(key)
+        strategy_dict = run_strategy(name, alphas, tickers, dfs, start, end, request["engine"],
+                                     costs=costs, no_trade_band=request["no_trade_band"])
+        if "error" not in strategy_dict:
+            self.results.save(key, config, strategy_dict)
+            strategy_dict["run_key"] = key
+        return strategy_dict
+
+    async def _run(self, job, request):
+        loop = asyncio.get_running_loop()
+        try:
+            names = request["strategies"]
+            job.publish({"type": "queued", "strategies": names})
+            tickers = request["tickers"]
+            dfs, fingerprint = await loop.run_in_executor(self.executor, self._universe, tickers)
+            start, end = pd.Timestamp(request["start"]), pd.Timestamp(request["end"])
+            sp500_df = None
+            if "Regime Switching Alpha" in names:
+                sp500_df = await loop.run_in_executor(self.executor, self._sp500, start, end)
+            if request["engine"] in STREAMING_ENGINES:
+                # Streaming alphas carry per-run state, so strategies running side by side
+                # on the pool each get alpha objects of their own
+                strategies = {name: build_strategies(tickers, dfs, start, end, sp500_df, [name],
+                                                     cache=self.cache)[name] for name in names}
+            else:
+                strategies = build_strategies(tickers, dfs, start, end, sp500_df, names, cache=self.cache)
+            costs = None if request["frictionless"] else default_cost_model()
+            finished = 0
+
+            async def run_one(name, alphas):
+                nonlocal finished
+                job.publish({"type": "started", "strategy": name})
+                result = await loop.run_in_executor(self.executor, self._run_strategy, name, alphas, request,
+                                                    tickers, dfs, fingerprint, costs)
+                finished += 1
+                job.publish({"type": "strategy", "strategy": name, "done": finished, "total": len(names),
+                             "final_equity": result.get("final_equity")})
+                return result
+
+            results = await asyncio.gather(*(run_one(name, alphas) for name, alphas in strategies.items()))
+            job.publish({"type": "result", "results": list(results)})
+        except Exception as exc:
+            job.publish({"type": "error", "error": f"{type(exc).__name__}: {exc}"})
+        finally:
+            self._jobs.pop(job.key, None)
+
+
+async def serve(service, host="127.0.0.1", port=8765):
+    """JSON-lines TCP front end: each request line gets its events back as JSON lines."""
+    async def handle(reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    request = None
+                    writer.write((json.dumps({"type": "error", "error": f"Bad request: {exc}"}) + "\n").encode())
+                if request is not None:
+                    async for event in service.submit(request):
+                        writer.write((json.dumps(event, default=json_default) + "\n").encode())
+                        await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port, limit=2 ** 24)
+    print(f"Backtest service listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+class BacktestClient:
+    """Client for serve(): stream(request) yields the events of one request."""
+
+    def __init__(self, host="127.0.0.1", port=8765):
+        self.host = host
+        self.port = port
+
+    async def stream(self, request):
+        reader, writer = await asyncio.open_connection(self.host, self.port, limit=2 ** 24)
+        try:
+            writer.write((json.dumps(request, default=str) + "\n").encode())
+            await writer.drain()
+            while line := await reader.readline():
+                event = json.loads(line)
+                yield event
+                if event["type"] in FINAL_EVENTS:
+                    return
+        finally:
+            writer.close()
+
+
+async def _main(args):
+    results = ResultStore(args.results) if args.results else None
+    async with BacktestService(store_path=args.store, results=results, max_workers=args.workers) as service:
+        await serve(service, args.host, args.port)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve backtests over JSON lines on TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--store", default=STORE_PATH, help="market data store directory")
+    parser.add_argument("--results", default=None, help="results store directory (off by default)")
+    parser.add_argument("--workers", type=int, default=None)
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,328 @@
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+from typing import List, Tuple, Dict, Optional
+
+from universe import master_calendar
+
+STORE_PATH = "market_data"
+# Index bars (e.g. the S&P 500 for the regime alpha) live in a store of their own
+INDEX_STORE_PATH = "index_data"
+FIELDS = ("open", "high", "low", "close", "volume", "eligible")
+
+
+class MarketDataStore:
+    """Columnar market data on disk: one dates x tickers array per field.
+
+    Layout of the store directory:
+        meta.json       tickers, fields and per-ticker covered date span [start, end)
+        dates.npy       shared datetime64[ns] date index (sorted, date-only)
+        present.npy     bool, whether the ticker has a bar on the date
+        <field>.npy     float64 per price field (bool for eligible), NaN where absent
+
+    Arrays are saved in Fortran order so each ticker's history is contiguous, and
+    they are opened with memory mapping: a read only touches the pages of the
+    requested tickers, fields and date range. After a sync the arrays may be larger
+    than dates x tickers; the spare rows and columns take later bars in place.
+    """
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        self._meta = None
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.path, "meta.json"))
+
+    @property
+    def meta(self) -> dict:
+        if self._meta is None:
+            with open(os.path.join(self.path, "meta.json")) as fp:
+                self._meta = json.load(fp)
+        return self._meta
+
+    @property
+    def tickers(self) -> List[str]:
+        return list(self.meta["tickers"])
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self.meta["fields"])
+
+    def _load(self, name: str) -> np.ndarray:
+        values = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+        if name == "dates":
+            return values
+        # Field arrays keep spare rows and columns for appends beyond the stored shape
+        return values[:len(self._load("dates")), :len(self.meta["tickers"])]
+
+    def dates(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self._load("dates"))
+
+    def ticker_ranges(self) -> Dict[str, Tuple[pd.Timestamp, pd.Timestamp]]:
+        """Per-ticker half-open [start, end) span already fetched into the store."""
+        return {
+            ticker: (pd.Timestamp(first), pd.Timestamp(last))
+            for ticker, (first, last) in self.meta["ranges"].items()
+        }
+
+    def _select(self, tickers, start, end):
+        dates = self.dates()
+        lo = 0 if start is None else dates.searchsorted(pd.Timestamp(start), side="left")
+        hi = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end), side="right")
+        stored = self.tickers
+        if tickers is None:
+            tickers = stored
+        position = {ticker: j for j, ticker in enumerate(stored)}
+        tickers = [ticker for ticker in tickers if ticker in position]
+        columns = [position[ticker] for ticker in tickers]
+        return dates[lo:hi], slice(lo, hi), tickers, columns
+
+    def read_field(self, field: str, tickers: Optional[List[str]] = None,
+                   start=None, end=None) -> Tuple[pd.DatetimeIndex, List[str], np.ndarray]:
+        """Return (dates, tickers, values) with values as a dates x tickers array."""
+        dates, rows, tickers, columns = self._select(tickers, start, end)
+        values = self._load(field)
+        return dates, tickers, np.stack([values[rows, j] for j in columns], axis=1) if columns \
+            else np.empty((len(dates), 0), dtype=values.dtype)
+
+    def read(self, tickers: Optional[List[str]] = None, fields: Optional[List[str]] = None,
+             start=None, end=None) -> Tuple[List[str], Dict[str, pd.DataFrame]]:
+        """Per-ticker DataFrames for the requested slice, in the shape get_ticker_dfs returns."""
+        dates, rows, tickers, columns = self._select(tickers, start, end)
+        fields = list(fields) if fields is not None else self.fields
+        present = self._load("present")
+        arrays = {field: self._load(field) for field in fields}
+        ticker_dfs = {}
+        for ticker, j in zip(tickers, columns):
+            mask = np.asarray(present[rows, j])
+            df = pd.DataFrame(
+                {field: np.asarray(arrays[field][rows, j])[mask] for field in fields},
+                index=dates[mask]
+            )
+            df.index.name = "datetime"
+            ticker_dfs[ticker] = df
+        return tickers, ticker_dfs
+
+    def write(self, tickers: List[str], ticker_dfs: Dict[str, pd.DataFrame],
+              ranges: Optional[Dict[str, Tuple[pd.Timestamp, pd.Timestamp]]] = None) -> None:
+        """Write (replace) the whole store from per-ticker DataFrames.
+
+        ranges gives each ticker's covered [start, end) span (tickers without bars
+        may have one too); by default it runs from the first stored bar to the day
+        after the last one.
+        """
+        ranges = dict(ranges or {})
+        os.makedirs(self.path, exist_ok=True)
+        dates = master_calendar(ticker_dfs[ticker].index for ticker in tickers)
+        shape = (len(dates), len(tickers))
+        arrays = {name: _blank(name, shape) for name in ("present",) + FIELDS}
+        for j, ticker in enumerate(tickers):
+            df = ticker_dfs[ticker]
+            _put(arrays, dates.get_indexer(df.index), j, df)
+            if ticker not in ranges and len(df):
+                ranges[ticker] = (df.index.min(), df.index.max() + pd.Timedelta(days=1))
+
+        for name, values in arrays.items():
+            np.save(os.path.join(self.path, f"{name}.npy"), values)
+        self._commit(tickers, dates, ranges)
+        print(f"Wrote {len(tickers)} tickers x {len(dates)} dates to {self.path}")
+
+    def _commit(self, tickers, dates, ranges):
+        # dates.npy and meta.json go last: until then readers keep seeing the old shape
+        np.save(os.path.join(self.path, "dates.npy"), dates.values.astype("datetime64[ns]"))
+        ranges = {
+            ticker: [str(pd.Timestamp(first).date()), str(pd.Timestamp(last).date())]
+            for ticker, (first, last) in ranges.items()
+        }
+        meta = {"tickers": list(tickers), "fields": list(FIELDS), "ranges": ranges}
+        with open(os.path.join(self.path, "meta.json"), "w") as fp:
+            json.dump(meta, fp, indent=2)
+        self._meta = meta
+
+    def _grow(self, shape):
+        """Copy every array into one with room for shape plus spare rows and columns."""
+        capacity = tuple(n + max(n // 4, spare) for n, spare in zip(shape, (256, 16)))
+        used = (len(self._load("dates")), len(self.tickers))
+        for name in ("present",) + FIELDS:
+            path = os.path.join(self.path, f"{name}.npy")
+            staging = f"{path}.tmp{os.getpid()}"
+            old = self._load(name)
+            grown = np.lib.format.open_memmap(staging, mode="w+", dtype=old.dtype, shape=capacity,
+                                              fortran_order=True)
+            grown[:] = _FILL.get(name, np.nan)
+            grown[:used[0], :used[1]] = old
+            grown.flush()
+            del grown, old
+            os.replace(staging, path)
+
+    def append(self, ticker_dfs: Dict[str, pd.DataFrame],
+               ranges: Dict[str, Tuple[pd.Timestamp, pd.Timestamp]]) -> None:
+        """Add bars to the store in place and replace the covered spans with ranges.
+
+        New tickers become new columns and dates after the stored calendar new rows,
+        written into the memory-mapped arrays (which keep spare room, so a daily
+        refresh touches only the new cells). Bars on stored dates overwrite the old
+        ones. Dates inside or before the stored calendar (a backfill) cannot be
+        appended, and the store is rewritten instead.
+        """
+        if not self.exists():
+            self.write(list(ticker_dfs), ticker_dfs, ranges)
+            return
+        stored = self.dates()
+        tickers = self.tickers
+        if ticker_dfs:
+            dates = master_calendar(df.index for df in ticker_dfs.values())
+            extra = dates[~dates.isin(stored)]
+        else:
+            extra = stored[:0]
+        if len(extra) and len(stored) and extra[0] <= stored[-1]:
+            tickers, dfs = self.read()
+            for ticker, df in ticker_dfs.items():
+                if ticker in dfs:
+                    merged = pd.concat([dfs[ticker], df])
+                    df = merged[~merged.index.duplicated(keep="last")].sort_index()
+                else:
+                    tickers.append(ticker)
+                dfs[ticker] = df
+            self.write(tickers, dfs, ranges)
+            return
+
+        tickers = tickers + [ticker for ticker in ticker_dfs if ticker not in tickers]
+        dates = stored.append(extra)
+        used = (len(stored), len(self.meta["tickers"]))
+        shape = (len(dates), len(tickers))
+        capacity = self._capacity()
+        if shape[0] > capacity[0] or shape[1] > capacity[1]:
+            self._grow(shape)
+        arrays = {name: self._open(name) for name in ("present",) + FIELDS}
+        for name, values in arrays.items():
+            # Spare cells coming into use are reset: they may hold leftovers of an interrupted append
+            values[used[0]:shape[0], :shape[1]] = _FILL.get(name, np.nan)
+            values[:used[0], used[1]:shape[1]] = _FILL.get(name, np.nan)
+        position = {ticker: j for j, ticker in enumerate(tickers)}
+        for ticker, df in ticker_dfs.items():
+            _put(arrays, dates.get_indexer(df.index), position[ticker], df)
+        for values in arrays.values():
+            values.flush()
+        del arrays
+        self._commit(tickers, dates, ranges)
+        print(f"Appended {len(extra)} dates and {shape[1] - used[1]} tickers to {self.path}")
+
+    def _capacity(self):
+        return np.load(os.path.join(self.path, "present.npy"), mmap_mode="r").shape
+
+    def _open(self, name):
+        return np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r+")
+
+    def sync(self, tickers: List[str], start, end, source, granularity: str = "1d") -> Dict[str, int]:
+        """Bring the store up to date for tickers over [start, end), fetching only what is missing.
+
+        New tickers are fetched over the whole span; known tickers only over the head
+        before and the tail after their covered span. Spans a ticker has no bars in
+        (e.g. before its listing) are covered too, so they are not fetched again;
+        spans whose fetch failed are not. Returns rows fetched per ticker.
+        """
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        ranges = self.ticker_ranges() if self.exists() else {}
+
+        # A ticker may need both a head and a tail, so they go out as separate batches
+        heads, tails = [], []
+        for ticker in tickers:
+            if ticker not in ranges:
+                heads.append((ticker, start, end))
+                continue
+            covered_start, covered_end = ranges[ticker]
+            if start < covered_start:
+                heads.append((ticker, start, covered_start))
+            if end > covered_end:
+                tails.append((ticker, covered_end, end))
+        if not heads and not tails:
+            print("Market data store is up to date.")
+            return {}
+
+        original_ranges = dict(ranges)
+        # Bars before today are final; later ones may still arrive, so coverage stops at the last bar
+        final_until = min(end, pd.Timestamp.today().normalize())
+        fetched_rows = {}
+        new_bars = {}
+        for batch in (heads, tails):
+            if not batch:
+                continue
+            names, starts, ends = (list(column) for column in zip(*batch))
+            fetched = source.fetch_many(names, starts, ends, granularity=granularity)
+            errors = getattr(source, "last_fetch_stats", {})
+            for ticker, batch_start, batch_end in batch:
+                df = fetched.get(ticker)
+                if df is not None and not df.empty:
+                    df = df[(df.index >= batch_start) & (df.index < batch_end)]
+                if df is None or df.empty:
+                    if errors.get(ticker, {}).get("error"):
+                        continue
+                    covered_until = max(batch_start, min(batch_end, final_until))
+                    if ticker in ranges:
+                        covered_start, covered_end = ranges[ticker]
+                        ranges[ticker] = (min(covered_start, batch_start), max(covered_end, covered_until))
+                    else:
+                        ranges[ticker] = (batch_start, covered_until)
+                    continue
+                if ticker in new_bars:
+                    df = pd.concat([new_bars[ticker], df]).sort_index()
+                new_bars[ticker] = df
+                covered_start, covered_end = ranges.get(ticker, (batch_start, batch_start))
+                covered_end = max(covered_end, df.index.max() + pd.Timedelta(days=1), min(batch_end, final_until))
+                ranges[ticker] = (min(covered_start, batch_start), covered_end)
+                fetched_rows[ticker] = fetched_rows.get(ticker, 0) + len(df)
+
+        if new_bars or ranges != original_ranges:
+            self.append(new_bars, ranges)
+        print(f"Synced {len(fetched_rows)} tickers, {sum(fetched_rows.values())} new rows.")
+        return fetched_rows
+
+
+_FILL = {"present": False, "eligible": False}
+
+
+def _blank(name, shape):
+    """Empty store array: False for the bool arrays, NaN for prices, in Fortran (per-ticker) order."""
+    if name in _FILL:
+        return np.zeros(shape, dtype=bool, order="F")
+    return np.full(shape, np.nan, order="F")
+
+
+def _put(arrays, rows, j, df):
+    """Write df's bars into column j of the store arrays at rows."""
+    arrays["present"][rows, j] = True
+    for field in FIELDS:
+        if field in df.columns:
+            arrays[field][rows, j] = df[field].to_numpy(dtype=arrays[field].dtype)
+        elif field == "eligible":
+            arrays[field][rows, j] = True
+
+
+def normalize_ticker_dfs(ticker_dfs: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    for ticker in ticker_dfs:
+        if "eligible" not in ticker_dfs[ticker].columns:
+            ticker_dfs[ticker]["eligible"] = True
+        # Ensure index is date-only and timezone-naive
+        ticker_dfs[ticker].index = ticker_dfs[ticker].index.normalize().tz_localize(None)
+    return ticker_dfs
+
+
+def convert_pickle(pickle_path: str = "dataset.obj", store_path: str = STORE_PATH) -> Optional[MarketDataStore]:
+    """One-shot conversion of the lzma pickle dataset into a MarketDataStore."""
+    from utils import load_pickle
+
+    data = load_pickle(pickle_path)
+    if data is None:
+        return None
+    tickers, ticker_dfs = data
+    ticker_dfs = normalize_ticker_dfs(ticker_dfs)
+    store = MarketDataStore(store_path)
+    store.write(tickers, ticker_dfs)
+    return store
+
+
+if __name__ == "__main__":
+    convert_pickle(*sys.argv[1:3])
@@ -0,0 +1,90 @@
+import numpy as np
+
+
+class RollingMean:
+    """Fixed-window mean over a stream of per-ticker observations.
+
+    One ring buffer column per ticker with a Kahan-compensated running sum, so each
+    push costs O(1) per ticker whatever the window. Columns advance independently
+    (only the tickers in mask receive an observation), which matches pandas
+    rolling(window).mean() over each ticker's own rows: the mean is NaN until the
+    window holds `window` non-NaN values.
+    """
+
+    def __init__(self, window, n):
+        self.window = window
+        self.buffer = np.full((window, n), np.nan)
+        self.pos = np.zeros(n, dtype=int)
+        self.total = np.zeros(n)
+        self.compensation = np.zeros(n)
+        self.valid = np.zeros(n, dtype=int)
+
+    def _add(self, cols, values):
+        y = values - self.compensation[cols]
+        t = self.total[cols] + y
+        self.compensation[cols] = (t - self.total[cols]) - y
+        self.total[cols] = t
+
+    def push(self, values, mask=None):
+        """Append values (length n) for the tickers in mask (all when None); return the current means."""
+        cols = np.arange(len(self.pos)) if mask is None else np.flatnonzero(mask)
+        new = values[cols]
+        old = self.buffer[self.pos[cols], cols]
+
+        leaving = ~np.isnan(old)
+        self._add(cols[leaving], -old[leaving])
+        self.valid[cols[leaving]] -= 1
+        entering = ~np.isnan(new)
+        self._add(cols[entering], new[entering])
+        self.valid[cols[entering]] += 1
+
+        empty = cols[self.valid[cols] == 0]
+        self.total[empty] = 0
+        self.compensation[empty] = 0
+        self.buffer[self.pos[cols], cols] = new
+        self.pos[cols] = (self.pos[cols] + 1) % self.window
+        return self.mean()
+
+    def mean(self):
+        return np.where(self.valid == self.window, self.total / self.window, np.nan)
+
+
+def bar_arrays(insts, bar, fields):
+    """Turn {inst: {field: value}} into (mask, {field: array}) aligned with insts."""
+    mask = np.array([inst in bar for inst in insts], dtype=bool)
+    arrays = {}
+    for field in fields:
+        arrays[field] = np.array(
+            [float(bar[inst][field]) if inst in bar else np.nan for inst in insts]
+        )
+    return mask, arrays
+
+
+def iter_frame_bars(dfs, insts, dates, fields=("open", "high", "low", "close", "volume", "eligible"),
+                    universe=None):
+    """Yield (date, bar) pairs for dates from per-inst DataFrames, as Alpha.update expects.
+
+    With a universe.Universe the rows come from its calendar, and insts outside its
+    point-in-time membership on a date still get a bar but are not eligible.
+    """
+    master = None if universe is None else universe.rows(dates)
+    columns = []
+    for inst in insts:
+        df = dfs[inst]
+        if universe is None:
+            rows, members = df.index.get_indexer(dates), None
+        else:
+            j = universe.index[inst]
+            rows = universe.frame_rows(master, j)
+            members = universe.members[master, j] & (master >= 0)
+        values = {field: df[field].to_numpy() for field in fields if field in df.columns}
+        columns.append((inst, rows, members, values))
+    for i, date in enumerate(dates):
+        bar = {}
+        for inst, rows, members, values in columns:
+            row = rows[i]
+            if row >= 0:
+                bar[inst] = {field: column[row] for field, column in values.items()}
+                if members is not None and not members[i]:
+                    bar[inst]["eligible"] = False
+        yield date, bar
@@ -0,0 +1,301 @@
+import itertools
+import numpy as np
+import pandas as pd
+
+from alphas import MeanReversalAlpha, PriceRatioMeanReversalAlpha, MomentumAlpha, AdaptiveRegimeAlpha
+from trader import Trader, target_weights, compounded_equity
+from normalize import zscore
+from regime import RegimeFeatures
+from universe import Universe
+
+# Strategy name -> the alpha signals it combines, as in main.py
+STRATEGIES = {
+    "MeanReversalAlpha": ("mean_reversal",),
+    "PriceRatioMeanAlpha": ("price_ratio",),
+    "MomentumAlpha": ("momentum",),
+    "Combined Alpha": ("mean_reversal", "price_ratio", "momentum"),
+    "Regime Switching Alpha": ("regime",),
+}
+
+DEFAULT_PARAMS = {
+    "mean_reversal_window": 12,
+    "price_ratio_window": 12,
+    "momentum_pairs": ((10, 50), (20, 100), (50, 200)),
+    "ma_window": 200,
+    "quantile": 4,
+}
+
+STAT_KEYS = ("Total Return (%)", "Annualized Return (%)", "Annualized Volatility (%)",
+             "Sharpe Ratio", "Max Drawdown (%)")
+
+
+class WindowSums:
+    """Prefix sums of a dates x tickers panel, so any trailing-window mean is two gathers.
+
+    Rows are each column's own observations (rows[t, j] is the row of date t in column
+    j, -1 when absent); a window is valid only when it holds `window` non-NaN values,
+    which is pandas rolling(window).mean() semantics.
+    """
+
+    def __init__(self, values, rows):
+        missing = np.isnan(values)
+        zeros = np.zeros((1, values.shape[1]))
+        self.sums = np.concatenate((zeros, np.cumsum(np.where(missing, 0, values), axis=0)))
+        self.missing = np.concatenate((zeros, np.cumsum(missing, axis=0)))
+        self.rows = rows
+
+    def mean(self, window):
+        hi = self.rows + 1
+        lo = np.maximum(hi - window, 0)
+        total = np.take_along_axis(self.sums, hi, axis=0) - np.take_along_axis(self.sums, lo, axis=0)
+        gaps = np.take_along_axis(self.missing, hi, axis=0) - np.take_along_axis(self.missing, lo, axis=0)
+        valid = (self.rows >= 0) & (hi >= window) & (gaps == 0)
+        return np.where(valid, total / window, np.nan)
+
+
+class SweepFeatures:
+    """Intermediates shared by every parameter set of a sweep.
+
+    Price panels, the MeanReversal z-scores and the prefix sums behind every rolling
+    window are built once; alpha panels are cached per window, so a grid only pays
+    for the windows it has not seen yet. Panels cover the trade dates on which at
+    least one ticker trades, as the vectorized engine does.
+    """
+
+    def __init__(self, tickers, dfs, start, end, sp500_df=None):
+        self.tickers = tickers
+        self.dfs = dfs
+        self.start = start
+        self.end = end
+        self.sp500_df = sp500_df
+
+        universe = Universe(tickers, dfs)
+        trade_range = universe.span(start, end)
+
+        shape = (len(trade_range), len(tickers))
+        master = universe.rows(trade_range)
+        rows = np.full(shape, -1)
+        for j in range(len(tickers)):
+            rows[:, j] = universe.frame_rows(master, j)
+        available = rows >= 0
+        self.active = available.any(axis=1)
+        self.dates = trade_range[self.active]
+        self.available = available[self.active]
+
+        # Own-row histories (padded to a common length) for the per-ticker rolling alphas
+        length = max(len(dfs[ticker]) for ticker in tickers)
+        own = {field: np.full((length, len(tickers)), np.nan) for field in ("open", "high", "low", "close", "volume")}
+        for j, ticker in enumerate(tickers):
+            df = dfs[ticker]
+            for field, values in own.items():
+                values[:len(df), j] = df[field].to_numpy(dtype=float)
+        self.close = self._on_dates(own["close"], rows)[self.active]
+        eligible = np.zeros(shape, dtype=bool)
+        for j, ticker in enumerate(tickers):
+            found = available[:, j]
+            eligible[found, j] = dfs[ticker]["eligible"].to_numpy(dtype=bool)[rows[found, j]]
+        self.eligible = eligible[self.active] & self.available
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = 1 - own["open"] / own["close"]
+        self._ratio_sums = WindowSums(ratio, rows)
+        self._close_sums = WindowSums(own["close"], rows)
+
+        # MeanReversal z-scores live on the trade calendar (ffill across missing dates)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            op3 = own["high"] - own["low"]
+            op4 = own["volume"] * ((own["close"] - own["low"]) - (own["high"] - own["close"])) \
+                / np.where(op3 == 0, np.nan, op3)
+        op4 = np.where(np.isinf(op4), 0, op4)
+        op4 = pd.DataFrame(self._on_dates(op4, rows)).ffill().to_numpy()
+        self._zscore_sums = WindowSums(zscore(op4), np.broadcast_to(np.arange(shape[0])[:, None], shape))
+
+        self._rows = rows
+        self._panels = {}
+        self._means = {}
+
+    @staticmethod
+    def _on_dates(values, rows):
+        picked = np.take_along_axis(values, np.maximum(rows, 0), axis=0)
+        return np.where(rows >= 0, picked, np.nan)
+
+    def _finish(self, values):
+        """Trade-range alpha values -> the panel the engine ranks (active dates, NaN and absent as 0)."""
+        values = values[self.active]
+        return np.where(self.available & ~np.isnan(values), values, 0)
+
+    def _cached(self, key, build):
+        if key not in self._panels:
+            self._panels[key] = build()
+        return self._panels[key]
+
+    def mean_reversal(self, window):
+        return self._cached(("mean_reversal", window),
+                            lambda: self._finish(np.nan_to_num(self._zscore_sums.mean(window) * -1)))
+
+    def price_ratio(self, window):
+        return self._cached(("price_ratio", window),
+                            lambda: self._finish(np.nan_to_num(-1 * self._ratio_sums.mean(window))))
+
+    def _close_mean(self, window):
+        if window not in self._means:
+            self._means[window] = self._close_sums.mean(window)
+        return self._means[window]
+
+    def momentum(self, pairs):
+        pairs = tuple(tuple(pair) for pair in pairs)
+
+        def build():
+            score = np.zeros(self._rows.shape)
+            for fast, slow in pairs:
+                score += self._close_mean(fast) > self._close_mean(slow)
+            return self._finish(score)
+        return self._cached(("momentum", pairs), build)
+
+    def regime(self, ma_window, mean_reversal_window, price_ratio_window, momentum_pairs):
+        if self.sp500_df is None:
+            raise ValueError("Regime Switching Alpha needs sp500_df")
+        # Same alignment as AdaptiveRegimeAlpha: onto the first ticker's calendar, then the trade dates
+        regime = RegimeFeatures(self.sp500_df, ma_window).aligned(self.dfs[list(self.dfs.keys())[0]].index)
+        has_regime, trending = regime.on(self.dates)
+        reversal = (self.mean_reversal(mean_reversal_window) + self.price_ratio(price_ratio_window)) / 2
+        signal = np.where(trending[:, None], self.momentum(momentum_pairs), reversal)
+        return np.where(has_regime[:, None] & self.available, signal, 0)
+
+    def alpha_panels(self, strategy, params):
+        """The alpha panels a strategy ranks for one parameter set."""
+        panels = []
+        for alpha in STRATEGIES[strategy]:
+            if alpha == "mean_reversal":
+                panels.append(self.mean_reversal(params["mean_reversal_window"]))
+            elif alpha == "price_ratio":
+                panels.append(self.price_ratio(params["price_ratio_window"]))
+            elif alpha == "momentum":
+                panels.append(self.momentum(params["momentum_pairs"]))
+            else:
+                panels.append(self.regime(params["ma_window"], params["mean_reversal_window"],
+                                          params["price_ratio_window"], params["momentum_pairs"]))
+        return panels
+
+
+def param_grid(strategies=None, **axes):
+    """Cartesian product of parameter values -> list of parameter sets.
+
+    Unlisted parameters keep their DEFAULT_PARAMS value; parameters a strategy does
+    not use are dropped, so duplicate combinations collapse.
+    """
+    strategies = list(strategies or STRATEGIES)
+    axes = {name: list(values) for name, values in axes.items()}
+    for name in axes:
+        if name not in DEFAULT_PARAMS:
+            raise ValueError(f"Unknown sweep parameter '{name}'")
+    param_sets = []
+    seen = set()
+    for strategy in strategies:
+        used = _used_params(strategy)
+        names = [name for name in axes if name in used]
+        for values in itertools.product(*(axes[name] for name in names)):
+            params = {name: DEFAULT_PARAMS[name] for name in used}
+            params.update(zip(names, values))
+            if "momentum_pairs" in params:
+                params["momentum_pairs"] = tuple(tuple(pair) for pair in params["momentum_pairs"])
+            key = (strategy, tuple(sorted(params.items())))
+            if key not in seen:
+                seen.add(key)
+                param_sets.append({"strategy": strategy, **params})
+    return param_sets
+
+
+def _used_params(strategy):
+    used = {"quantile"}
+    for alpha in STRATEGIES[strategy]:
+        if alpha in ("mean_reversal", "regime"):
+            used.add("mean_reversal_window")
+        if alpha in ("price_ratio", "regime"):
+            used.add("price_ratio_window")
+        if alpha in ("momentum", "regime"):
+            used.add("momentum_pairs")
+        if alpha == "regime":
+            used.add("ma_window")
+    return used
+
+
+def batch_pnl_stats(equity):
+    """get_pnl_stats scalars for a (param sets, dates) batch of equity curves."""
+    returns = equity[:, 1:] / equity[:, :-1] - 1
+    annualized_return = returns.mean(axis=1) * 252
+    annualized_volatility = returns.std(axis=1, ddof=1) * np.sqrt(252)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe_ratio = np.where(annualized_volatility > 0, annualized_return / annualized_volatility, 0)
+    rolling_max = np.maximum.accumulate(equity, axis=1)
+    return {
+        "Total Return (%)": (equity[:, -1] / equity[:, 0] - 1) * 100,
+        "Annualized Return (%)": annualized_return * 100,
+        "Annualized Volatility (%)": annualized_volatility * 100,
+        "Sharpe Ratio": sharpe_ratio,
+        "Max Drawdown (%)": ((equity - rolling_max) / rolling_max).min(axis=1) * 100,
+    }
+
+
+def _replay_stats(features, params, cash):
+    """Run one parameter set through the Trader when the closed-form equity does not apply."""
+    kwargs = (features.tickers, features.dfs, features.start, features.end)
+    alphas = []
+    for alpha in STRATEGIES[params["strategy"]]:
+        if alpha == "mean_reversal":
+            alphas.append(MeanReversalAlpha(*kwargs, window=params["mean_reversal_window"]))
+        elif alpha == "price_ratio":
+            alphas.append(PriceRatioMeanReversalAlpha(*kwargs, window=params["price_ratio_window"]))
+        elif alpha == "momentum":
+            alphas.append(MomentumAlpha(*kwargs, pairs=params["momentum_pairs"]))
+        else:
+            sp500 = features.sp500_df[["close"]].copy()
+            sp500["ma200"] = sp500["close"].rolling(params["ma_window"]).mean()
+            alphas.append(AdaptiveRegimeAlpha(*kwargs, sp500,
+                                              mean_reversal_window=params["mean_reversal_window"],
+                                              price_ratio_window=params["price_ratio_window"],
+                                              momentum_pairs=params["momentum_pairs"]))
+    trader = Trader(*kwargs[:2], features.start, features.end, alphas, engine="vectorized",
+                    quantile=params["quantile"])
+    trader.cash = cash
+    trader.run_backtest()
+    stats = trader.get_pnl_stats()
+    if "error" in stats:
+        return {key: np.nan for key in STAT_KEYS}, np.nan
+    return {key: stats[key] for key in STAT_KEYS}, stats["Equity Curve"].iloc[-1]
+
+
+def sweep(features, param_sets, batch_size=32, cash=100000):
+    """Backtest every parameter set and return one row of get_pnl_stats metrics per set.
+
+    Parameter sets of the same strategy are simulated together as (sets, dates, tickers)
+    arrays; sets whose book cannot use the closed-form equity curve are replayed
+    through the Trader one at a time.
+    """
+    by_strategy = {}
+    for i, params in enumerate(param_sets):
+        by_strategy.setdefault(params["strategy"], []).append(i)
+    rows = [None] * len(param_sets)
+    print(f"Sweeping {len(param_sets)} parameter sets over {len(features.dates)} dates.")
+    if len(features.dates) < 2:
+        raise ValueError("Need at least two trade dates to sweep")
+
+    for strategy, indices in by_strategy.items():
+        for lo in range(0, len(indices), batch_size):
+            batch = indices[lo:lo + batch_size]
+            panels = [features.alpha_panels(strategy, param_sets[i]) for i in batch]
+            alpha_panels = [np.stack(stack) for stack in zip(*panels)]
+            quantile = np.array([param_sets[i]["quantile"] for i in batch]).reshape(-1, 1, 1)
+            weights = target_weights(alpha_panels, features.eligible, quantile)
+            weights = np.where(features.available, weights, 0)
+            equity, valid = compounded_equity(features.close, features.available, weights, cash)
+            stats = batch_pnl_stats(equity)
+            for k, i in enumerate(batch):
+                if valid[k]:
+                    row_stats = {key: float(values[k]) for key, values in stats.items()}
+                    final_equity = float(equity[k, -1])
+                else:
+                    row_stats, final_equity = _replay_stats(features, param_sets[i], cash)
+                rows[i] = {**param_sets[i], "final_equity": final_equity, **row_stats}
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,41 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from benchmark import synthetic_universe, synthetic_sp500
+from runner import STRATEGY_NAMES, build_strategies
+from trader import Trader
+
+
+@pytest.fixture(scope="module")
+def universe():
+    tickers, dfs = synthetic_universe(15, 3, seed=4)
+    dates = dfs[tickers[0]].index
+    return tickers, dfs, synthetic_sp500(dfs), dates[252], dates[-1]
+
+
+def equity(universe, name, engine, **options):
+    tickers, dfs, sp500_df, start, end = universe
+    alphas = build_strategies(tickers, dfs, start, end, sp500_df, [name])[name]
+    trader = Trader(tickers, dfs, start, end, alphas, engine=engine, **options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        trader.run_backtest()
+    return np.array(trader.equity), trader
+
+
+@pytest.mark.parametrize("name", STRATEGY_NAMES)
+def test_chunked_matches_vectorized_within_documented_tolerance(universe, name):
+    expected, _ = equity(universe, name, "vectorized")
+    chunked, trader = equity(universe, name, "chunked", chunk_size=50)
+    np.testing.assert_allclose(chunked, expected, rtol=1e-9)
+    assert trader.memory_stats()["chunk_size"] == 50
+
+    # The chunk size only changes how much is held at once
+    single, _ = equity(universe, name, "chunked", chunk_size=1000)
+    np.testing.assert_array_equal(single, chunked)
+
+    low, trader = equity(universe, name, "chunked", dtype=np.float32)
+    np.testing.assert_allclose(low, expected, rtol=1e-3)
+    assert trader.memory_stats()["dtype"] == "float32"
@@ -0,0 +1,41 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from benchmark import synthetic_universe, synthetic_sp500
+from costs import default_cost_model
+from runner import STRATEGY_NAMES, build_strategies
+from trader import Trader
+
+FRICTIONS = {
+    "frictionless": {},
+    "costs": {"costs": default_cost_model()},
+    "no_trade_band": {"costs": default_cost_model(), "no_trade_band": 0.002},
+}
+
+
+@pytest.fixture(scope="module")
+def universe():
+    tickers, dfs = synthetic_universe(12, 3, seed=11)
+    dates = dfs[tickers[0]].index
+    return tickers, dfs, synthetic_sp500(dfs), dates[252], dates[-1]
+
+
+def equity(universe, name, engine, **options):
+    tickers, dfs, sp500_df, start, end = universe
+    alphas = build_strategies(tickers, dfs, start, end, sp500_df, [name])[name]
+    trader = Trader(tickers, dfs, start, end, alphas, engine=engine, **options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        trader.run_backtest()
+    return np.array(trader.equity)
+
+
+@pytest.mark.parametrize("friction", FRICTIONS)
+@pytest.mark.parametrize("name", STRATEGY_NAMES)
+def test_vectorized_matches_loop(universe, name, friction):
+    expected = equity(universe, name, "loop", **FRICTIONS[friction])
+    vectorized = equity(universe, name, "vectorized", **FRICTIONS[friction])
+    assert len(vectorized) == len(expected)
+    np.testing.assert_allclose(vectorized, expected, rtol=1e-14, atol=0)
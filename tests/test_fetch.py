@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pandas as pd
+
+from benchmark import synthetic_universe
+from data_sources import FrameSource
+from fetch import FetchPool, RateLimiter
+
+START, END = pd.Timestamp("2015-01-01"), pd.Timestamp("2015-07-01")
+
+
+def frames(n=6):
+    tickers, dfs = synthetic_universe(n, 1, seed=4)
+    return tickers, dfs
+
+
+def pool(source, sleeps=None, **options):
+    options = {"max_attempts": 3, "backoff": 0.5, "jitter": 0.0, **options}
+    return FetchPool(source, sleep=(sleeps.append if sleeps is not None else lambda seconds: None), **options)
+
+
+def test_retries_with_exponential_backoff():
+    tickers, dfs = frames()
+    sleeps = []
+    fetcher = pool(FrameSource(dfs, failures={tickers[0]: 2}), sleeps, batch_size=1)
+    result = fetcher.fetch(tickers[:1], [START], [END])
+    assert list(result) == tickers[:1]
+    assert sleeps == [0.5, 1.0]
+    assert fetcher.stats[tickers[0]]["attempts"] == 3
+    assert fetcher.stats[tickers[0]]["error"] is None
+
+
+def test_gives_up_after_max_attempts_and_records_the_error():
+    tickers, dfs = frames()
+    source = FrameSource(dfs, failures={tickers[0]: 5})
+    fetcher = pool(source, batch_size=1)
+    result = fetcher.fetch(tickers[:2], [START] * 2, [END] * 2)
+    assert list(result) == tickers[1:2]
+    stat = fetcher.stats[tickers[0]]
+    assert stat["attempts"] == 3 and stat["rows"] == 0 and "simulated failure" in stat["error"]
+    assert fetcher.summary()["failed"] == tickers[:1]
+    assert fetcher.stats[tickers[1]]["rows"] == len(source._slice(tickers[1], START, END))
+
+
+class DroppingSource(FrameSource):
+    """Batch requests silently leave out one ticker, as yfinance.download can."""
+
+    def __init__(self, ticker_dfs, dropped, **options):
+        super().__init__(ticker_dfs, **options)
+        self.dropped = dropped
+
+    def fetch_batch(self, tickers, start, end, granularity="1d"):
+        frames = super().fetch_batch(tickers, start, end, granularity)
+        frames.pop(self.dropped, None)
+        return frames
+
+
+def test_tickers_dropped_by_a_batch_are_fetched_one_by_one():
+    tickers, dfs = frames()
+    source = DroppingSource(dfs, tickers[2])
+    result = pool(source, batch_size=4, max_workers=1).fetch(tickers, [START] * 6, [END] * 6)
+    assert sorted(result) == sorted(tickers)
+    assert source.requests == [
+        (tuple(tickers[:4]), START, END),
+        ((tickers[2],), START, END),
+        (tuple(tickers[4:]), START, END),
+    ]
+
+
+def test_failing_batch_does_not_fall_back_to_single_requests():
+    tickers, dfs = frames()
+    source = FrameSource(dfs, failures={tickers[0]: 100})
+    fetcher = pool(source, batch_size=3, max_workers=1)
+    result = fetcher.fetch(tickers[:3], [START] * 3, [END] * 3)
+    assert result == {}
+    assert len(source.requests) == 3
+    for ticker in tickers[:3]:
+        assert fetcher.stats[ticker]["attempts"] == 3
+        assert "simulated failure" in fetcher.stats[ticker]["error"]
+
+
+class SlowSource(FrameSource):
+    def __init__(self, ticker_dfs):
+        super().__init__(ticker_dfs)
+        self.active = 0
+        self.peak = 0
+        self.counter = threading.Lock()
+
+    def fetch(self, ticker, start, end, granularity="1d"):
+        with self.counter:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.02)
+        with self.counter:
+            self.active -= 1
+        return super().fetch(ticker, start, end, granularity)
+
+
+def test_concurrency_is_bounded_by_max_workers():
+    tickers, dfs = frames(12)
+    source = SlowSource(dfs)
+    result = pool(source, batch_size=1, max_workers=3).fetch(tickers, [START] * 12, [END] * 12)
+    assert len(result) == 12
+    assert 1 < source.peak <= 3
+
+
+def test_rate_limiter_spaces_requests():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(rate=4.0, clock=lambda: now[0], sleep=sleep)
+    for _ in range(3):
+        limiter.acquire()
+    assert sleeps == [0.25, 0.25]
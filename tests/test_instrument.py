@@ -0,0 +1,28 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from benchmark import synthetic_universe
+from instrument import make_metrics
+from runner import build_strategies, run_strategy
+
+
+def test_stop_ends_profiler_and_report_keeps_samples():
+    metrics = make_metrics(profile=True)
+    threads = threading.active_count()
+    sum(i * i for i in range(200000))
+    metrics.stop()
+    assert threading.active_count() == threads - 1
+    assert "profile" in metrics.report()
+    metrics.stop()
+
+
+def test_run_strategy_stops_profiler_when_backtest_fails():
+    tickers, dfs = synthetic_universe(5, 1, seed=1)
+    start, end = pd.Timestamp("2015-03-01"), pd.Timestamp("2015-12-31")
+    alphas = build_strategies(tickers, dfs, start, end, None, ["MomentumAlpha"])["MomentumAlpha"]
+    threads = threading.active_count()
+    with pytest.raises(ValueError):
+        run_strategy("MomentumAlpha", alphas, tickers, dfs, start, end, engine="turbo", profile=True)
+    assert threading.active_count() == threads
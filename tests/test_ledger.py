@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from alphas import MomentumAlpha
+from benchmark import synthetic_universe
+from ledger import TradeLedger
+from streaming import iter_frame_bars
+from trader import Trader
+
+
+def test_bounded_ledger_carries_positions_of_dropped_trades():
+    ledger = TradeLedger(capacity=2, max_rows=3)
+    dates = pd.bdate_range("2020-01-01", periods=6)
+    for i, date in enumerate(dates):
+        ledger.record(date, np.array([i % 2]), np.array([1.0]), np.array([10.0]), np.array([float(i)]))
+    assert len(ledger) <= 6
+    held = ledger.positions(["A", "B"], dates[-2:])
+    assert held.loc[dates[-1]].tolist() == [4.0, 5.0]
+    assert held.loc[dates[-2]].tolist() == [4.0, 3.0]
+
+
+def test_event_ledger_is_bounded_by_max_history():
+    tickers, dfs = synthetic_universe(10, 2, seed=2)
+    dates = dfs[tickers[0]].index[60:]
+    start, end = dates[0], dates[-1]
+
+    def run(max_history):
+        alphas = [MomentumAlpha(tickers, dfs, start, end, pairs=((5, 20),))]
+        trader = Trader(tickers, dfs, start, end, alphas, engine="event", max_history=max_history)
+        for _ in trader.run_stream(iter_frame_bars(dfs, tickers, dates)):
+            pass
+        return trader
+
+    bounded, unbounded = run(20), run(None)
+    assert len(bounded.ledger) <= 2 * 20 * len(tickers) < len(unbounded.ledger)
+    assert bounded.portfolio == unbounded.portfolio
+    window = pd.DatetimeIndex(list(bounded.equity_dates))
+    pd.testing.assert_frame_equal(bounded.position_history(window), unbounded.position_history(window))
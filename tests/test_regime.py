@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+from alphas import AdaptiveRegimeAlpha
+from benchmark import synthetic_universe
+from data_sources import FrameSource
+from regime import SP500
+from utils import get_sp500_data
+
+
+def test_offline_empty_index_store_gives_no_regime(tmp_path):
+    # No cached bars and every fetch fails: the regime alpha falls back to zeros
+    source = FrameSource({}, failures={SP500: 100})
+    sp500_df = get_sp500_data("2016-01-01", "2017-12-31", source=source, store_path=str(tmp_path / "index"))
+    assert sp500_df.empty
+    assert isinstance(sp500_df.index, pd.DatetimeIndex)
+
+    tickers, dfs = synthetic_universe(6, 2, seed=3)
+    start, end = pd.Timestamp("2016-01-01"), pd.Timestamp("2016-12-31")
+    alpha = AdaptiveRegimeAlpha(tickers, dfs, start, end, sp500_df)
+    values = alpha.compute(pd.bdate_range(start, end))
+    assert not np.any(values)
@@ -0,0 +1,55 @@
+import contextlib
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+from analytics import PnlReport, json_default
+from benchmark import synthetic_universe, synthetic_sp500
+from results import ResultStore
+from runner import build_strategies, run_strategies
+
+START, END = pd.Timestamp("2015-06-01"), pd.Timestamp("2016-12-31")
+
+
+def run(tickers, dfs, store):
+    strategies = build_strategies(tickers, dfs, START, END, synthetic_sp500(dfs),
+                                  ["MeanReversalAlpha", "Regime Switching Alpha"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_strategies(strategies, tickers, dfs, START, END, max_workers=1, store=store)
+
+
+def test_stored_run_is_reused_until_ohlc_data_changes(tmp_path):
+    store = ResultStore(str(tmp_path / "results"))
+    tickers, dfs = synthetic_universe(8, 2, seed=9)
+    first = run(tickers, dfs, store)
+    again = run(tickers, dfs, store)
+    assert [result["run_key"] for result in again] == [result["run_key"] for result in first]
+
+    # Corrected highs and lows only reach the alphas, not the trader's close/volume
+    corrected = {ticker: df.assign(high=df["high"] * 1.01, low=df["low"] * 0.99) for ticker, df in dfs.items()}
+    rerun = run(tickers, corrected, store)
+    fresh = run(tickers, corrected, None)
+    for old, new, expected in zip(first, rerun, fresh):
+        assert new["run_key"] != old["run_key"]
+        assert new["final_equity"] == expected["final_equity"]
+    assert rerun[0]["final_equity"] != first[0]["final_equity"]
+
+
+def test_analytics_stay_arrays_until_the_front_end(tmp_path):
+    store = ResultStore(str(tmp_path / "results"))
+    tickers, dfs = synthetic_universe(6, 2, seed=3)
+    fresh = run(tickers, dfs, None)[0]["analytics"]
+    assert isinstance(fresh, PnlReport)
+    assert all(isinstance(values, np.ndarray) for values in fresh.series.values())
+
+    run(tickers, dfs, store)
+    loaded = run(tickers, dfs, store)[0]["analytics"]
+    for name, values in fresh.series.items():
+        np.testing.assert_array_equal(loaded.series[name], values)
+    np.testing.assert_array_equal(loaded.attribution["alpha"]["daily"], fresh.attribution["alpha"]["daily"])
+    assert list(loaded.dates) == list(fresh.dates)
+
+    event = json.loads(json.dumps({"type": "result", "analytics": loaded}, default=json_default))
+    assert event["analytics"] == json.loads(json.dumps(fresh.to_dict()))
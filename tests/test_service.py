@@ -0,0 +1,77 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from benchmark import synthetic_universe, synthetic_sp500
+from runner import STRATEGY_NAMES, build_strategies, run_strategy
+from service import BacktestService
+from trader import ENGINES
+
+START, END = "2016-01-01", "2017-12-31"
+
+
+@pytest.fixture(scope="module")
+def universe():
+    tickers, dfs = synthetic_universe(12, 3, seed=7)
+    return tickers, dfs, synthetic_sp500(dfs)
+
+
+def serial_equity(tickers, dfs, sp500_df, engine):
+    start, end = pd.Timestamp(START), pd.Timestamp(END)
+    strategies = build_strategies(tickers, dfs, start, end, sp500_df)
+    return {
+        name: run_strategy(name, alphas, tickers, dfs, start, end, engine, costs=None)["final_equity"]
+        for name, alphas in strategies.items()
+    }
+
+
+def service_equity(tickers, dfs, sp500_df, engine):
+    request = {"start": START, "end": END, "engine": engine, "frictionless": True}
+
+    async def run():
+        async with BacktestService(tickers, dfs, sp500_df=sp500_df, max_workers=len(STRATEGY_NAMES)) as service:
+            return await service.run(request)
+
+    return {result["strategy_name"]: result["final_equity"] for result in asyncio.run(run())}
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_service_matches_serial_trader(universe, engine):
+    tickers, dfs, sp500_df = universe
+    expected = serial_equity(tickers, dfs, sp500_df, engine)
+    assert service_equity(tickers, dfs, sp500_df, engine) == pytest.approx(expected, rel=1e-12)
+
+
+def test_service_rejects_unknown_engine(universe):
+    tickers, dfs, sp500_df = universe
+
+    async def run():
+        async with BacktestService(tickers, dfs, sp500_df=sp500_df) as service:
+            return [event async for event in service.submit({"engine": "turbo"})]
+
+    events = asyncio.run(run())
+    assert events[-1]["type"] == "error" and "turbo" in events[-1]["error"]
+
+
+def test_index_is_fetched_for_the_request_window_outside_the_lock(universe, monkeypatch):
+    import utils
+
+    tickers, dfs, sp500_df = universe
+    calls = []
+
+    async def run():
+        async with BacktestService(tickers, dfs) as service:
+            def get_sp500_data(start, end):
+                calls.append((start, end, service._lock.locked()))
+                return sp500_df
+
+            monkeypatch.setattr(utils, "get_sp500_data", get_sp500_data)
+            request = {"start": START, "end": END, "strategies": ["Regime Switching Alpha"], "frictionless": True}
+            first = await service.run(request)
+            again = await service.run(request)
+            return first, again
+
+    first, again = asyncio.run(run())
+    assert calls == [(pd.Timestamp(START), pd.Timestamp(END), False)]
+    assert first[0]["final_equity"] == again[0]["final_equity"]
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from benchmark import synthetic_universe
+from data_sources import FrameSource
+from store import MarketDataStore
+
+
+def frames():
+    tickers, dfs = synthetic_universe(5, 2, seed=11)
+    # A ticker listed in the second year, like DASH before its IPO
+    late = dfs[tickers[1]].iloc[300:].copy()
+    return tickers, {**dfs, "LATE": late}
+
+
+def assert_store_matches(store, dfs, start, end):
+    tickers, stored = store.read()
+    for ticker in tickers:
+        expected = dfs[ticker][(dfs[ticker].index >= start) & (dfs[ticker].index < end)]
+        pd.testing.assert_frame_equal(stored[ticker], expected, check_freq=False, check_names=False)
+
+
+def test_sync_appends_new_dates_and_tickers_in_place(tmp_path):
+    tickers, dfs = frames()
+    source = FrameSource(dfs)
+    store = MarketDataStore(str(tmp_path / "store"))
+    start = pd.Timestamp("2015-01-01")
+
+    store.sync(tickers[:3], start, "2015-07-01", source)
+    store.sync(tickers[:3], start, "2015-07-02", source)
+    capacity = store._capacity()
+    for end in ("2015-07-03", "2015-07-10", "2015-08-01"):
+        store.sync(tickers[:3], start, end, source)
+    # Daily refreshes fill the spare rows instead of rewriting the arrays
+    assert store._capacity() == capacity
+    assert_store_matches(store, dfs, start, pd.Timestamp("2015-08-01"))
+
+    store.sync(tickers + ["LATE"], start, "2015-09-01", source)
+    assert store.tickers == tickers
+    assert_store_matches(store, dfs, start, pd.Timestamp("2015-09-01"))
+
+    # LATE had no bars in the span; it is covered and not fetched again
+    requests = len(source.requests)
+    store.sync(tickers + ["LATE"], start, "2015-09-01", source)
+    assert len(source.requests) == requests
+    assert "LATE" in store.ticker_ranges()
+
+    store.sync(tickers + ["LATE"], start, "2016-12-01", source)
+    assert store.tickers == tickers + ["LATE"]
+    assert_store_matches(store, dfs, start, pd.Timestamp("2016-12-01"))
+
+
+def test_sync_backfill_rewrites_store(tmp_path):
+    tickers, dfs = frames()
+    source = FrameSource(dfs)
+    store = MarketDataStore(str(tmp_path / "store"))
+    store.sync(tickers, "2015-06-01", "2016-01-01", source)
+    store.sync(tickers, "2015-01-01", "2016-01-01", source)
+    assert_store_matches(store, dfs, pd.Timestamp("2015-01-01"), pd.Timestamp("2016-01-01"))
+    assert np.asarray(store._load("close")).shape == (len(store.dates()), len(tickers))
+
+
+def test_failed_fetch_is_not_covered(tmp_path):
+    tickers, dfs = frames()
+    source = FrameSource(dfs, failures={tickers[0]: 100}, batch_size=1)
+    store = MarketDataStore(str(tmp_path / "store"))
+    store.sync(tickers[:2], "2015-01-01", "2015-06-01", source)
+    assert tickers[0] not in store.ticker_ranges()
+    assert tickers[1] in store.ticker_ranges()
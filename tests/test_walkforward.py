@@ -0,0 +1,54 @@
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import synthetic_universe, synthetic_sp500
+from runner import STRATEGY_NAMES, build_strategies
+from sweep import STAT_KEYS, SweepFeatures, batch_pnl_stats, param_grid
+from trader import Trader
+from walkforward import rolling_backtest, walk_forward
+
+START, END = pd.Timestamp("2016-01-01"), pd.Timestamp("2017-12-31")
+
+
+@pytest.fixture(scope="module")
+def universe():
+    tickers, dfs = synthetic_universe(10, 3, seed=5)
+    sp500_df = synthetic_sp500(dfs)
+    return tickers, dfs, sp500_df, SweepFeatures(tickers, dfs, START, END, sp500_df)
+
+
+def quiet(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+@pytest.mark.parametrize("name", STRATEGY_NAMES)
+def test_rolling_windows_match_one_trader_per_window(universe, name):
+    tickers, dfs, sp500_df, features = universe
+    windows = quiet(rolling_backtest, features, param_grid([name]), window=126, step=63, max_workers=3)
+    assert len(windows) == 6
+    for row in windows.to_dict("records"):
+        # Windows rank on alphas warmed up from the start of the span, so each one is
+        # checked against a Trader over start..window end, rebased to a fresh book
+        alphas = build_strategies(tickers, dfs, START, row["end"], sp500_df, [name])[name]
+        trader = Trader(tickers, dfs, START, row["end"], alphas, engine="vectorized")
+        quiet(trader.run_backtest)
+        equity = trader.get_pnl_stats()["Equity Curve"][row["start"]:].to_numpy()
+        equity = 100000 * equity / equity[0]
+        assert len(equity) == 126
+        expected = batch_pnl_stats(equity[None])
+        np.testing.assert_allclose([row[key] for key in STAT_KEYS], [expected[key][0] for key in STAT_KEYS],
+                                   rtol=1e-9)
+        assert row["final_equity"] == pytest.approx(equity[-1], rel=1e-12)
+
+
+def test_walk_forward_does_not_depend_on_the_worker_count(universe):
+    features = universe[3]
+    param_sets = param_grid(["MeanReversalAlpha", "MomentumAlpha"], quantile=[3, 4, 5])
+    serial = quiet(walk_forward, features, param_sets, train=126, test=63, batch_size=2, max_workers=1)
+    pooled = quiet(walk_forward, features, param_sets, train=126, test=63, batch_size=2, max_workers=4)
+    pd.testing.assert_frame_equal(serial, pooled)
@@ -1,95 +1,611 @@
+import sys
+import time
 import pandas as pd
 import numpy as np
+from collections import deque
+
+from streaming import iter_frame_bars
+from instrument import NULL_METRICS
+from ledger import TradeLedger
+from costs import as_cost_model
+from normalize import zscore
+from panel import Panel
+from universe import Universe
+from analytics import analyze, drawdowns, sortino_ratio, calmar_ratio, ticker_attribution, \
+    alpha_attribution
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+ENGINES = ("loop", "vectorized", "event", "chunked")
+# Engines whose alphas advance a per-run streaming state instead of reading precomputed panels
+STREAMING_ENGINES = ("event", "chunked")
+
+
+def target_weights(alpha_panels, eligible, quantile=4):
+    """Cross-sectional z-score composite -> long/short quantile weights, one row per date.
+
+    alpha_panels are (..., dates, tickers) arrays; any leading dimensions (e.g. a batch
+    of parameter sets) are carried through. eligible is a (dates, tickers) mask.
+    """
+    shape = np.broadcast_shapes(eligible.shape, *(panel.shape for panel in alpha_panels))
+    eligible = np.broadcast_to(eligible, shape)
+    counts = eligible.sum(axis=-1, keepdims=True)
+    composite = np.zeros(shape)
+    for values in alpha_panels:
+        composite += np.where(eligible, zscore(values, eligible), 0)
+
+    # Dates without any eligible ticker rank the whole universe on a zero composite,
+    # which is what the per-date loop does when no alpha produces values
+    members = eligible.copy()
+    if alpha_panels:
+        members |= counts == 0
+    else:
+        members[:] = True
+    composite[~members] = np.inf
+
+    order = np.argsort(composite, axis=-1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.broadcast_to(np.arange(shape[-1]), shape), axis=-1)
+    n = members.sum(axis=-1, keepdims=True)
+    cutoff = np.maximum(1, n // quantile)
+    short = members & (ranks < cutoff)
+    long = members & (ranks >= n - cutoff) & ~short
+
+    n_long = long.sum(axis=-1, keepdims=True)
+    n_short = short.sum(axis=-1, keepdims=True)
+    return long / np.maximum(n_long, 1) - short / np.maximum(n_short, 1)
+
+
+def equity_growth(close, available, weights):
+    """Per-date equity growth factors of a book fully rebalanced to weights every date.
+
+    After rebalancing on date d, cash is E_d * (1 - sum(w_d)) and each position is
+    w_d * E_d / p_d, so E_{d+1} = E_d * growth_d with
+    growth_d = 1 - sum(w_d) + sum(w_d * p_{d+1} / p_d). Also returns carried_d: a held
+    ticker stops trading on d + 1, where the closed form no longer applies.
+    weights may carry leading batch dimensions.
+    """
+    held = weights != 0
+    carried = (held[..., :-1, :] & ~available[1:]).any(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(held[..., :-1, :], weights[..., :-1, :] * close[1:] / close[:-1], 0)
+    growth = 1 - weights[..., :-1, :].sum(axis=-1) + growth.sum(axis=-1)
+    return growth, carried
+
+
+def compounded_equity(close, available, weights, cash):
+    """Closed-form equity curve when every rebalance fully re-marks the book.
+
+    Returns (equity, valid): valid is False where a held ticker stops trading on the
+    next date or equity turns non-finite, in which case the date-by-date recursion
+    (replay_equity) is needed instead.
+    """
+    growth, carried = equity_growth(close, available, weights)
+    start = np.ones(growth.shape[:-1] + (1,))
+    equity = cash * np.concatenate((start, np.cumprod(growth, axis=-1)), axis=-1)
+    valid = ~carried.any(axis=-1) & np.isfinite(equity).all(axis=-1)
+    return equity, valid
+
+
+def rebalance(weights, price, trading, equity, cash, shares, held, ledger=None, date=None,
+              cost_model=None, volume=None, band=0.0):
+    """Trade a book to weights * equity at price; returns (cash, fees charged).
+
+    shares and held (one entry per ticker) are updated in place. weights must be zero
+    where the ticker is not trading; held tickers that are trading but no longer
+    targeted are closed, and tickers that are not trading are left as they are.
+    Weight changes smaller than band are skipped. Fees from cost_model (trading the
+    trade vector plus carrying the resulting book) come out of cash. Executed
+    trades are appended to ledger when given.
+    """
+    targeted = weights != 0
+    closing = held & trading & ~targeted
+    if band > 0:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            current = np.where(held, shares * price / equity, 0)
+        unchanged = np.abs(weights - current) < band
+        targeted &= ~unchanged
+        closing &= ~unchanged
+
+    trades = np.zeros(len(shares))
+    target_shares = weights[targeted] * equity / price[targeted]
+    trades[targeted] = target_shares - shares[targeted]
+    trades[closing] = -shares[closing]
+    executed = np.flatnonzero(trades != 0)
+    cash -= np.sum(trades[executed] * price[executed])
+    shares[targeted] = target_shares
+    shares[closing] = 0
+    held[:] = (held & ~closing) | targeted
+
+    fees = 0.0
+    trade_fees = 0.0
+    if cost_model is not None:
+        traded_volume = volume[executed] if volume is not None else np.full(len(executed), np.nan)
+        trade_fees = cost_model.trade_cost(trades[executed], price[executed], traded_volume)
+        carried = held & trading
+        fees = np.sum(trade_fees) + np.sum(cost_model.holding_cost(shares[carried], price[carried]))
+        cash -= fees
+    if ledger is not None:
+        ledger.record(date, executed, trades[executed], price[executed], shares[executed], trade_fees)
+    return cash, fees
+
+
+def replay_equity(dates, close, available, weights, cash, shares, held, equity, ledger=None,
+                  cost_model=None, volume=None, band=0.0, fees=None):
+    """Date-by-date cash/position recursion over stacked arrays, for the general case.
+
+    shares and held describe the book going in (updated in place); the equity of each
+    date is appended to the equity list (and the fees charged to fees, when given).
+    Returns the cash left after the last date.
+    """
+    for i, date in enumerate(dates):
+        price, trading = close[i], available[i]
+        value = cash + np.sum(shares[trading] * price[trading])
+        if pd.isna(value):
+            print(f"Warning: Equity is NaN on {date}")
+            value = equity[-1] if equity else 100000
+        equity.append(value)
+        cash, fee = rebalance(weights[i], price, trading, value, cash, shares, held, ledger, date,
+                              cost_model, None if volume is None else volume[i], band)
+        if fees is not None:
+            fees.append(fee)
+    return cash
+
+
+def costed_equity(close, volume, available, weights, cash, cost_model, tolerance=1e-13, max_iterations=50):
+    """Closed-form equity curve net of costs, solved by fixed-point iteration.
+
+    With fees C_d paid in cash at each rebalance, E_{d+1} = growth_d * E_d - C_d, so
+    E_d = G_d * (cash - sum_{k<d} C_k / G_{k+1}) with G the cumulative growth. The
+    fees depend on the share counts w * E / p and so on E itself: starting from the
+    cost-free curve, the trade matrix, fees and curve are recomputed as whole
+    dates x tickers arrays until the curve stops moving (costs are small, so a few
+    rounds reach float precision). Returns (equity, shares, fees, valid) where
+    valid has the same meaning as in compounded_equity.
+    """
+    growth, carried = equity_growth(close, available, weights)
+    cumulative = np.concatenate(([1.0], np.cumprod(growth)))
+    held = weights != 0
+    price = np.where(available, close, 0)
+    equity = cash * cumulative
+    for _ in range(max_iterations):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shares = np.where(held, weights * equity[:, None] / close, 0)
+        trades = shares - np.vstack((np.zeros((1, shares.shape[1])), shares[:-1]))
+        fees = cost_model.trade_cost(trades, price, volume) + cost_model.holding_cost(shares, price)
+        fees = fees.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            paid = np.concatenate(([0.0], np.cumsum(fees[:-1] / cumulative[1:])))
+        updated = cumulative * (cash - paid)
+        converged = np.max(np.abs(updated - equity)) <= tolerance * np.max(np.abs(updated))
+        equity = updated
+        if converged:
+            break
+    valid = not carried.any() and np.isfinite(equity).all() and (cumulative != 0).all()
+    return equity, shares, fees, valid
 
 class Trader:
-    def __init__(self, tickers, dfs, start, end, alphas):
+    def __init__(self, tickers, dfs, start, end, alphas, engine="loop", max_history=None, quantile=4,
+                 metrics=None, costs=None, no_trade_band=0.0, universe=None, chunk_size=256,
+                 dtype=np.float64):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
         self.tickers = tickers
+        # Price frames are only read; alpha values live in alpha_panel (trade dates x tickers)
         self.dfs = dfs
+        self.alpha_panel = None
+        # Master calendar, availability bitmap and membership of tickers (universe.Universe);
+        # built from the frames unless one is shared in. prices holds close/volume/eligible
+        # on the trade dates and eligible the tickers that can be ranked on each of them
+        self.universe = universe
+        self.prices = None
+        self.eligible = None
+        # Storage type of the price and alpha panels (np.float32 halves them), and the dates
+        # per chunk of the chunked engine; array_peak is the most panel bytes held at once
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+        self.array_peak = 0
         self.start = start
         self.end = end
         self.alphas = alphas
-        self.portfolio = {}
+        self.engine = engine
+        # Long the top and short the bottom 1/quantile of the ranked universe
+        self.quantile = quantile
+        # Stage timers and counters (instrument.Instrumentation); a no-op unless one is passed
+        self.metrics = metrics or NULL_METRICS
+        # Book: shares per ticker (aligned with self.tickers) and which tickers are held;
+        # every executed trade is appended to the ledger, which in event mode keeps only
+        # enough trades to cover the last max_history dates
+        n = len(tickers) if tickers else 0
+        self._index = {ticker: j for j, ticker in enumerate(tickers or [])}
+        self.positions = np.zeros(n)
+        self.held = np.zeros(n, dtype=bool)
+        bounded = engine == "event" and max_history is not None
+        self.ledger = TradeLedger(max_rows=max(1, max_history * n) if bounded else None)
+        # Trading frictions (costs.CostModel, or a list of them) and the smallest weight
+        # change worth trading; fees holds the cash charged on each equity date
+        self.cost_model = as_cost_model(costs)
+        self.no_trade_band = no_trade_band
         self.cash = 100000
         self.equity = []
+        self.fees = []
         self.trade_dates = None
+        # Event mode: dated equity points and per-bar latency, capped at max_history entries
+        self.equity_dates = deque(maxlen=max_history)
+        self.bar_latency = deque(maxlen=max_history)
+        if engine == "event":
+            # Alphas are updated bar by bar, nothing is precomputed
+            self.equity = deque(maxlen=max_history)
+            self.fees = deque(maxlen=max_history)
+            for alpha in self.alphas:
+                alpha.reset_stream()
+            return
 
         if not tickers or not dfs:
             print("Warning: No tickers or dataframes provided.")
             return
+        if engine == "chunked":
+            # Alphas run on their streaming state chunk by chunk in run_backtest
+            return
 
-        all_dates = pd.Index([])
-        for df in self.dfs.values():
-            all_dates = all_dates.union(df.index)
-        all_dates = pd.DatetimeIndex(all_dates)
-        trade_range = all_dates[(all_dates >= self.start) & (all_dates <= self.end)]
+        trade_range = self._get_trade_dates()
+        self.prices = Panel.from_frames(dfs, tickers, trade_range, ("close", "volume", "eligible"),
+                                        dtype=self.dtype, universe=self.universe)
+        # Truthiness of the stored flag, as in the frames (NaN counts as eligible)
+        self.eligible = self.prices["eligible"].astype(bool) & self.prices.available \
+            & self.universe.members[self.universe.rows(trade_range)]
 
-        for alpha in self.alphas:
-            alpha.pre_compute(trade_range)
-            alpha.post_compute(trade_range)
+        self.alpha_panel = Panel(trade_range, tickers, dtype=self.dtype)
+        with self.metrics.stage("alpha_precompute"):
+            for alpha in self.alphas:
+                with self.metrics.stage(f"alpha.{alpha.name}"):
+                    self.alpha_panel[alpha.name] = alpha.compute(trade_range)
+        self.array_peak = self.prices.nbytes + self.eligible.nbytes + self.alpha_panel.nbytes
 
     def run_backtest(self):
         if not self.tickers or not self.dfs:
             print("Cannot run backtest: No valid tickers or data.")
             return
 
-        all_dates = pd.Index([])
-        for df in self.dfs.values():
-            all_dates = all_dates.union(df.index)
-        all_dates = pd.DatetimeIndex(all_dates)
-        self.trade_dates = all_dates[(all_dates >= self.start) & (all_dates <= self.end)]
+        self.trade_dates = self._get_trade_dates()
+        with self.metrics.stage(f"backtest.{self.engine}"):
+            if self.engine == "vectorized":
+                return self._run_backtest_vectorized()
+            if self.engine == "chunked":
+                return self._run_backtest_chunked()
+            if self.engine == "event":
+                print(f"Replaying {len(self.trade_dates)} dates bar by bar.")
+                bars = iter_frame_bars(self.dfs, self.tickers, self.trade_dates, universe=self.universe)
+                for _ in self.run_stream(bars):
+                    pass
+                return
+            return self._run_backtest_loop()
 
+    def _run_backtest_loop(self):
         print(f"Running backtest over {len(self.trade_dates)} dates.")
-        for date in self.trade_dates:
-            available_tickers = [ticker for ticker in self.tickers if date in self.dfs[ticker].index]
-            if not available_tickers:
-                continue
-            equity = self.cash + sum(
-                self.portfolio.get(ticker, 0) * self.dfs[ticker].loc[date, 'close']
-                for ticker in available_tickers
-            )
+        metrics = self.metrics
+        dates_run = 0
+        no_signals = 0
+        close, available = self.prices["close"], self.prices.available
+        for i, date in enumerate(self.trade_dates):
+            with metrics.stage("mark_to_market"):
+                trading = np.flatnonzero(available[i])
+                if not len(trading):
+                    continue
+                equity = self.cash + sum((self.positions[trading] * close[i, trading]).tolist())
             if pd.isna(equity):
                 print(f"Warning: Equity is NaN on {date}")
+                metrics.event("nan_equity", "Equity is NaN", date=str(date))
                 equity = self.equity[-1] if self.equity else 100000  # Fallback to last valid or initial
             self.equity.append(equity)
-            signals = self.generate_signals(date)
-            if not signals:
-                print(f"No signals generated for {date}")
-            self.manage_portfolio(signals, date, equity)
+            dates_run += 1
+            with metrics.stage("signals"):
+                signals = self.generate_signals(date)
+            if signals:
+                metrics.count("rebalances")
+            else:
+                no_signals += 1
+            with metrics.stage("rebalance"):
+                self.manage_portfolio(signals, date, equity)
+
+        metrics.count("dates", dates_run)
+        metrics.count("dates_without_signals", no_signals)
+        if no_signals:
+            print(f"No signals generated on {no_signals} of {dates_run} dates.")
+
+    def on_bar(self, date, bar):
+        """Event mode step: update alphas, mark to market, rebalance; returns (date, equity) or None.
+
+        bar maps ticker -> {"open", "high", "low", "close", "volume", "eligible"} for the
+        tickers trading on date. Dates with no bars still advance the alphas but emit nothing.
+        """
+        began = time.perf_counter()
+        metrics = self.metrics
+        with metrics.stage("alpha_update"):
+            alpha_updates = [(alpha.name, alpha.update(date, bar)) for alpha in self.alphas]
+        priced = np.array([ticker in bar for ticker in self.tickers], dtype=bool)
+        if not priced.any():
+            return None
+        prices = np.array([bar[ticker]["close"] if ticker in bar else np.nan for ticker in self.tickers],
+                          dtype=float)
+        volumes = None
+        if self.cost_model is not None:
+            volumes = np.array([bar[ticker].get("volume", np.nan) if ticker in bar else np.nan
+                                for ticker in self.tickers], dtype=float)
+
+        equity = self.cash + np.sum(self.positions[priced] * prices[priced])
+        if pd.isna(equity):
+            print(f"Warning: Equity is NaN on {date}")
+            metrics.event("nan_equity", "Equity is NaN", date=str(date))
+            equity = self.equity[-1] if self.equity else 100000  # Fallback to last valid or initial
+        self.equity.append(equity)
+        self.equity_dates.append(date)
+        metrics.count("dates")
+
+        eligible = [ticker for ticker in self.tickers if ticker in bar and bar[ticker].get("eligible", True)]
+        alpha_values = {}
+        for alpha_name, values in alpha_updates:
+            alpha_values[alpha_name] = {
+                ticker: values[ticker] if not pd.isna(values[ticker]) else 0
+                for ticker in eligible if ticker in values
+            }
+        with metrics.stage("signals"):
+            signals = self._rank_signals(alpha_values)
+        if signals:
+            metrics.count("rebalances")
+        with metrics.stage("rebalance"):
+            self._rebalance(signals, prices, priced, equity, date, volumes)
+        self.bar_latency.append(time.perf_counter() - began)
+        return date, equity
+
+    def run_stream(self, bars):
+        """Generator over (date, bar) pairs that yields each emitted (date, equity) point."""
+        for date, bar in bars:
+            point = self.on_bar(date, bar)
+            if point is not None:
+                yield point
+
+    async def run_queue(self, queue):
+        """Async generator over (date, bar) items from an asyncio.Queue; a None item ends the stream."""
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            point = self.on_bar(*item)
+            if point is not None:
+                yield point
+
+    def latency_stats(self):
+        """Per-bar processing latency in milliseconds over the retained bars."""
+        if not self.bar_latency:
+            return {}
+        latency = np.array(self.bar_latency) * 1000
+        return {
+            "bars": len(latency),
+            "mean_ms": float(latency.mean()),
+            "p50_ms": float(np.percentile(latency, 50)),
+            "p99_ms": float(np.percentile(latency, 99)),
+            "max_ms": float(latency.max()),
+        }
+
+    def memory_stats(self):
+        """Engine, storage type, most price/alpha array megabytes held at once and the process's peak RSS."""
+        stats = {
+            "engine": self.engine,
+            "dtype": self.dtype.name,
+            "array_peak_mb": self.array_peak / 2 ** 20,
+        }
+        if self.engine == "chunked":
+            stats["chunk_size"] = self.chunk_size
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            stats["peak_rss_mb"] = peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+        return stats
+
+    def _get_trade_dates(self):
+        """Dates of the tickers' master calendar in [start, end]."""
+        if self.universe is None:
+            # Alphas sharing an AlphaCache have built the universe for these frames already
+            cache = next((alpha.cache for alpha in self.alphas if alpha.cache is not None), None)
+            self.universe = Universe(self.tickers, self.dfs) if cache is None \
+                else cache.universe(self.tickers, self.dfs)
+        elif self.universe.tickers != list(self.tickers):
+            raise ValueError("Universe tickers do not match the Trader's tickers")
+        return self.universe.span(self.start, self.end)
+
+    def _stack_panels(self, dates):
+        """Close, volume, availability, eligibility and alpha values as dates x tickers arrays."""
+        rows = self.prices.rows(dates)
+        found = rows >= 0
+        if found.all() and np.array_equal(rows, np.arange(len(rows))):
+            # A prefix of the trade dates (the usual case) reads the panels without copies
+            take = lambda values, fill: values[:len(rows)]
+        else:
+            def take(values, fill):
+                result = np.full((len(rows),) + values.shape[1:], fill, dtype=values.dtype)
+                result[found] = values[rows[found]]
+                return result
+        available = take(self.prices.available, False)
+        alpha_panels = [np.where(available, take(self.alpha_panel[alpha.name], 0), 0) for alpha in self.alphas]
+        return (take(self.prices["close"], np.nan), take(self.prices["volume"], np.nan), available,
+                take(self.eligible, False), alpha_panels)
+
+    def _target_weights(self, alpha_panels, eligible):
+        return target_weights(alpha_panels, eligible, self.quantile)
+
+    def _run_backtest_vectorized(self):
+        metrics = self.metrics
+        with metrics.stage("stack_panels"):
+            close, volume, available, eligible, alpha_panels = self._stack_panels(self.trade_dates)
+        # Dates where none of the tickers trade are skipped entirely by the loop engine
+        active = available.any(axis=1)
+        dates = self.trade_dates[active]
+        close, volume, available, eligible = close[active], volume[active], available[active], eligible[active]
+        alpha_panels = [panel[active] for panel in alpha_panels]
+        print(f"Running backtest over {len(self.trade_dates)} dates (vectorized).")
+        if not active.any():
+            return
+
+        with metrics.stage("signals"):
+            weights = self._target_weights(alpha_panels, eligible)
+            # Only tickers trading on the date can be rebalanced
+            weights = np.where(available, weights, 0)
+        metrics.count("dates", len(dates))
+        metrics.count("rebalances", int((weights != 0).any(axis=1).sum()))
+
+        with metrics.stage("equity"):
+            closed_form = self._compounded_equity(close, volume, available, weights)
+            if closed_form is None:
+                metrics.count("replayed_backtests")
+                self._replay_equity(dates, close, available, weights, volume)
+                return
+        equity, shares, fees = closed_form
+
+        self.equity.extend(equity.tolist())
+        self.fees.extend(fees.tolist())
+        # Every date re-marks the whole book, so positions are w * E / p and each change is a trade
+        previous = np.vstack((self.positions[None], shares[:-1]))
+        rows, cols = np.nonzero(shares != previous)
+        trades = (shares - previous)[rows, cols]
+        trade_fees = 0.0
+        if self.cost_model is not None:
+            trade_fees = self.cost_model.trade_cost(trades, close[rows, cols], volume[rows, cols])
+        self.ledger.record(dates.values[rows], cols, trades, close[rows, cols], shares[rows, cols], trade_fees)
+        self.positions = shares[-1].copy()
+        self.held = weights[-1] != 0
+        self.cash = equity[-1] * (1 - weights[-1].sum()) - fees[-1]
+
+    def _load_chunk(self, columns, fields, lo, dates):
+        """Panel of fields on dates (master rows lo, lo + 1, ...) in self.dtype.
+
+        Each ticker's bars in the chunk are one contiguous run of its frame rows, found by
+        two binary searches, so a chunk costs its own size whatever the frames' length.
+        """
+        universe = self.universe
+        hi = lo + len(dates)
+        chunk = Panel(dates, self.tickers, available=universe.available[lo:hi], dtype=self.dtype)
+        chunk.fields = {field: np.full(chunk.shape, np.nan, dtype=self.dtype) for field in fields}
+        for j, values in enumerate(columns):
+            positions = universe.positions[j]
+            first, last = np.searchsorted(positions, (lo, hi))
+            rows = positions[first:last] - lo
+            for field, column in values.items():
+                chunk[field][rows, j] = column[first:last]
+        return chunk
+
+    def _compounded_equity(self, close, volume, available, weights):
+        """(equity, shares, fees) in closed form, or None when the date-by-date recursion is needed."""
+        if self.held.any() or self.no_trade_band > 0:
+            # Positions carried in from an earlier run, and trades skipped by the no-trade
+            # band, make each date depend on the book left by the previous one
+            return None
+        if self.cost_model is not None:
+            equity, shares, fees, valid = costed_equity(close, volume, available, weights, self.cash,
+                                                        self.cost_model)
+            return (equity, shares, fees) if valid else None
+        equity, valid = compounded_equity(close, available, weights, self.cash)
+        if not valid:
+            return None
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shares = np.where(weights != 0, weights * equity[:, None] / close, 0)
+        return equity, shares, np.zeros(len(equity))
+
+    def _replay_equity(self, dates, close, available, weights, volume=None):
+        """Date-by-date cash/position recursion over the stacked arrays, for the general case."""
+        self.cash = replay_equity(dates, close, available, weights, self.cash, self.positions, self.held,
+                                  self.equity, self.ledger, self.cost_model, volume, self.no_trade_band,
+                                  self.fees)
+
+    def _run_backtest_chunked(self):
+        """Backtest chunk_size dates at a time, holding one chunk of arrays in memory.
+
+        Prices are gathered from the frames a chunk at a time in self.dtype, the alphas
+        advance date by date on their streaming state (which carries the rolling windows
+        across chunk boundaries, from the first bar of the calendar on), and the book
+        carries over through the replay recursion. Working memory is bounded by the chunk and
+        the alphas' windows instead of growing with the calendar; the input frames and the
+        outputs (equity curve, trade ledger) still scale with it. In float64 the equity curve
+        matches the vectorized engine to within 1e-9 relative (the recursion rounds in a
+        different order than the closed form); in float32 to within 1e-3 relative, as
+        prices and alpha values keep 24-bit mantissas and a near-tied ranking can flip.
+        """
+        metrics = self.metrics
+        universe = self.universe
+        calendar = universe.dates[:universe.dates.searchsorted(pd.Timestamp(self.end), side="right")]
+        first_trade = calendar.searchsorted(pd.Timestamp(self.start), side="left")
+        fields = tuple(dict.fromkeys([field for alpha in self.alphas for field in alpha.stream_fields]
+                                     + ["close", "volume", "eligible"]))
+        for alpha in self.alphas:
+            alpha.reset_stream()
+        # Each frame's columns as arrays, taken once (views of float frames, not copies)
+        columns = [{field: self.dfs[ticker][field].to_numpy() for field in fields} for ticker in self.tickers]
+        print(f"Running backtest over {len(self.trade_dates)} dates (chunked by {self.chunk_size}, {self.dtype}).")
+
+        dates_run = 0
+        for lo in range(0, len(calendar), self.chunk_size):
+            dates = calendar[lo:lo + self.chunk_size]
+            with metrics.stage("load_chunk"):
+                chunk = self._load_chunk(columns, fields, lo, dates)
+            available = chunk.available
+            alpha_panels = [np.zeros(chunk.shape, dtype=self.dtype) for _ in self.alphas]
+            with metrics.stage("alpha_update"):
+                for i, date in enumerate(dates):
+                    bar = {field: chunk[field][i].astype(float) for field in fields}
+                    for alpha, values in zip(self.alphas, alpha_panels):
+                        values[i] = alpha.advance(date, available[i], bar)
+
+            # Dates before start only warm the alphas up; dates where none of the tickers
+            # trade are skipped, as in the other engines
+            rows = lo + np.arange(len(dates))
+            active = (rows >= first_trade) & available.any(axis=1)
+            self.array_peak = max(self.array_peak, chunk.nbytes + sum(values.nbytes for values in alpha_panels))
+            if not active.any():
+                continue
+            available = available[active]
+            eligible = chunk["eligible"][active].astype(bool) & available & universe.members[rows[active]]
+            with metrics.stage("signals"):
+                weights = self._target_weights([np.where(available, values[active], 0) for values in alpha_panels],
+                                               eligible)
+                weights = np.where(available, weights, 0)
+            metrics.count("rebalances", int((weights != 0).any(axis=1).sum()))
+            with metrics.stage("equity"):
+                volume = chunk["volume"][active].astype(float) if self.cost_model is not None else None
+                self._replay_equity(dates[active], chunk["close"][active].astype(float), available, weights,
+                                    volume)
+            dates_run += int(active.sum())
+        metrics.count("dates", dates_run)
+        print(f"Peak chunk arrays: {self.array_peak / 2 ** 20:.1f} MB.")
 
     def generate_signals(self, date):
+        row = self.alpha_panel.dates.get_loc(date)
+        eligible = np.flatnonzero(self.eligible[row])
         alpha_values = {}
         for alpha in self.alphas:
-            alpha_name = alpha.name
-            values = {}
-            for ticker in self.tickers:
-                if date in self.dfs[ticker].index and self.dfs[ticker].loc[date, 'eligible']:
-                    val = self.dfs[ticker].loc[date, alpha_name]
-                    values[ticker] = val if not pd.isna(val) else 0
-            alpha_values[alpha_name] = values
-
-        standardized = {}
-        for alpha_name, values in alpha_values.items():
-            if values:
-                vals = list(values.values())
-                mean = np.mean(vals)
-                std = np.std(vals)
-                if std > 0:
-                    standardized[alpha_name] = {ticker: (v - mean) / std for ticker, v in values.items()}
-                else:
-                    standardized[alpha_name] = {ticker: 0 for ticker in values}
+            values = self.alpha_panel[alpha.name][row]
+            alpha_values[alpha.name] = {self.tickers[j]: values[j] for j in eligible}
+        return self._rank_signals(alpha_values)
 
-        composite_alpha = {}
-        for ticker in self.tickers:
-            if all(ticker in standardized[alpha_name] for alpha_name in standardized):
-                composite_alpha[ticker] = sum(
-                    standardized[alpha_name][ticker] for alpha_name in standardized
-                )
+    def _rank_signals(self, alpha_values):
+        """{alpha name: {eligible ticker: value}} -> {ticker: -1/0/1} by quartile of the z-score composite."""
+        # Tickers missing from any alpha with values stay NaN and drop out of the ranking
+        composite = np.zeros(len(self.tickers))
+        for values in alpha_values.values():
+            if values:
+                panel = np.full(len(self.tickers), np.nan)
+                panel[[self._index[ticker] for ticker in values]] = list(values.values())
+                composite += zscore(panel)
 
-        if composite_alpha:
-            sorted_tickers = sorted(composite_alpha, key=composite_alpha.get)
+        members = np.flatnonzero(~np.isnan(composite))
+        if len(members):
+            order = members[np.argsort(composite[members], kind="stable")]
+            sorted_tickers = [self.tickers[j] for j in order]
             n = len(sorted_tickers)
-            long_count = max(1, n // 4)
-            short_count = max(1, n // 4)
+            long_count = max(1, n // self.quantile)
+            short_count = max(1, n // self.quantile)
             signals = {}
             for i, ticker in enumerate(sorted_tickers):
                 if i < short_count:
@@ -102,46 +618,82 @@ class Trader:
         return {}
 
     def manage_portfolio(self, signals, date, equity):
-        long_tickers = [ticker for ticker, signal in signals.items() if signal == 1]
-        short_tickers = [ticker for ticker, signal in signals.items() if signal == -1]
-        n_long = len(long_tickers)
-        n_short = len(short_tickers)
-
-        w_long = 1 / n_long if n_long > 0 else 0
-        w_short = -1 / n_short if n_short > 0 else 0
-
-        for ticker in long_tickers:
-            if date in self.dfs[ticker].index:
-                price = self.dfs[ticker].loc[date, 'close']
-                target_shares = (w_long * equity) / price
-                current_shares = self.portfolio.get(ticker, 0)
-                trade_shares = target_shares - current_shares
-                cost = trade_shares * price
-                self.cash -= cost
-                self.portfolio[ticker] = current_shares + trade_shares
-
-        for ticker in short_tickers:
-            if date in self.dfs[ticker].index:
-                price = self.dfs[ticker].loc[date, 'close']
-                target_shares = (w_short * equity) / price
-                current_shares = self.portfolio.get(ticker, 0)
-                trade_shares = target_shares - current_shares
-                cost = trade_shares * price
-                self.cash -= cost
-                self.portfolio[ticker] = current_shares + trade_shares
-
-        for ticker in list(self.portfolio.keys()):
-            if ticker not in long_tickers and ticker not in short_tickers and date in self.dfs[ticker].index:
-                shares = self.portfolio[ticker]
-                price = self.dfs[ticker].loc[date, 'close']
-                self.cash += shares * price
-                del self.portfolio[ticker]
+        prices = np.full(len(self.tickers), np.nan)
+        volumes = np.full(len(self.tickers), np.nan)
+        needed = self.held.copy()
+        needed[[self._index[ticker] for ticker in signals]] = True
+        row = self.prices.dates.get_loc(date)
+        priced = needed & self.prices.available[row]
+        prices[priced] = self.prices["close"][row, priced]
+        if self.cost_model is not None:
+            volumes[priced] = self.prices["volume"][row, priced]
+        self._rebalance(signals, prices, priced, equity, date, volumes)
+
+    def _rebalance(self, signals, prices, priced, equity, date, volumes=None):
+        """Trade to equal-weight long/short targets at prices; tickers without a price are left as they are."""
+        side = np.zeros(len(self.tickers))
+        for ticker, signal in signals.items():
+            side[self._index[ticker]] = signal
+        long, short = side == 1, side == -1
+        n_long, n_short = long.sum(), short.sum()
+        weights = np.zeros(len(self.tickers))
+        weights[long & priced] = 1 / n_long if n_long > 0 else 0
+        weights[short & priced] = -1 / n_short if n_short > 0 else 0
+        self.cash, fees = rebalance(weights, prices, priced, equity, self.cash, self.positions, self.held,
+                                    self.ledger, date, self.cost_model, volumes, self.no_trade_band)
+        self.fees.append(fees)
+
+    @property
+    def portfolio(self):
+        """Open positions as {ticker: shares}."""
+        return {self.tickers[j]: self.positions[j] for j in np.flatnonzero(self.held)}
+
+    def trade_history(self):
+        """Every executed trade: date, ticker, shares, price, cost, position after it and fee."""
+        return self.ledger.to_frame(self.tickers)
+
+    def position_history(self, dates=None):
+        """Shares held per ticker after each trade date, or carried onto dates when given."""
+        return self.ledger.positions(self.tickers, dates)
+
+    def _equity_index(self):
+        if self.engine == "event":
+            return pd.DatetimeIndex(list(self.equity_dates))
+        return self.trade_dates[:len(self.equity)]
 
     def get_pnl_stats(self):
+        with self.metrics.stage("stats"):
+            return self._pnl_stats()
+
+    def get_analytics(self, window=63):
+        """Rolling risk metrics plus per-ticker and per-alpha PnL attribution, as an analytics.PnlReport.
+
+        Tickers are credited with shares held into each date times the move in close.
+        Alphas are attributed by the standalone return of the book each one would
+        have held on its own over the same dates.
+        """
+        with self.metrics.stage("analytics"):
+            dates = self._equity_index()
+            report = analyze(list(self.equity), dates, window)
+            positions = self.position_history(dates).to_numpy()
+            if self.alpha_panel is None:
+                close = Panel.from_frames(self.dfs, self.tickers, dates, ("close",), universe=self.universe)["close"]
+            else:
+                close, _, available, eligible, alpha_panels = self._stack_panels(dates)
+                # One batched pass: each alpha is a leading batch entry of its own composite
+                weights = target_weights([np.stack(alpha_panels)], eligible, self.quantile)
+                growth, _ = equity_growth(close, available, np.where(available, weights, 0))
+                returns = np.concatenate((np.full((len(self.alphas), 1), np.nan), growth - 1), axis=1)
+                report.attribution["alpha"] = alpha_attribution(returns, [alpha.name for alpha in self.alphas])
+            report.attribution["ticker"] = ticker_attribution(positions, close, self.tickers)
+            return report
+
+    def _pnl_stats(self):
         if not self.equity or len(self.equity) < 2:
             return {"error": "Insufficient equity data for stats"}
 
-        equity_series = pd.Series(self.equity, index=self.trade_dates[:len(self.equity)])
+        dates = self._equity_index()
+        equity_series = pd.Series(list(self.equity), index=dates)
         if equity_series.isna().all():
             return {"error": "Equity series is all NaN"}
         daily_returns = equity_series.pct_change().dropna()
@@ -154,8 +706,17 @@ class Trader:
         sharpe_ratio = annualized_return / annualized_volatility if annualized_volatility > 0 else 0
 
         rolling_max = equity_series.cummax()
-        drawdowns = (equity_series - rolling_max) / rolling_max
-        max_drawdown = drawdowns.min() * 100
+        drawdown_series = (equity_series - rolling_max) / rolling_max
+        max_drawdown = drawdown_series.min() * 100
+        _, underwater = drawdowns(equity_series.to_numpy(dtype=float))
+        returns = daily_returns.to_numpy()
+
+        # Traded notional (both sides) and fees as a share of the equity they were paid from
+        traded = pd.Series(np.abs(self.ledger.column("cost")), index=self.ledger.column("date"))
+        traded = traded.groupby(level=0).sum().reindex(dates, fill_value=0.0)
+        fees = pd.Series(list(self.fees), index=dates, dtype=float)
+        turnover = (traded / equity_series).mean() * 252
+        cost_drag = (fees / equity_series).mean() * 252
 
         return {
             "Total Return (%)": cumulative_returns.iloc[-1],
@@ -163,6 +724,12 @@ class Trader:
             "Annualized Volatility (%)": annualized_volatility * 100,
             "Sharpe Ratio": sharpe_ratio,
             "Max Drawdown (%)": max_drawdown,
+            "Sortino Ratio": float(sortino_ratio(returns)),
+            "Calmar Ratio": float(calmar_ratio(returns, max_drawdown / 100)),
+            "Max Drawdown Duration (days)": float(underwater.max()),
+            "Annualized Turnover (%)": turnover * 100,
+            "Total Costs": fees.sum(),
+            "Annualized Cost Drag (%)": cost_drag * 100,
             "Daily Returns": daily_returns,
             "Cumulative Returns": cumulative_returns,
             "Equity Curve": equity_series
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+
+def _stamps(index):
+    """int64 nanosecond stamps of a date index."""
+    return pd.DatetimeIndex(index).values.astype("datetime64[ns]", copy=False).view("i8")
+
+
+def master_calendar(indexes):
+    """Sorted union of date indexes in one pass: a hash-based unique over all stamps, then a
+    sort of the (short) calendar, instead of pairwise unions."""
+    indexes = list(indexes)
+    if not indexes:
+        return pd.DatetimeIndex([])
+    names = {getattr(index, "name", None) for index in indexes}
+    stamps = np.concatenate([_stamps(index) for index in indexes])
+    values = np.sort(pd.unique(stamps)).view("datetime64[ns]")
+    return pd.DatetimeIndex(values, name=names.pop() if len(names) == 1 else None)
+
+
+class Universe:
+    """Tickers with ragged listing calendars, laid out on one master calendar.
+
+    dates is the union of the tickers' frame indexes; available is the dates x
+    tickers bitmap of which ticker has a bar on which date, and positions[j] the
+    master row of each of ticker j's bars. members is point-in-time membership: by
+    default a ticker belongs from its first to its last bar (listing to delisting),
+    or over the [start, end) spans given per ticker in membership (end None means
+    still a member), so index constituents can come and go. Everything is built in
+    a single pass per ticker, in time and memory linear in tickers x dates.
+    """
+
+    def __init__(self, tickers, dfs, membership=None):
+        self.tickers = list(tickers)
+        self.index = {ticker: j for j, ticker in enumerate(self.tickers)}
+        indexes = [dfs[ticker].index for ticker in self.tickers]
+        self.dates = master_calendar(indexes)
+        # Fill the index's lookup tables now: pandas builds them lazily without a lock, and a
+        # universe is shared between threads (e.g. through the service's AlphaCache)
+        self.dates.is_unique, self.dates.is_monotonic_increasing
+        calendar = self.dates.asi8
+        self.shape = (len(self.dates), len(self.tickers))
+        self.available = np.zeros(self.shape, dtype=bool)
+        self.positions = []
+        for j, index in enumerate(indexes):
+            rows = np.searchsorted(calendar, _stamps(index)).astype(np.int32)
+            self.available[rows, j] = True
+            self.positions.append(rows)
+        self.members = self._members(membership or {})
+
+    def _members(self, membership):
+        members = np.zeros(self.shape, dtype=bool)
+        for j, ticker in enumerate(self.tickers):
+            if ticker in membership:
+                for start, end in membership[ticker]:
+                    lo = 0 if start is None else self.dates.searchsorted(pd.Timestamp(start), side="left")
+                    hi = len(self.dates) if end is None else self.dates.searchsorted(pd.Timestamp(end), side="left")
+                    members[lo:hi, j] = True
+            elif len(self.positions[j]):
+                members[self.positions[j][0]:self.positions[j][-1] + 1, j] = True
+        return members
+
+    @property
+    def nbytes(self):
+        return self.available.nbytes + self.members.nbytes + sum(rows.nbytes for rows in self.positions)
+
+    def span(self, start, end):
+        """Master calendar dates in [start, end]."""
+        lo = self.dates.searchsorted(pd.Timestamp(start), side="left")
+        hi = self.dates.searchsorted(pd.Timestamp(end), side="right")
+        return self.dates[lo:hi]
+
+    def rows(self, dates):
+        """Master row of each date in dates (-1 where the calendar has no such date)."""
+        return self.dates.get_indexer(pd.DatetimeIndex(dates))
+
+    def row(self, date):
+        try:
+            return self.dates.get_loc(date)
+        except KeyError:
+            return -1
+
+    def frame_rows(self, rows, j):
+        """Row in ticker j's frame of each master row in rows (-1 where it has no bar)."""
+        positions = self.positions[j]
+        rows = np.asarray(rows)
+        found = np.searchsorted(positions, rows)
+        clipped = np.minimum(found, len(positions) - 1)
+        hit = (rows >= 0) & (found < len(positions)) & (positions[clipped] == rows) if len(positions) \
+            else np.zeros(len(rows), dtype=bool)
+        return np.where(hit, found, -1)
+
+    def members_on(self, date):
+        """Tickers that belong to the universe on date."""
+        row = self.row(date)
+        if row < 0:
+            return []
+        return [self.tickers[j] for j in np.flatnonzero(self.members[row])]
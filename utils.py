@@ -1,13 +1,13 @@
 import pandas as pd
-import yfinance
-import threading
 from datetime import datetime
 from typing import List, Tuple, Dict
 import pickle
 import lzma
-from bs4 import BeautifulSoup
-import requests
 from io import StringIO
+from store import MarketDataStore, STORE_PATH, INDEX_STORE_PATH, convert_pickle
+from data_sources import YFINANCE_POOL, default_source
+from fetch import FetchPool
+from regime import SP500, RegimeFeatures
 
 def fetch_date_range(start_date_str, end_date_str):
     date_format = "%Y-%m-%d"
@@ -43,19 +43,34 @@ def save_pickle(path: str, obj: Tuple[List[str], Dict[str, pd.DataFrame]]) -> No
     except Exception as e:
         print(f"Error saving pickle file: {e}")
 
-def get_sp500_data(start, end, granularity = "1d"):
-    """Fetch S&P 500 data and compute 200-day moving average."""
-    sp500 = yfinance.Ticker("^GSPC")
-    df = sp500.history(start=start, 
-                       end=end, 
-                       interval=granularity,
-                       auto_adjust=True)
-    df.index = pd.to_datetime(df.index).normalize().tz_localize(None)
-    df = df[["Close"]].rename(columns={"Close": "close"})
-    df["ma200"] = df["close"].rolling(200).mean()
+def get_index_bars(ticker: str, start, end, granularity: str = "1d", source = None,
+                   store_path: str = INDEX_STORE_PATH) -> pd.DataFrame:
+    """Daily bars of an index over [start, end) from the local index store.
+
+    Only the part of the span the store has not covered yet is fetched through source
+    (yfinance by default) and saved, so repeated runs read from disk and work offline.
+    """
+    store = MarketDataStore(store_path)
+    store.sync([ticker], start, end, source or default_source(), granularity)
+    if not store.exists() or ticker not in store.tickers:
+        print(f"No data available for {ticker}")
+        # Empty but date-indexed, so callers can still align it to a calendar (as "no regime")
+        return pd.DataFrame(columns=["open", "high", "low", "close", "volume", "eligible"], dtype=float,
+                            index=pd.DatetimeIndex([], name="datetime"))
+    _, dfs = store.read(tickers=[ticker], start=start, end=end)
+    df = dfs[ticker]
+    return df[df.index < pd.Timestamp(end)]
+
+def get_sp500_data(start, end, granularity = "1d", ma_window = 200, source = None, store_path = INDEX_STORE_PATH):
+    """S&P 500 closes with their regime moving average (kept in the "ma200" column), from the index store."""
+    df = get_index_bars(SP500, start, end, granularity, source, store_path)[["close"]].copy()
+    df["ma200"] = df["close"].rolling(ma_window).mean()
     return df
 
 def get_ndxt30_tickers():
+    import requests
+    from bs4 import BeautifulSoup
+
     try:
         headers = {"User-Agent": "Mozilla/5.0"}
         res = requests.get("https://finance.yahoo.com/quote/%5ENDXT/components/", headers=headers)
@@ -69,122 +84,51 @@ def get_ndxt30_tickers():
         return []
 
 def get_history(ticker: str, period_start: datetime, period_end, tries=0, granularity="1d"):
-    if tries >= 2:
-        print(f"Max retries reached for {ticker}. Returning empty DataFrame.")
+    options = {**YFINANCE_POOL, "max_workers": 1, "max_attempts": max(1, 2 - tries), "batch_size": 1}
+    pool = FetchPool(default_source(), **options)
+    df = pool.fetch([ticker], [period_start], [period_end], granularity).get(ticker)
+    if df is None:
+        stat = pool.stats.get(ticker, {})
+        print(f"No data returned for {ticker}" + (f" ({stat['error']})" if stat.get("error") else ""))
         return pd.DataFrame()
+    print(f"Successfully fetched data for {ticker}: {len(df)} rows")
+    return df
 
-    try:
-        ticker_obj = yfinance.Ticker(ticker)
-        if not ticker_obj.info or ticker_obj.info.get('regularMarketPrice') is None:
-            print(f"Skipping {ticker}: Not found or delisted in yfinance")
-            return pd.DataFrame()
-
-        df = ticker_obj.history(
-            start=period_start,
-            end=period_end,
-            interval=granularity,
-            auto_adjust=True
-        ).reset_index()
-
-        if df.empty:
-            print(f"No data returned for {ticker}")
-            return pd.DataFrame()
-
-        df = df.rename(columns={
-            "Date": "datetime",
-            "Open": "open",
-            "High": "high",
-            "Low": "low",
-            "Close": "close",
-            "Volume": "volume"
-        })
-        df = df.drop(columns=["Dividends", "Stock Splits"])
-        # Normalize to date-only and remove timezone
-        df['datetime'] = pd.to_datetime(df['datetime']).dt.normalize().dt.tz_localize(None)
-        df = df.set_index("datetime", drop=True)
-        df["eligible"] = True
-        print(f"Successfully fetched data for {ticker}: {len(df)} rows")
-        return df
-
-    except Exception as e:
-        print(f"Error fetching {ticker} (try {tries+1}: {e})")
-        return get_history(ticker, period_start, period_end, tries+1, granularity)
-
-def get_histories(tickers: List[str], period_starts: List[datetime], period_ends: List[datetime], granularity: str = "1d") -> Tuple[List[str], List[pd.DataFrame]]:
-    dfs = [None] * len(tickers)
-    lock = threading.Lock()
-
-    def _helper(i: int) -> None:
-        print(tickers[i])
-        df = get_history(
-            tickers[i],
-            period_starts[i],
-            period_ends[i],
-            granularity=granularity
-        )
-        with lock:
-            dfs[i] = df
-
-    threads = [threading.Thread(target=_helper, args=(i,)) for i in range(len(tickers))]
-    for thread in threads:
-        thread.start()
-    for thread in threads:
-        thread.join()
-
-    valid_tickers = []
-    valid_dfs = []
-    for ticker, df in zip(tickers, dfs):
-        if df is not None and not df.empty:
-            valid_tickers.append(ticker)
-            valid_dfs.append(df)
-
-    return valid_tickers, valid_dfs
-
-def get_ticker_dfs(start: datetime, end: datetime, user_tickers = None) -> Tuple[List[str], Dict[str, pd.DataFrame], List[str]]:
-    data = load_pickle("dataset.obj")
-    if data is not None:
-        tickers, ticker_dfs = data
-        print(f"Loaded {len(tickers)} tickers from pickle file")
-        for ticker in ticker_dfs:
-            if "eligible" not in ticker_dfs[ticker].columns:
-                ticker_dfs[ticker]["eligible"] = True
-            # Ensure index is date-only and timezone-naive
-            ticker_dfs[ticker].index = ticker_dfs[ticker].index.normalize().tz_localize(None)
-        return tickers, ticker_dfs
-
-    print("Fetching fresh data...")
-    if user_tickers is not None:
-        tickers = user_tickers
-    else:
-        tickers = get_ndxt30_tickers()
-    if not tickers:
-        print("No tickers fetched. Exiting.")
-        return [], {}
-
-    starts = [start] * len(tickers)
-    ends = [end] * len(tickers)
-    tickers, dfs = get_histories(tickers, starts, ends, granularity="1d")
-    ticker_dfs = {ticker: df for ticker, df in zip(tickers, dfs) if not df.empty}
-
-    if ticker_dfs:
-        save_pickle("dataset.obj", (tickers, ticker_dfs))
-    else:
-        print("No valid data to save.")
-
+def get_ticker_dfs(start: datetime, end: datetime, user_tickers = None, sync: bool = False,
+                   source = None, store_path: str = STORE_PATH) -> Tuple[List[str], Dict[str, pd.DataFrame]]:
+    """Load ticker data from the market data store.
+
+    With sync=True (or when there is no store yet) the store is first brought up to
+    date through source (yfinance by default), fetching only missing ranges and tickers.
+    """
+    store = MarketDataStore(store_path)
+    if not store.exists():
+        # One-shot migration of the legacy lzma pickle into the columnar store
+        convert_pickle("dataset.obj", store_path)
+
+    if sync or not store.exists():
+        print("Syncing market data...")
+        if user_tickers is not None:
+            tickers = user_tickers
+        elif store.exists():
+            tickers = store.tickers
+        else:
+            tickers = get_ndxt30_tickers()
+        if not tickers:
+            print("No tickers fetched. Exiting.")
+            return [], {}
+        store.sync(tickers, start, end, source or default_source())
+        if not store.exists():
+            print("No valid data to save.")
+            return [], {}
+
+    # History before start is kept as warm-up for the rolling alpha windows
+    tickers, ticker_dfs = store.read(tickers=user_tickers, end=end)
+    print(f"Loaded {len(tickers)} tickers from {store_path}")
     return tickers, ticker_dfs
 
 def get_market_state(date, sp500_df):
-    if date not in sp500_df.index:
-        date = sp500_df.index[-1]
-
-    close = sp500_df.loc[date, "close"]
-    ma200 = sp500_df.loc[date, "ma200"]
-    if pd.isna(ma200):
-        return "Unknown"
-    above_ma = "above" if close > ma200 else "below"
-    three_months_ago = date - pd.DateOffset(months=3)
-    if three_months_ago in sp500_df.index:
-        ret_3m = (close / sp500_df.loc[three_months_ago, 'close'] - 1) * 100
-    else:
-        ret_3m = "unknown"
-    return f"The S&P 500 is {above_ma} its 200-day moving average, with a 3-month return of {ret_3m:.2f}%."
\ No newline at end of file
+    """Market state line for date. Pass a RegimeFeatures (built once from get_sp500_data) for
+    repeated queries; a DataFrame is converted on every call."""
+    features = sp500_df if isinstance(sp500_df, RegimeFeatures) else RegimeFeatures(sp500_df)
+    return features.state(date)
\ No newline at end of file
@@ -0,0 +1,189 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+from sweep import STAT_KEYS, batch_pnl_stats
+from trader import target_weights, equity_growth, replay_equity
+
+
+def window_bounds(n_dates, train, test, step=None):
+    """(train_lo, test_lo, test_hi) row bounds of each full walk-forward window.
+
+    Training covers rows [train_lo, test_lo) and testing [test_lo, test_hi); windows
+    advance by step rows (test by default). train=0 gives plain rolling windows.
+    """
+    step = step or test
+    return [
+        (lo, lo + train, lo + train + test)
+        for lo in range(0, n_dates - train - test + 1, step)
+    ]
+
+
+def _window_stats(growth, carried, spans, cash):
+    """Stats of a fresh book started with cash on each [lo, hi) span of the growth path.
+
+    All spans share one length, so the windows of every parameter set in the batch
+    are compounded together as one (sets, windows, dates) array.
+    """
+    lo = np.array([lo for lo, _ in spans])
+    steps = lo[:, None] + np.arange(spans[0][1] - spans[0][0] - 1)
+    path = np.cumprod(growth[:, steps], axis=-1)
+    equity = cash * np.concatenate((np.ones(path.shape[:-1] + (1,)), path), axis=-1)
+    valid = ~carried[:, steps].any(axis=-1) & np.isfinite(equity).all(axis=-1)
+    sets, windows, length = equity.shape
+    stats = batch_pnl_stats(equity.reshape(sets * windows, length))
+    stats = {key: values.reshape(sets, windows) for key, values in stats.items()}
+    stats["final_equity"] = equity[..., -1]
+    return stats, valid
+
+
+def _replayed_stats(features, weights, lo, hi, cash):
+    """Stats for one window that needs the date-by-date recursion."""
+    n = len(features.tickers)
+    equity = []
+    replay_equity(features.dates[lo:hi], features.close[lo:hi], features.available[lo:hi],
+                  weights[lo:hi], cash, np.zeros(n), np.zeros(n, dtype=bool), equity)
+    stats = batch_pnl_stats(np.array([equity], dtype=float))
+    stats = {key: float(values[0]) for key, values in stats.items()}
+    stats["final_equity"] = float(equity[-1])
+    return stats
+
+
+def _batch_path(features, param_sets, batch):
+    """Weights and growth path of a batch of parameter sets over the full span."""
+    strategy = param_sets[batch[0]]["strategy"]
+    panels = [features.alpha_panels(strategy, param_sets[i]) for i in batch]
+    alpha_panels = [np.stack(stack) for stack in zip(*panels)]
+    quantile = np.array([param_sets[i]["quantile"] for i in batch]).reshape(-1, 1, 1)
+    weights = target_weights(alpha_panels, features.eligible, quantile)
+    weights = np.where(features.available, weights, 0)
+    growth, carried = equity_growth(features.close, features.available, weights)
+    return weights, growth, carried
+
+
+def _run_windows(features, batch, path, spans, first, cash):
+    """Stats of a batch on a run of windows (numbered from first), sliced from its path."""
+    weights, growth, carried = path
+    stats, valid = _window_stats(growth, carried, spans, cash)
+    result = {}
+    for k, i in enumerate(batch):
+        for w, (lo, hi) in enumerate(spans):
+            if valid[k, w]:
+                result[i, first + w] = {key: float(values[k, w]) for key, values in stats.items()}
+            else:
+                result[i, first + w] = _replayed_stats(features, weights[k], lo, hi, cash)
+    return result
+
+
+def _run_spans(features, param_sets, span_groups, batch_size, cash, max_workers):
+    """{(param set, window): stats} per span group, computed on a thread pool.
+
+    Batches of parameter sets get their weights and growth path over the full span
+    first; (batch, run of windows) units then slice those paths, so the windows of
+    even a single parameter set spread over the workers. Batches go through in waves
+    of max_workers, which bounds how many full-span paths are held at once.
+    """
+    by_strategy = {}
+    for i, params in enumerate(param_sets):
+        by_strategy.setdefault(params["strategy"], []).append(i)
+    batches = [
+        indices[lo:lo + batch_size]
+        for indices in by_strategy.values()
+        for lo in range(0, len(indices), batch_size)
+    ]
+    merged = [{} for _ in span_groups]
+    max_workers = max_workers or os.cpu_count() or 1
+    # NumPy releases the GIL in the heavy array work, so threads overlap units
+    # without copying the shared panels into worker processes
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for lo in range(0, len(batches), max_workers):
+            wave = batches[lo:lo + max_workers]
+            paths = list(pool.map(lambda batch: _batch_path(features, param_sets, batch), wave))
+            units = []
+            for g, spans in enumerate(span_groups):
+                # A few units per worker evens out windows that need the replay
+                per_unit = max(1, -(-len(wave) * len(spans) // (4 * max_workers)))
+                for batch, path in zip(wave, paths):
+                    for first in range(0, len(spans), per_unit):
+                        units.append((g, pool.submit(_run_windows, features, batch, path,
+                                                     spans[first:first + per_unit], first, cash)))
+            for g, unit in units:
+                merged[g].update(unit.result())
+    return merged
+
+
+def rolling_backtest(features, param_sets, window=252, step=None, batch_size=32, cash=100000, max_workers=None):
+    """get_pnl_stats metrics of every parameter set over rolling windows of `window` dates.
+
+    Each window starts a fresh book with cash, ranking on alpha panels computed once
+    over the full span (so windows after the first are not cut short by warm-up).
+    """
+    bounds = window_bounds(len(features.dates), 0, window, step)
+    if not bounds:
+        raise ValueError(f"Need at least {window} trade dates, have {len(features.dates)}")
+    spans = [(lo, hi) for _, lo, hi in bounds]
+    print(f"Running {len(param_sets)} parameter sets over {len(spans)} rolling windows of {window} dates.")
+    stats = _run_spans(features, param_sets, [spans], batch_size, cash, max_workers)[0]
+    rows = []
+    for i, params in enumerate(param_sets):
+        for w, (lo, hi) in enumerate(spans):
+            rows.append({
+                **params,
+                "window": w,
+                "start": features.dates[lo],
+                "end": features.dates[hi - 1],
+                **stats[i, w],
+            })
+    return pd.DataFrame(rows)
+
+
+def walk_forward(features, param_sets, train=504, test=126, step=None, metric="Sharpe Ratio",
+                 batch_size=32, cash=100000, max_workers=None):
+    """Walk-forward evaluation: pick the best parameter set on each training window by
+    metric, then report its get_pnl_stats metrics on the following test window.
+
+    With a single parameter set this is a plain out-of-sample split of one strategy.
+    """
+    bounds = window_bounds(len(features.dates), train, test, step)
+    if not bounds:
+        raise ValueError(f"Need at least {train + test} trade dates, have {len(features.dates)}")
+    print(f"Walking forward {len(param_sets)} parameter sets over {len(bounds)} windows "
+          f"({train} train / {test} test dates).")
+    train_spans = [(lo, mid) for lo, mid, _ in bounds]
+    test_spans = [(mid, hi) for _, mid, hi in bounds]
+    if train:
+        train_stats, test_stats = _run_spans(features, param_sets, [train_spans, test_spans],
+                                             batch_size, cash, max_workers)
+    else:
+        train_stats, test_stats = None, _run_spans(features, param_sets, [test_spans],
+                                                   batch_size, cash, max_workers)[0]
+
+    rows = []
+    for w, (lo, mid, hi) in enumerate(bounds):
+        if train_stats is None:
+            best = 0
+        else:
+            scores = np.array([train_stats[i, w][metric] for i in range(len(param_sets))])
+            best = int(np.nanargmax(scores)) if not np.isnan(scores).all() else 0
+        row = {
+            "window": w,
+            "train_start": features.dates[lo] if train else pd.NaT,
+            "train_end": features.dates[mid - 1] if train else pd.NaT,
+            "test_start": features.dates[mid],
+            "test_end": features.dates[hi - 1],
+            **param_sets[best],
+        }
+        if train_stats is not None:
+            row[f"train {metric}"] = train_stats[best, w][metric]
+        row.update(test_stats[best, w])
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def summarize_windows(results):
+    """Aggregate per-window statistics: mean, std, min, median and max of each metric,
+    plus the share of windows with a positive return."""
+    summary = results[list(STAT_KEYS)].agg(["mean", "std", "min", "median", "max"])
+    summary.loc["positive", "Total Return (%)"] = (results["Total Return (%)"] > 0).mean()
+    return summary